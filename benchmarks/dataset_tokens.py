@@ -0,0 +1,134 @@
+#!/bin/python3
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+""" Benchmarks the dataset corpus as memory-mapped token shards against the corpus as a python list of words.
+
+The word list corpus joins and tokenizes the words of every block on each batch, as done before the token shards.
+Each measurement runs in a fresh process on synthetic dataset files, so that peak RSS is not shared between runs.
+
+Example:
+    $ python3 benchmarks/dataset_tokens.py --files 64 --words_per_file 100000 --batches 50
+
+"""
+import os
+import time
+import random
+import argparse
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+import torch
+from rich.console import Console
+from rich.table import Table
+
+import bittensor
+from bittensor._dataset import token_shards
+
+def synthetic_files( directory: str, files: int, words_per_file: int, seed: int ):
+    r""" Writes dataset files of random words to directory, and returns their paths.
+    """
+    rng = random.Random( seed )
+    vocabulary = [ ''.join( rng.choice( 'abcdefghijklmnopqrstuvwxyz' ) for _ in range( rng.randint( 1, 10 ) ) ) for _ in range( 10000 ) ]
+    paths = []
+    for index in range( files ):
+        path = os.path.join( directory, 'file-{}'.format( index ) )
+        with open( path, 'w' ) as file:
+            file.write( ' '.join( rng.choice( vocabulary ) for _ in range( words_per_file ) ) )
+        paths.append( path )
+    return paths
+
+def word_list_batch( tokenizer, data, batch_size: int, block_size: int, batch: int ):
+    r""" Returns a batch from the word list corpus, as GenesisTextDataset.__getitem__ did before the token shards.
+    """
+    blocks = []
+    for idx in range( batch * batch_size, ( batch + 1 ) * batch_size ):
+        start_idx = ( idx * block_size ) % len( data )
+        text = " ".join( data[ start_idx: start_idx + block_size ] )
+        tokens = tokenizer( text, padding = True, truncation = True )[ "input_ids" ]
+        blocks.append( torch.tensor( tokens, dtype = torch.long )[ :block_size ] )
+    return blocks
+
+def token_shard_batch( data, batch_size: int, block_size: int, batch: int ):
+    r""" Returns a batch from the token shard corpus, as GenesisTextDataset.__getitem__ does.
+    """
+    blocks = []
+    for idx in range( batch * batch_size, ( batch + 1 ) * batch_size ):
+        start_idx = ( idx * block_size ) % len( data )
+        blocks.append( torch.from_numpy( data[ start_idx: start_idx + block_size ].astype( numpy.int64 ) ) )
+    return blocks
+
+def measure( mode: str, paths, batch_size: int, block_size: int, batches: int ):
+    r""" Returns (load seconds, batch milliseconds, peak RSS increase in MB) of one corpus mode, run in a fresh process.
+    """
+    tokenizer = bittensor.tokenizer()
+    base_rss = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+    start = time.perf_counter()
+    if mode == 'word list':
+        data = []
+        for path in paths:
+            with open( path ) as file:
+                data.extend( file.read().split() )
+    else:
+        data = token_shards.TokenCorpus( [ token_shards.load_token_shard( path + token_shards.TOKEN_SHARD_SUFFIX ) for path in paths ] )
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for batch in range( batches ):
+        if mode == 'word list':
+            word_list_batch( tokenizer, data, batch_size, block_size, batch )
+        else:
+            token_shard_batch( data, batch_size, block_size, batch )
+    batch_time = ( time.perf_counter() - start ) / batches
+    return load_time, batch_time * 1e3, ( resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss - base_rss ) / 1024
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, help='Number of dataset files.', default=64)
+    parser.add_argument('--words_per_file', type=int, help='Number of words in each dataset file.', default=100000)
+    parser.add_argument('--batch_size', type=int, help='Batch size.', default=10)
+    parser.add_argument('--block_size', type=int, help='Block size.', default=20)
+    parser.add_argument('--batches', type=int, help='Number of batches per mode.', default=50)
+    config = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = synthetic_files( directory, config.files, config.words_per_file, seed = 0 )
+        tokenizer = bittensor.tokenizer()
+        start = time.perf_counter()
+        for path in paths:
+            with open( path ) as file:
+                token_shards.save_token_shard( path + token_shards.TOKEN_SHARD_SUFFIX, token_shards.tokenize_text( tokenizer, file.read() ) )
+        tokenize_time = time.perf_counter() - start
+
+        results = {}
+        for mode in [ 'word list', 'token shards' ]:
+            with ProcessPoolExecutor( max_workers = 1 ) as executor:
+                results[ mode ] = executor.submit( measure, mode, paths, config.batch_size, config.block_size, config.batches ).result()
+
+    console = Console()
+    table = Table( title = 'Dataset corpus ({} files of {} words, shards tokenized once in {:.1f}s)'.format( config.files, config.words_per_file, tokenize_time ) )
+    for column in [ 'mode', 'load (s)', 'batch (ms)', 'peak RSS (MB)', 'speedup' ]:
+        table.add_column( column )
+    for mode, ( load_time, batch_time, peak_rss ) in results.items():
+        table.add_row( mode, '{:.2f}'.format( load_time ), '{:.2f}'.format( batch_time ), '{:.0f}'.format( peak_rss ), '{:.1f}x'.format( results[ 'word list' ][1] / batch_time ) )
+
+    console.print( table )
+
+
+if __name__ == '__main__':
+    main()
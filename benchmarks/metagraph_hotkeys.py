@@ -0,0 +1,83 @@
+#!/bin/python3
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+""" Benchmarks the hotkey to uid lookup done by the axon priority and blacklist callbacks on every request.
+
+Compares the hashed Metagraph.hotkey_to_uid index against hotkeys.index over the cached hotkeys list, and
+over a hotkeys list rebuilt from the endpoints on every access, as done before the key caches.
+
+Example:
+    $ python3 benchmarks/metagraph_hotkeys.py --n 4096 --lookups 200
+
+"""
+import time
+import random
+import argparse
+
+from rich.console import Console
+from rich.table import Table
+
+import bittensor
+from metagraph_sync import ChainNeurons, synthetic_neurons
+
+def rebuilt_hotkeys( metagraph ):
+    r""" Returns the hotkeys rebuilt from the endpoints, as the hotkeys property did before the key caches.
+    """
+    return [ neuron.hotkey if neuron != bittensor.endpoint.dummy() else '' for neuron in metagraph.endpoint_objs ]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, help='Network size.', default=4096)
+    parser.add_argument('--lookups', type=int, help='Number of lookups per mode.', default=200)
+    config = parser.parse_args()
+
+    metagraph = bittensor.metagraph( subtensor = ChainNeurons( synthetic_neurons( config.n, weights_per_neuron = 1, seed = 0 ) ) )
+    start = time.perf_counter()
+    metagraph.sync( block = 0, cached = False )
+    sync_time = time.perf_counter() - start
+
+    # Mix of registered and unregistered callers.
+    rng = random.Random( 0 )
+    pubkeys = [ 'hotkey-{}'.format( rng.randrange( 2 * config.n ) ) for _ in range( config.lookups ) ]
+    modes = {
+        'hotkeys.index (rebuilt list)': lambda pubkey: rebuilt_hotkeys( metagraph ).index( pubkey ) if pubkey in rebuilt_hotkeys( metagraph ) else -1,
+        'hotkeys.index (cached list)': lambda pubkey: metagraph.hotkeys.index( pubkey ) if pubkey in metagraph.hotkeys else -1,
+        'hotkey_to_uid': metagraph.hotkey_to_uid,
+    }
+
+    console = Console()
+    table = Table( title = 'Hotkey to uid lookup (n = {}, sync {:.2f}s)'.format( config.n, sync_time ) )
+    for column in [ 'mode', 'lookup (us)', 'speedup' ]:
+        table.add_column( column )
+
+    results = {}
+    for mode, lookup in modes.items():
+        uids = []
+        start = time.perf_counter()
+        for pubkey in pubkeys:
+            uids.append( lookup( pubkey ) )
+        results[ mode ] = ( time.perf_counter() - start ) / len( pubkeys )
+        if mode != 'hotkey_to_uid':
+            assert uids == [ metagraph.hotkey_to_uid( pubkey ) for pubkey in pubkeys ]
+    for mode, lookup_time in results.items():
+        table.add_row( mode, '{:.2f}'.format( lookup_time * 1e6 ), '{:.0f}x'.format( results[ 'hotkeys.index (rebuilt list)' ] / lookup_time ) )
+
+    console.print( table )
+
+
+if __name__ == '__main__':
+    main()
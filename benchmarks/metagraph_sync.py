@@ -0,0 +1,143 @@
+#!/bin/python3
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+""" Benchmarks metagraph sync time and peak RSS of the scattered and incremental sync against the dense list sync.
+
+Each measurement runs in a fresh process on synthetic chain neurons, so that peak RSS is not shared between runs.
+
+Example:
+    $ python3 benchmarks/metagraph_sync.py --n 1024 2048 4096 --weights_per_neuron 256 --changed 0.05
+
+"""
+import time
+import random
+import argparse
+import resource
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+
+import torch
+from rich.console import Console
+from rich.table import Table
+
+import bittensor
+import bittensor.utils.weight_utils as weight_utils
+
+class ChainNeurons:
+    r""" Subtensor stand-in returning synthetic neurons.
+    """
+    network = 'benchmark'
+
+    def __init__( self, neurons ):
+        self._neurons = neurons
+
+    def neurons( self, block: int = None ):
+        return self._neurons
+
+    def get_current_block( self ):
+        return 0
+
+def synthetic_neurons( n: int, weights_per_neuron: int, seed: int ):
+    rng = random.Random( seed )
+    neurons = []
+    for uid in range( n ):
+        neurons.append( SimpleNamespace(
+            uid = uid, active = 1, stake = rng.random() * 1000, rank = rng.random(), trust = rng.random(), consensus = rng.random(),
+            incentive = rng.random(), emission = rng.random(), dividends = rng.random(), last_update = rng.randint( 0, 100 ),
+            version = bittensor.__version_as_int__, hotkey = 'hotkey-{}'.format( uid ), coldkey = 'coldkey-{}'.format( uid ),
+            ip_type = 4, ip = '10.0.{}.{}'.format( uid // 256, uid % 256 ), port = 8091, modality = 0,
+            weights = [ ( j, rng.randint( 0, weight_utils.U32_MAX ) ) for j in rng.sample( range( n ), min( n, weights_per_neuron ) ) ],
+            bonds = [ ( j, rng.randint( 0, 2 ** 40 ) ) for j in rng.sample( range( n ), min( n, weights_per_neuron ) ) ],
+        ) )
+    return neurons
+
+def changed_neurons( neurons, changed: float, seed: int ):
+    r""" Returns a copy of neurons where a changed fraction set new weights.
+    """
+    rng = random.Random( seed )
+    neurons = [ SimpleNamespace( **vars( neuron ) ) for neuron in neurons ]
+    for neuron in rng.sample( neurons, int( changed * len( neurons ) ) ):
+        neuron.last_update += 1
+        neuron.weights = [ ( j, rng.randint( 0, weight_utils.U32_MAX ) ) for j, _ in neuron.weights ]
+    return neurons
+
+def sync_dense_lists( neurons ):
+    r""" Fills W, B and the endpoints through n x n python lists, as done before the scattered sync.
+    """
+    n_total = len( neurons )
+    endpoints = [ [ -1 for _ in range( 250 ) ] for _ in range( n_total ) ]
+    weights = [ [ 0 for _ in range( n_total ) ] for _ in range( n_total ) ]
+    bonds = [ [ 0 for _ in range( n_total ) ] for _ in range( n_total ) ]
+    for n in neurons:
+        endpoint = bittensor.endpoint( version = int( n.version ), uid = int( n.uid ), hotkey = str( n.hotkey ), ip_type = int( n.ip_type ),
+                                       ip = str( n.ip ), port = int( n.port ), modality = int( n.modality ), coldkey = str( n.coldkey ) )
+        endpoints[ n.uid ] = endpoint.to_tensor().tolist()
+        if len( n.weights ) > 0:
+            w_uids, w_weights = zip( *n.weights )
+            weights[ n.uid ] = weight_utils.convert_weight_uids_and_vals_to_tensor( n_total, w_uids, w_weights ).tolist()
+        if len( n.bonds ) > 0:
+            b_uids, b_bonds = zip( *n.bonds )
+            bonds[ n.uid ] = weight_utils.convert_bond_uids_and_vals_to_tensor( n_total, b_uids, b_bonds ).tolist()
+    tbonds = torch.tensor( bonds, dtype = torch.int64 )
+    tweights = torch.tensor( weights, dtype = torch.float32 )
+    tendpoints = torch.tensor( endpoints, dtype = torch.int64 )
+    tbonds = torch.nn.functional.normalize( tbonds.float(), p = 1, dim = 0, eps = 1e-12 ) * 0.5 + torch.eye( n_total ) * 0.5
+    return tweights, tbonds, tendpoints
+
+def measure( mode: str, n: int, weights_per_neuron: int, changed: float ):
+    r""" Returns (sync seconds, peak RSS increase in MB) of one sync mode, run in a fresh process.
+    """
+    neurons = synthetic_neurons( n, weights_per_neuron, seed = 0 )
+    metagraph = bittensor.metagraph( subtensor = ChainNeurons( neurons ) )
+    if mode == 'incremental':
+        metagraph.sync( block = 0, cached = False )
+        metagraph.subtensor = ChainNeurons( changed_neurons( neurons, changed, seed = 1 ) )
+
+    base_rss = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+    start = time.perf_counter()
+    if mode == 'dense lists':
+        sync_dense_lists( neurons )
+    else:
+        metagraph.sync( block = 1, cached = False, incremental = mode == 'incremental' )
+    sync_time = time.perf_counter() - start
+    return sync_time, ( resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss - base_rss ) / 1024
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, nargs='+', help='Network sizes to measure.', default=[1024, 2048, 4096])
+    parser.add_argument('--weights_per_neuron', type=int, help='Number of weights and bonds set by each neuron.', default=256)
+    parser.add_argument('--changed', type=float, help='Fraction of neurons which set weights between incremental syncs.', default=0.05)
+    config = parser.parse_args()
+
+    console = Console()
+    table = Table( title = 'Metagraph sync ({} weights per neuron, {:.0%} changed)'.format( config.weights_per_neuron, config.changed ) )
+    for column in [ 'n', 'mode', 'sync (s)', 'peak RSS (MB)', 'speedup' ]:
+        table.add_column( column )
+
+    for n in config.n:
+        results = {}
+        for mode in [ 'dense lists', 'scattered', 'incremental' ]:
+            with ProcessPoolExecutor( max_workers = 1 ) as executor:
+                results[ mode ] = executor.submit( measure, mode, n, config.weights_per_neuron, config.changed ).result()
+        for mode, ( sync_time, peak_rss ) in results.items():
+            table.add_row( str( n ), mode, '{:.2f}'.format( sync_time ), '{:.0f}'.format( peak_rss ), '{:.1f}x'.format( results[ 'dense lists' ][0] / sync_time ) )
+
+    console.print( table )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/bin/python3
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+""" Benchmarks tensor serializers against each other on typical synapse payloads.
+
+Example:
+    $ python3 benchmarks/serializer.py --n_calls 20
+
+"""
+import time
+import argparse
+import torch
+import bittensor
+from rich.console import Console
+from rich.table import Table
+
+SERIALIZERS = {
+    'MSGPACK': bittensor.proto.Serializer.MSGPACK,
+    'CMPPACK': bittensor.proto.Serializer.CMPPACK,
+    'RAWBUF': bittensor.proto.Serializer.RAWBUF,
+}
+
+def payloads( batch_size: int, sequence_len: int ):
+    r""" Returns (name, tensor) pairs shaped like the synapse requests and responses seen on the wire.
+    """
+    return [
+        ( 'inputs [batch, seq] int64', torch.randint( 0, 50258, (batch_size, sequence_len) ) ),
+        ( 'TextLastHiddenState [batch, seq, 1024]', torch.rand( batch_size, sequence_len, bittensor.__network_dim__ ) ),
+        ( 'TextCausalLMNext topk=4096 [batch * (4096 + 1), 3]', torch.rand( batch_size * (4096 + 1), 3 ) ),
+        ( 'TextCausalLM [batch, seq, 50258]', torch.rand( batch_size, sequence_len, 50258 ) ),
+    ]
+
+def time_serializer( serializer_type, tensor: torch.Tensor, n_calls: int ):
+    r""" Returns mean serialize seconds, mean deserialize seconds and the wire size in bytes.
+    """
+    serializer = bittensor.serializer( serializer_type = serializer_type )
+    start = time.perf_counter()
+    for _ in range( n_calls ):
+        proto = serializer.serialize( tensor, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH )
+    serialize_time = (time.perf_counter() - start) / n_calls
+
+    # Simulate the wire: the receiver parses a fresh proto from bytes.
+    wire = proto.SerializeToString()
+    start = time.perf_counter()
+    for _ in range( n_calls ):
+        serializer.deserialize( bittensor.proto.Tensor.FromString( wire ), to_type = bittensor.proto.TensorType.TORCH )
+    deserialize_time = (time.perf_counter() - start) / n_calls
+    return serialize_time, deserialize_time, len( wire )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_calls', type=int, help='Number of serialize/deserialize calls per measurement.', default=10)
+    parser.add_argument('--batch_size', type=int, help='Batch size', default=2)
+    parser.add_argument('--sequence_len', type=int, help='Sequence length', default=20)
+    config = parser.parse_args()
+
+    console = Console()
+    table = Table( title = 'Serializer benchmark (mean over {} calls)'.format( config.n_calls ) )
+    for column in [ 'payload', 'serializer', 'serialize (ms)', 'deserialize (ms)', 'wire (MB)', 'speedup vs MSGPACK' ]:
+        table.add_column( column )
+
+    for name, tensor in payloads( config.batch_size, config.sequence_len ):
+        baseline = None
+        for serializer_name, serializer_type in SERIALIZERS.items():
+            serialize_time, deserialize_time, wire_size = time_serializer( serializer_type, tensor, config.n_calls )
+            total = serialize_time + deserialize_time
+            baseline = total if baseline is None else baseline
+            table.add_row( name, serializer_name, '{:.3f}'.format( serialize_time * 1000 ), '{:.3f}'.format( deserialize_time * 1000 ),
+                           '{:.2f}'.format( wire_size / 1e6 ), '{:.2f}x'.format( baseline / total ) )
+    console.print( table )
+
+
+if __name__ == '__main__':
+    main()
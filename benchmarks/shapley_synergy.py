@@ -0,0 +1,103 @@
+#!/bin/python3
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+""" Benchmarks the batched pairwise Shapley synergy of the core validator against the per-pair loop.
+
+Example:
+    $ python3 benchmarks/shapley_synergy.py --n_uids 50 100 200 --batch_size 2 --sequence_len 8
+
+"""
+import copy
+import time
+import argparse
+import torch
+from rich.console import Console
+from rich.table import Table
+
+from bittensor._neuron.text.core_validator import shapley_synergy, scaling_law_loss_to_params
+from bittensor._neuron.text.neuron_utilities import calc_loss_fct
+
+def shapley_synergy_loop( stats, loss_fct, target, scaling_law_power: float = 0.5 ):
+    r""" Per-pair Shapley synergy with two softmaxes per pair, as done before the batched synergy.
+    """
+    responsives = [ uid for uid, stat in stats.items() if 'loss' in stat ]
+    for _first, first in stats.items():
+        for _second, second in stats.items():
+            if _second <= _first:
+                continue
+            with torch.no_grad():
+                expected_loss = torch.min( first['loss'], second['loss'] )
+                combined_logits = torch.log( ( torch.softmax( first['logits'], dim = -1 ) + torch.softmax( second['logits'], dim = -1 ) ) / 2 + 1e-40 )
+                measured_loss = calc_loss_fct( loss_fct, combined_logits, target )
+
+                loss_diff_share = torch.clamp( expected_loss - measured_loss, 0 ) / 2 / len( responsives )
+                first['synergy_loss_diff'] += loss_diff_share
+                second['synergy_loss_diff'] += loss_diff_share
+
+                pow_measured_params = torch.pow( scaling_law_loss_to_params( measured_loss ), scaling_law_power )
+                pow_expected_params = torch.pow( scaling_law_loss_to_params( expected_loss ), scaling_law_power )
+                synergy_share = torch.clamp( pow_measured_params - pow_expected_params, 0 ) / 2 / len( responsives )
+                first['synergy'] += synergy_share
+                second['synergy'] += synergy_share
+
+def target_probs( stats, target, ext ):
+    logits = stats[ 'logits' + ext ]
+    probs = torch.softmax( logits.reshape( -1, logits.shape[-1] ), dim = -1 )
+    return probs.gather( -1, target.reshape( -1, 1 ) )[:, 0]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_uids', type=int, nargs='+', help='Numbers of responsive uids to measure.', default=[50, 100, 200])
+    parser.add_argument('--batch_size', type=int, help='Batch size', default=2)
+    parser.add_argument('--sequence_len', type=int, help='Sequence length', default=8)
+    parser.add_argument('--vocab_size', type=int, help='Vocabulary size of the responses', default=50258)
+    parser.add_argument('--max_chunk_elements', type=int, help='Maximum elements of the pairwise buffer.', default=2 ** 26)
+    parser.add_argument('--device', type=str, help='Device to measure on.', default='cuda' if torch.cuda.is_available() else 'cpu')
+    config = parser.parse_args()
+
+    loss_fct = torch.nn.CrossEntropyLoss()
+    console = Console()
+    table = Table( title = 'Shapley synergy [{}, {}, {}] on {}'.format( config.batch_size, config.sequence_len, config.vocab_size, config.device ) )
+    for column in [ 'uids', 'pairs', 'loop (s)', 'batched (s)', 'speedup', 'batched peak (MB)', 'max synergy diff' ]:
+        table.add_column( column )
+
+    for n_uids in config.n_uids:
+        target = torch.randint( config.vocab_size, ( config.batch_size, config.sequence_len ), device = config.device )
+        stats = {}
+        for uid in range( n_uids ):
+            logits = torch.randn( config.batch_size, config.sequence_len, config.vocab_size, device = config.device )
+            stats[uid] = { 'logits': logits, 'loss': calc_loss_fct( loss_fct, logits, target ), 'synergy': 0, 'synergy_loss_diff': 0 }
+        loop_stats, batched_stats = copy.deepcopy( stats ), copy.deepcopy( stats )
+
+        start = time.perf_counter()
+        shapley_synergy_loop( loop_stats, loss_fct, target )
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, peak_bytes = shapley_synergy( batched_stats, target_probs, '', target, max_chunk_elements = config.max_chunk_elements )
+        batched_time = time.perf_counter() - start
+
+        max_diff = max( abs( float( loop_stats[uid]['synergy'] ) - float( batched_stats[uid]['synergy'] ) ) for uid in stats )
+        table.add_row( str( n_uids ), str( n_uids * ( n_uids - 1 ) // 2 ), '{:.2f}'.format( loop_time ), '{:.3f}'.format( batched_time ),
+                       '{:.1f}x'.format( loop_time / batched_time ), '{:.1f}'.format( peak_bytes / 2 ** 20 ), '{:.2e}'.format( max_diff ) )
+        del stats, loop_stats, batched_stats
+
+    console.print( table )
+
+
+if __name__ == '__main__':
+    main()
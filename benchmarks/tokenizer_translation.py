@@ -0,0 +1,101 @@
+#!/bin/python3
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+""" Benchmarks the batched tokenizer probability translation against the per-segment translation loop.
+
+Example:
+    $ python3 benchmarks/tokenizer_translation.py --model_name benjamin/gerpt2-large --batch_size 4
+
+"""
+import time
+import argparse
+import torch
+from rich.console import Console
+from rich.table import Table
+from transformers import AutoTokenizer
+
+import bittensor
+from bittensor.utils.tokenizer_utils import get_translation_map, translate_special_token_text, pad_offsets, \
+    translate_tokenizer_probs, translate_tokenizer_probs_batch, prep_tokenizer
+
+def remapped_batch( tokenizer, std_tokenizer, batch_size: int, sequence_len: int ):
+    r""" Returns a random std token batch remapped to the server tokenizer, as done by the core_server token_remap.
+    """
+    token_batch = torch.randint( 0, std_tokenizer.vocab_len - 1, (batch_size, sequence_len) )
+    text_batch = std_tokenizer.batch_decode( token_batch )
+    to_text_batch, from_offsets_batch, to_offsets_batch, pad_offsets_batch = translate_special_token_text( text_batch, std_tokenizer, tokenizer )
+    tokens = tokenizer( to_text_batch, padding = True, truncation = True, max_length = sequence_len, return_tensors = 'pt', add_special_tokens = False )
+    server_tokens = tokenizer( to_text_batch, return_offsets_mapping = True, add_special_tokens = False )
+    std_tokens = std_tokenizer( text_batch, return_offsets_mapping = True )
+    offset_mapping = pad_offsets( server_tokens['offset_mapping'], to_offsets_batch, pad_offsets_batch )
+    offset_mapping_std = pad_offsets( std_tokens['offset_mapping'], from_offsets_batch, pad_offsets_batch )
+    return token_batch, tokens['input_ids'], offset_mapping, offset_mapping_std
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model_name', type=str, help='Server tokenizer to translate from.', default='benjamin/gerpt2-large')
+    parser.add_argument('--n_calls', type=int, help='Number of translations per measurement.', default=5)
+    parser.add_argument('--batch_size', type=int, help='Batch size', default=4)
+    parser.add_argument('--sequence_len', type=int, help='Sequence length', default=64)
+    config = parser.parse_args()
+
+    std_tokenizer = bittensor.tokenizer()
+    tokenizer = prep_tokenizer( AutoTokenizer.from_pretrained( config.model_name ), std_tokenizer )
+    to_translation_map = get_translation_map( tokenizer, std_tokenizer )
+    from_translation_map = get_translation_map( std_tokenizer, tokenizer )
+    split_map_cache = {}
+
+    token_batch, tokens, offset_mapping, offset_mapping_std = remapped_batch( tokenizer, std_tokenizer, config.batch_size, config.sequence_len )
+    probs = torch.softmax( torch.randn( tokens.shape[0], tokens.shape[1], tokenizer.vocab_len ), dim = -1 )
+    probs_batch = [ probs[b][-len(offset_mapping[b]):] for b in range( config.batch_size ) ]
+    tokens_batch = [ tokens[b][-len(offset_mapping[b]):] for b in range( config.batch_size ) ]
+    probs_std_shape = ( config.batch_size, config.sequence_len, std_tokenizer.vocab_len )
+
+    def translate_loop():
+        probs_std = torch.zeros( probs_std_shape )
+        for b in range( config.batch_size ):
+            translate_tokenizer_probs( probs_batch[b], probs_std[b], offset_mapping[b], offset_mapping_std[b], tokenizer, std_tokenizer,
+                                       split_map_cache, to_translation_map, from_translation_map, tokens_batch[b], token_batch[b] )
+        return probs_std
+
+    def translate_batch():
+        probs_std = torch.zeros( probs_std_shape )
+        translate_tokenizer_probs_batch( probs_batch, probs_std, offset_mapping, offset_mapping_std, tokenizer, std_tokenizer,
+                                         split_map_cache, to_translation_map, from_translation_map, tokens_batch, token_batch )
+        return probs_std
+
+    # Warm up the split map cache and the translation matrices.
+    max_error = ( translate_loop() - translate_batch() ).abs().max().item()
+
+    console = Console()
+    table = Table( title = 'Tokenizer translation {} -> std, [{}, {}] (mean over {} calls)'.format( config.model_name, config.batch_size, config.sequence_len, config.n_calls ) )
+    for column in [ 'implementation', 'time (ms)', 'speedup' ]:
+        table.add_column( column )
+    baseline = None
+    for name, translate in [ ( 'per-segment loop', translate_loop ), ( 'batched sparse', translate_batch ) ]:
+        start = time.perf_counter()
+        for _ in range( config.n_calls ):
+            translate()
+        total = ( time.perf_counter() - start ) / config.n_calls
+        baseline = total if baseline is None else baseline
+        table.add_row( name, '{:.1f}'.format( total * 1000 ), '{:.2f}x'.format( baseline / total ) )
+    console.print( table )
+    console.print( 'max abs difference: {:.2e}'.format( max_error ) )
+
+
+if __name__ == '__main__':
+    main()
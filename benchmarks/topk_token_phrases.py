@@ -0,0 +1,93 @@
+#!/bin/python3
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+""" Benchmarks topk_token_phrases on the precomputed phrase table against per-element phrase list construction.
+
+Example:
+    $ python3 benchmarks/topk_token_phrases.py --model_name benjamin/gerpt2-large --topk 4096
+
+"""
+import time
+import argparse
+import torch
+from rich.console import Console
+from rich.table import Table
+from transformers import AutoTokenizer
+
+import bittensor
+from bittensor.utils.tokenizer_utils import topk_token_phrases, compact_topk_token_phrases, prep_tokenizer
+
+def topk_token_phrases_loop( logits, tokenizer, topk: int, ignore_index: int = -100 ):
+    r""" Per-element phrase list construction of the topk_tensor, as done before the phrase table.
+    """
+    batch_size, vocab_size = logits.shape
+    probs = torch.softmax( logits.float(), dim = 1 )
+    topk_probs, topk_indices = torch.topk( probs, topk )
+    floor_probs = torch.clamp( 1 - topk_probs.sum( dim = -1 ), 1e-40, 1 ) / ( vocab_size - topk )
+
+    topk_probs_list = topk_probs.tolist()
+    topk_indices_list = topk_indices.tolist()
+    floor_probs_list = floor_probs.tolist()
+
+    probs = []
+    phrases = []
+    for b in range( batch_size ):
+        probs += [ topk_probs[b], floor_probs[b] ]
+        phrases += [ [prob] + tokenizer.std_token_phrases[i] for prob, i in zip( topk_probs_list[b], topk_indices_list[b] ) ]
+        phrases += [ [floor_probs_list[b]] ]
+
+    max_len = max( [ len(p) for p in phrases ] )
+    topk_tensor = torch.tensor( [ p + [ignore_index] * ( max_len - len(p) ) for p in phrases ] ).to( logits.device )
+    topk_tensor[:, 0] = torch.hstack( probs )
+    return topk_tensor.reshape( batch_size, topk + 1, max_len )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model_name', type=str, help='Server tokenizer to build token phrases for.', default='benjamin/gerpt2-large')
+    parser.add_argument('--n_calls', type=int, help='Number of requests per measurement.', default=10)
+    parser.add_argument('--batch_size', type=int, help='Batch size', default=10)
+    parser.add_argument('--topk', type=int, help='Number of top phrases per batch item.', default=4096)
+    config = parser.parse_args()
+
+    std_tokenizer = bittensor.tokenizer()
+    tokenizer = prep_tokenizer( AutoTokenizer.from_pretrained( config.model_name ), std_tokenizer )
+    logits = torch.randn( config.batch_size, tokenizer.vocab_len )
+
+    max_error = ( topk_token_phrases_loop( logits, tokenizer, config.topk ) - topk_token_phrases( logits, tokenizer, config.topk ) ).abs().max().item()
+
+    console = Console()
+    table = Table( title = 'topk_token_phrases {}, batch_size {}, topk {} (mean over {} calls)'.format( config.model_name, config.batch_size, config.topk, config.n_calls ) )
+    for column in [ 'implementation', 'time (ms)', 'with compact (ms)', 'speedup' ]:
+        table.add_column( column )
+    baseline = None
+    for name, phrases in [ ( 'phrase lists', topk_token_phrases_loop ), ( 'phrase table', topk_token_phrases ) ]:
+        start = time.perf_counter()
+        for _ in range( config.n_calls ):
+            topk_tensor = phrases( logits, tokenizer, config.topk )
+        total = ( time.perf_counter() - start ) / config.n_calls
+        start = time.perf_counter()
+        for _ in range( config.n_calls ):
+            compact_topk_token_phrases( phrases( logits, tokenizer, config.topk ) )
+        total_compact = ( time.perf_counter() - start ) / config.n_calls
+        baseline = total_compact if baseline is None else baseline
+        table.add_row( name, '{:.1f}'.format( total * 1000 ), '{:.1f}'.format( total_compact * 1000 ), '{:.2f}x'.format( baseline / total_compact ) )
+    console.print( table )
+    console.print( 'max abs difference: {:.2e}'.format( max_error ) )
+
+
+if __name__ == '__main__':
+    main()
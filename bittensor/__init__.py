@@ -150,6 +150,8 @@ from bittensor._threadpool import prioritythreadpool as prioritythreadpool
 # ---- Classes -----
 from bittensor._cli.cli_impl import CLI as CLI
 from bittensor._axon.axon_impl import Axon as Axon
+from bittensor._axon.axon_impl import AsyncAxon as AsyncAxon
+from bittensor._axon.request_batcher_impl import RequestBatcher as RequestBatcher
 from bittensor._config.config_impl import Config as Config
 from bittensor._wallet.wallet_impl import Wallet as Wallet
 from bittensor._keyfile.keyfile_impl import Keyfile as Keyfile
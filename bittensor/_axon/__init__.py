@@ -33,6 +33,7 @@ from substrateinterface import Keypair
 
 import bittensor
 from . import axon_impl
+from . import request_batcher_impl
 
 class axon:
     """ The factory class for bittensor.Axon object
@@ -77,6 +78,9 @@ class axon:
             forward_timeout: Optional[int] = None,
             backward_timeout: Optional[int] = None,
             compression:Optional[str] = None,
+            use_asyncio: Optional[bool] = None,
+            batch_max_wait: Optional[float] = None,
+            batch_max_tokens: Optional[int] = None,
         ) -> 'bittensor.Axon':
         r""" Creates a new bittensor.Axon object from passed arguments.
             Args:
@@ -122,6 +126,12 @@ class axon:
                     timeout on the forward requests. 
                 backward_timeout (:type:`Optional[int]`, `optional`):
                     timeout on the backward requests.              
+                use_asyncio (:type:`Optional[bool]`, `optional`):
+                    If true, serves requests on a grpc.aio server which awaits callbacks on the priority threadpool.
+                batch_max_wait (:type:`Optional[float]`, `optional`):
+                    Seconds a synapse call waits for concurrent calls to batch with, batching is off if 0.
+                batch_max_tokens (:type:`Optional[int]`, `optional`):
+                    Maximum number of input tokens in a batch of synapse calls.
         """   
 
         if config == None: 
@@ -140,6 +150,9 @@ class axon:
         config.axon.causallm_timeout = synapse_causallm_timeout if synapse_causallm_timeout != None else config.axon.causallm_timeout
         config.axon.causallmnext_timeout = synapse_causallmnext_timeout if synapse_causallmnext_timeout is not None else config.axon.causallmnext_timeout
         config.axon.seq2seq_timeout = synapse_seq2seq_timeout if synapse_seq2seq_timeout != None else config.axon.seq2seq_timeout
+        config.axon.use_asyncio = use_asyncio if use_asyncio != None else config.axon.use_asyncio
+        config.axon.batch.max_wait = batch_max_wait if batch_max_wait != None else config.axon.batch.max_wait
+        config.axon.batch.max_tokens = batch_max_tokens if batch_max_tokens != None else config.axon.batch.max_tokens
         axon.check_config( config )
 
         # Determine the grpc compression algorithm
@@ -152,6 +165,20 @@ class axon:
 
         if wallet == None:
             wallet = bittensor.wallet( config = config )
+        if config.axon.use_asyncio:
+            return axon._new_async_axon( 
+                config = config, 
+                wallet = wallet, 
+                server = server, 
+                blacklist = blacklist, 
+                priority = priority, 
+                priority_threadpool = priority_threadpool, 
+                forward_text = forward_text, 
+                backward_text = backward_text, 
+                synapses = axon._synapse_callbacks( synapse_last_hidden, synapse_causal_lm, synapse_causal_lm_next, synapse_seq_2_seq ), 
+                synapse_timeouts = axon._synapse_timeouts( config ), 
+                synapse_checks = synapse_checks 
+            )
         if thread_pool == None:
             thread_pool = futures.ThreadPoolExecutor( max_workers = config.axon.max_workers )
         if server == None:
@@ -163,46 +190,129 @@ class axon:
                                              ('grpc.keepalive_timeout_ms', 500000)]
                                 )
 
+        synapses = axon._synapse_callbacks( synapse_last_hidden, synapse_causal_lm, synapse_causal_lm_next, synapse_seq_2_seq )
+        synapse_timeouts = axon._synapse_timeouts( config )
+        
+        synapse_check_function = synapse_checks if synapse_checks != None else axon.default_synapse_check
+
+        if priority != None and priority_threadpool == None:
+            priority_threadpool = bittensor.prioritythreadpool(config=config)
+
+        axon_instance = axon_impl.Axon(
+            wallet = wallet, 
+            server = server,
+            ip = config.axon.ip,
+            port = config.axon.port,
+            external_ip=config.axon.external_ip, # don't use internal ip if it is None, we will try to find it later
+            external_port=config.axon.external_port or config.axon.port, # default to internal port if external port is not set
+            forward = forward_text,
+            backward = backward_text,
+            synapses = synapses,
+            synapse_checks = synapse_check_function,
+            synapse_timeouts = synapse_timeouts,
+            priority = priority,
+            priority_threadpool = priority_threadpool,
+            forward_timeout = config.axon.forward_timeout,
+            backward_timeout = config.axon.backward_timeout,
+            prometheus_level = config.axon.prometheus.level,
+            batcher = axon._batcher( config )
+        )
+        bittensor.grpc.add_BittensorServicer_to_server( axon_instance, server )
+        full_address = str( config.axon.ip ) + ":" + str( config.axon.port )
+        server.add_insecure_port( full_address )
+        return axon_instance 
+
+    @staticmethod
+    def _synapse_callbacks( synapse_last_hidden, synapse_causal_lm, synapse_causal_lm_next, synapse_seq_2_seq ) -> Dict:
+        """ Returns the synapse type to callback map.
+        """
         synapses = {}
         synapses[bittensor.proto.Synapse.SynapseType.TEXT_LAST_HIDDEN_STATE] = synapse_last_hidden
         synapses[bittensor.proto.Synapse.SynapseType.TEXT_CAUSAL_LM] = synapse_causal_lm
         synapses[bittensor.proto.Synapse.SynapseType.TEXT_CAUSAL_LM_NEXT] = synapse_causal_lm_next
         synapses[bittensor.proto.Synapse.SynapseType.TEXT_SEQ_2_SEQ] = synapse_seq_2_seq
+        return synapses
 
-        synapse_timeouts = {
+    @staticmethod
+    def _synapse_timeouts( config: 'bittensor.Config' ) -> Dict:
+        """ Returns the synapse type to timeout map.
+        """
+        return {
             bittensor.proto.Synapse.SynapseType.TEXT_LAST_HIDDEN_STATE: config.axon.lasthidden_timeout,
             bittensor.proto.Synapse.SynapseType.TEXT_CAUSAL_LM: config.axon.causallm_timeout,
             bittensor.proto.Synapse.SynapseType.TEXT_CAUSAL_LM_NEXT: config.axon.causallmnext_timeout,
             bittensor.proto.Synapse.SynapseType.TEXT_SEQ_2_SEQ: config.axon.seq2seq_timeout
         }
-        
-        synapse_check_function = synapse_checks if synapse_checks != None else axon.default_synapse_check
 
-        if priority != None and priority_threadpool == None:
-            priority_threadpool = bittensor.prioritythreadpool(config=config)
+    @staticmethod
+    def _batcher( config: 'bittensor.Config' ) -> Optional['request_batcher_impl.RequestBatcher']:
+        """ Returns the synapse request batcher, or None if batching is off.
+        """
+        if config.axon.batch.max_wait <= 0:
+            return None
+        return request_batcher_impl.RequestBatcher( max_wait = config.axon.batch.max_wait, max_tokens = config.axon.batch.max_tokens )
 
-        axon_instance = axon_impl.Axon(
+    @staticmethod
+    def _new_async_axon(
+            config: 'bittensor.Config',
+            wallet: 'bittensor.Wallet',
+            server: Optional['grpc.aio.Server'],
+            blacklist: Optional['Callable'],
+            priority: Optional['Callable'],
+            priority_threadpool: Optional['bittensor.prioritythreadpool'],
+            forward_text: Optional['Callable'],
+            backward_text: Optional['Callable'],
+            synapses: Dict,
+            synapse_timeouts: Dict,
+            synapse_checks: Optional['Callable'],
+        ) -> 'axon_impl.AsyncAxon':
+        """ Creates an AsyncAxon served by a grpc.aio server on its own event loop thread. 
+            Callbacks always run on the priority threadpool so that the server holds no thread per pending request.
+        """
+        if config.axon.compression == 'gzip':
+            compress_alg = grpc.Compression.Gzip
+        elif config.axon.compression == 'deflate':
+            compress_alg = grpc.Compression.Deflate
+        else:
+            compress_alg = grpc.Compression.NoCompression
+
+        loop = axon_impl.AsyncAxon.new_event_loop()
+        if server == None:
+            server = axon_impl.AsyncAxon.new_server(
+                loop = loop,
+                interceptors = (AsyncAuthInterceptor(receiver_hotkey=wallet.hotkey.ss58_address, blacklist=blacklist),),
+                maximum_concurrent_rpcs = config.axon.maximum_concurrent_rpcs,
+                compression = compress_alg,
+                options = [('grpc.keepalive_time_ms', 100000),
+                           ('grpc.keepalive_timeout_ms', 500000)]
+            )
+        if priority_threadpool == None:
+            priority_threadpool = bittensor.prioritythreadpool( config = config )
+
+        axon_instance = axon_impl.AsyncAxon(
+            loop = loop,
             wallet = wallet, 
             server = server,
             ip = config.axon.ip,
             port = config.axon.port,
-            external_ip=config.axon.external_ip, # don't use internal ip if it is None, we will try to find it later
-            external_port=config.axon.external_port or config.axon.port, # default to internal port if external port is not set
+            external_ip = config.axon.external_ip,
+            external_port = config.axon.external_port or config.axon.port,
             forward = forward_text,
             backward = backward_text,
             synapses = synapses,
-            synapse_checks = synapse_check_function,
+            synapse_checks = synapse_checks if synapse_checks != None else axon.default_synapse_check,
             synapse_timeouts = synapse_timeouts,
             priority = priority,
             priority_threadpool = priority_threadpool,
             forward_timeout = config.axon.forward_timeout,
             backward_timeout = config.axon.backward_timeout,
-            prometheus_level = config.axon.prometheus.level
+            prometheus_level = config.axon.prometheus.level,
+            batcher = axon._batcher( config )
         )
         bittensor.grpc.add_BittensorServicer_to_server( axon_instance, server )
         full_address = str( config.axon.ip ) + ":" + str( config.axon.port )
         server.add_insecure_port( full_address )
-        return axon_instance 
+        return axon_instance
 
     @classmethod   
     def config(cls) -> 'bittensor.Config':
@@ -259,6 +369,13 @@ class axon:
             help='Timeout for causallmnext synapse', default= bittensor.__blocktime__)
             parser.add_argument('--' +  prefix_str + 'axon.seq2seq_timeout', type = int, 
             help='Timeout for seq2seq synapse', default= 3*bittensor.__blocktime__)
+            parser.add_argument('--' + prefix_str + 'axon.use_asyncio', action='store_true',
+                help='''If set, serves requests on a grpc.aio server which awaits callbacks on the priority threadpool 
+                        instead of holding a grpc thread per pending request.''', default = bittensor.defaults.axon.use_asyncio)
+            parser.add_argument('--' + prefix_str + 'axon.batch.max_wait', type = float,
+                help='''Seconds a synapse call waits for concurrent calls to run in the same model forward. 0 turns batching off.''', default = bittensor.defaults.axon.batch.max_wait)
+            parser.add_argument('--' + prefix_str + 'axon.batch.max_tokens', type = int,
+                help='''Maximum number of input tokens in a batch of synapse calls.''', default = bittensor.defaults.axon.batch.max_tokens)
             parser.add_argument('--' + prefix_str + 'axon.prometheus.level', 
                 required = False, 
                 type = str, 
@@ -288,6 +405,11 @@ class axon:
         defaults.axon.priority.maxsize = os.getenv('BT_AXON_PRIORITY_MAXSIZE') if os.getenv('BT_AXON_PRIORITY_MAXSIZE') != None else -1
 
         defaults.axon.compression = 'NoCompression'
+        defaults.axon.use_asyncio = os.getenv('BT_AXON_USE_ASYNCIO') == 'True'
+
+        defaults.axon.batch = bittensor.Config()
+        defaults.axon.batch.max_wait = os.getenv('BT_AXON_BATCH_MAX_WAIT') if os.getenv('BT_AXON_BATCH_MAX_WAIT') != None else 0
+        defaults.axon.batch.max_tokens = os.getenv('BT_AXON_BATCH_MAX_TOKENS') if os.getenv('BT_AXON_BATCH_MAX_TOKENS') != None else 8192
 
         # Prometheus
         defaults.axon.prometheus = bittensor.config()
@@ -299,6 +421,7 @@ class axon:
         """
         assert config.axon.port > 1024 and config.axon.port < 65535, 'port must be in range [1024, 65535]'
         assert config.axon.external_port is None or (config.axon.external_port > 1024 and config.axon.external_port < 65535), 'external port must be in range [1024, 65535]'
+        assert config.axon.batch.max_tokens > 0, 'axon.batch.max_tokens must be positive'
         assert config.axon.prometheus.level in [l.name for l in list(bittensor.prometheus.level)], "axon.prometheus.level must be in: {}".format([l.name for l in list(bittensor.prometheus.level)])
         bittensor.wallet.check_config( config )
 
@@ -479,3 +602,37 @@ class AuthInterceptor(grpc.ServerInterceptor):
             message = str(e)
             abort = lambda _, ctx: ctx.abort(grpc.StatusCode.UNAUTHENTICATED, message)
             return grpc.unary_unary_rpc_method_handler(abort)
+
+
+class AsyncAuthInterceptor(AuthInterceptor, grpc.aio.ServerInterceptor):
+    """Authenticates incoming messages on a grpc.aio server, see AuthInterceptor."""
+
+    async def intercept_service(self, continuation, handler_call_details):
+        r"""Authentication between bittensor nodes. Intercepts messages and checks them"""
+        method = handler_call_details.method
+        metadata = dict(handler_call_details.invocation_metadata)
+
+        try:
+            (
+                nonce,
+                sender_hotkey,
+                signature,
+                receptor_uuid,
+                signature_format,
+            ) = self.parse_signature(metadata)
+
+            # signature checking
+            self.check_signature(
+                nonce, sender_hotkey, signature, receptor_uuid, signature_format
+            )
+
+            # blacklist checking
+            self.black_list_checking(sender_hotkey, method)
+
+        except Exception as e:
+            message = str(e)
+            async def abort(_, ctx):
+                await ctx.abort(grpc.StatusCode.UNAUTHENTICATED, message)
+            return grpc.unary_unary_rpc_method_handler(abort)
+
+        return await continuation(handler_call_details)
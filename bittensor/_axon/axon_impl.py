@@ -20,11 +20,15 @@
 
 import sys
 import time as clock
+import random
+import itertools
 from types import SimpleNamespace
 from typing import List, Tuple, Callable
 
 import torch
 import grpc
+import asyncio
+import threading
 import wandb
 import pandas
 import uuid
@@ -75,6 +79,7 @@ class Axon( bittensor.grpc.BittensorServicer ):
         priority_threadpool: 'bittensor.prioritythreadpool' = None,
         forward_timeout: int = None,
         backward_timeout: int = None,
+        batcher: 'bittensor.RequestBatcher' = None,
     ):
         r""" Initializes a new Axon tensor processing endpoint.
             
@@ -95,6 +100,8 @@ class Axon( bittensor.grpc.BittensorServicer ):
                     function to assign priority on requests.
                 priority_threadpool (:obj:`bittensor.prioritythreadpool`, `optional`):
                     bittensor priority_threadpool.
+                batcher (:obj:`bittensor.RequestBatcher`, `optional`):
+                    merges concurrent synapse calls into batched callbacks.
         """
         self.ip = ip
         self.port = port
@@ -109,6 +116,7 @@ class Axon( bittensor.grpc.BittensorServicer ):
         self.synapse_callbacks = synapses
         self.synapse_checks = synapse_checks
         self.synapse_timeouts = synapse_timeouts
+        self.batcher = batcher
         self.prometheus_level = prometheus_level
         self.stats = self._init_stats()
         self.started = None
@@ -197,6 +205,25 @@ class Axon( bittensor.grpc.BittensorServicer ):
                 synapses (:obj:`List[ 'bittensor.proto.Synapse' ]` of shape :obj:`(num_synapses)`, `required`):
                     Synapse wire protos with return codes from forward request.
         """
+        return self._run_steps( self._forward_steps( request ) )
+
+    def _forward_steps(self, request):
+        r""" Generator holding the forward request logic. Yields a single callback call description
+            (callback, kwargs, priority, timeout, wait) which the driver executes and sends back the result of,
+            or throws the call exception into. The generator return value is the _forward result.
+            
+            Args:
+                request (:obj:`bittensor.proto`, `required`): 
+                    Tensor request proto.
+            Returns:
+                response (:obj:`bittensor.proto.Tensor, `required`): 
+                    serialized tensor response from the nucleus call or None.
+                code (:obj:`bittensor.proto.ReturnCode`, `required`):
+                    Code from the call. This specifies if the overall function call was a success. 
+                    This is separate from the synapse returns codes which relate to the individual synapse call. 
+                synapses (:obj:`List[ 'bittensor.proto.Synapse' ]` of shape :obj:`(num_synapses)`, `required`):
+                    Synapse wire protos with return codes from forward request.
+        """
         # ===================================================================
         # ==== First deserialize synapse wire protos to instance objects ====        
         # ===================================================================
@@ -320,23 +347,16 @@ class Axon( bittensor.grpc.BittensorServicer ):
         # ===================================
         try:
             finalize_codes_stats_and_logs()
+            priority = None
             if self.priority != None:
                 priority = self.priority( request.hotkey, inputs_x = deserialized_forward_tensors, request_type = bittensor.proto.RequestType.FORWARD )
-                future = self.priority_threadpool.submit (
-                    self.forward_callback,
-                    inputs_x = deserialized_forward_tensors, 
-                    synapses = synapses,
-                    priority = priority,
-                    hotkey = request.hotkey
-                )
-                forward_response_tensors, forward_codes, forward_messages = future.result( timeout = synapse_timeout - (clock.time() - start_time) )
-            else:
-                
-                forward_response_tensors, forward_codes, forward_messages = self.forward_callback(
-                    inputs_x = deserialized_forward_tensors,
-                    synapses = synapses,
-                    hotkey= request.hotkey
-                )
+            forward_response_tensors, forward_codes, forward_messages = yield SimpleNamespace(
+                callback = self.forward_callback,
+                kwargs = dict( inputs_x = deserialized_forward_tensors, synapses = synapses, hotkey = request.hotkey ),
+                priority = priority,
+                timeout = synapse_timeout - (clock.time() - start_time),
+                wait = True
+            )
             synapse_is_response = [ True for _ in synapses ]
             # ========================================
             # ==== Fill codes from forward calls ====
@@ -348,8 +368,6 @@ class Axon( bittensor.grpc.BittensorServicer ):
         # ==== Catch forward request timeouts ====
         # ========================================
         except concurrent.futures.TimeoutError:
-            if self.priority != None:
-                future.cancel()
             code = bittensor.proto.ReturnCode.Timeout
             call_time = clock.time() - start_time
             message = "Request reached timeout"
@@ -431,6 +449,22 @@ class Axon( bittensor.grpc.BittensorServicer ):
                 synapses (:obj:`List[ 'bittensor.proto.Synapse' ]` of shape :obj:`(num_synapses)`, `required`):
                     Synapse wire protos with return codes from forward request.
         """
+        return self._run_steps( self._backward_steps( request ) )
+
+    def _backward_steps(self, request):
+        r""" Generator holding the backward request logic, see _forward_steps.
+            Args:
+                request (:obj:`bittensor.proto`, `required`): 
+                    Tensor request proto.
+            Returns:
+                response: (:obj:`bittensor.proto.Tensor, `required`): 
+                    serialized tensor gradient responses. This is always an empty vector until gradients are allowed.
+                code (:obj:`bittensor.proto.ReturnCode`, `required`):
+                    Code from the call. This specifies if the overall function call was a success. 
+                    This is separate from the synapse returns codes which relate to the individual synapse call. 
+                synapses (:obj:`List[ 'bittensor.proto.Synapse' ]` of shape :obj:`(num_synapses)`, `required`):
+                    Synapse wire protos with return codes from forward request.
+        """
 
         # ===================================================================
         # ==== First deserialize synapse wire protos to instance objects ====        
@@ -567,17 +601,23 @@ class Axon( bittensor.grpc.BittensorServicer ):
             if self.priority != None:
                 # No wait on backward calls.
                 priority = self.priority( request.hotkey, inputs_x = deserialized_forward_tensors, request_type = bittensor.proto.RequestType.BACKWARD )
-                self.priority_threadpool.submit(
-                    self.backward_callback, 
-                    inputs_x = deserialized_forward_tensors, 
-                    grads_dy = deserialized_forward_gradients,
-                    synapses = synapses,
-                    priority = priority
+                yield SimpleNamespace(
+                    callback = self.backward_callback,
+                    kwargs = dict( inputs_x = deserialized_forward_tensors, grads_dy = deserialized_forward_gradients, synapses = synapses ),
+                    priority = priority,
+                    timeout = self.backward_timeout,
+                    wait = False
                 )
 
             else:
                 # Calling default
-                backward_response_tensors, backward_codes, backward_messages = self.backward_callback ( deserialized_forward_tensors, deserialized_forward_gradients, synapses = synapses )
+                backward_response_tensors, backward_codes, backward_messages = yield SimpleNamespace(
+                    callback = self.backward_callback,
+                    kwargs = dict( inputs_x = deserialized_forward_tensors, grads_dy = deserialized_forward_gradients, synapses = synapses ),
+                    priority = None,
+                    timeout = self.backward_timeout,
+                    wait = True
+                )
             
                 # ========================================
                 # ==== Fill codes from forward calls ====
@@ -627,6 +667,36 @@ class Axon( bittensor.grpc.BittensorServicer ):
         finalize_codes_stats_and_logs()
         return [], bittensor.proto.ReturnCode.Success, request.synapses
 
+    def _run_steps( self, steps ):
+        r""" Drives a _forward_steps or _backward_steps generator, blocking the calling thread on each callback.
+        """
+        try:
+            call = next( steps )
+            while True:
+                try:
+                    result = self._call( call )
+                except Exception as e:
+                    call = steps.throw( e )
+                else:
+                    call = steps.send( result )
+        except StopIteration as stop:
+            return stop.value
+
+    def _call( self, call ):
+        r""" Runs the callback directly, or through the priority threadpool when the call has a priority.
+        """
+        if call.priority == None:
+            return call.callback( **call.kwargs )
+
+        future = self.priority_threadpool.submit( call.callback, priority = call.priority, **call.kwargs )
+        if not call.wait:
+            return None
+        try:
+            return future.result( timeout = call.timeout )
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
     def default_forward_callback(self, inputs_x:torch.FloatTensor, synapses=[], hotkey = None):
         """
             The default forward callback when no callback is attached: Is used to call specific synapse functions
@@ -653,15 +723,22 @@ class Axon( bittensor.grpc.BittensorServicer ):
         response_tensors = []
         response_codes = []
         response_messages = []
-        model_output = None
+        model_outputs = []
         
         # --- calling attached synapses ---
         for index, synapse in enumerate(synapses):
             try:
                 synapse_check =  self.synapse_checks(synapse, hotkey)
+                # --- share the model output of synapses with the same inputs ---
+                model_output = self.shared_model_output(model_outputs, inputs_x[index])
 
                 if synapse.synapse_type in self.synapse_callbacks and self.synapse_callbacks[synapse.synapse_type] != None and synapse_check:
-                    message, model_output, response_tensor = self.synapse_callbacks[synapse.synapse_type](inputs_x[index], synapse, model_output)
+                    if self.batcher != None and model_output == None and self.batcher.is_batchable(synapse):
+                        message, model_output, response_tensor = self.batcher(self.synapse_callbacks[synapse.synapse_type], inputs_x[index], synapse)
+                    else:
+                        message, model_output, response_tensor = self.synapse_callbacks[synapse.synapse_type](inputs_x[index], synapse, model_output)
+                    if model_output != None:
+                        model_outputs.append((inputs_x[index], model_output))
                     response_tensors.append(response_tensor)
                     response_codes.append(bittensor.proto.ReturnCode.Success)
                     response_messages.append('Success' if message is None else message)
@@ -684,6 +761,25 @@ class Axon( bittensor.grpc.BittensorServicer ):
         
         return response_tensors, response_codes, response_messages
 
+    @staticmethod
+    def shared_model_output(model_outputs: List[Tuple[torch.Tensor, object]], inputs: torch.Tensor) -> object:
+        r""" Returns the latest model output computed on inputs equal to the passed inputs, or None.
+
+            Args:
+                model_outputs (:obj:`List[Tuple[torch.Tensor, object]]`, `required`):
+                    (inputs, model_output) of the synapses called so far in the request.
+                inputs (:obj:`torch.Tensor`, `required`):
+                    The inputs of the next synapse.
+
+            Returns:
+                model_output (:obj:`object`):
+                    model output to pass to the synapse callback.
+        """
+        for shared_inputs, model_output in reversed(model_outputs):
+            if shared_inputs is inputs or (shared_inputs.dtype == inputs.dtype and shared_inputs.shape == inputs.shape and torch.equal(shared_inputs, inputs)):
+                return model_output
+        return None
+
     def default_backward_callback(self, inputs_x:torch.FloatTensor, grads_dy:torch.FloatTensor, synapses=[] ):
         """
             The default backward callback when no callback is attached: Is used to call specific synapse functions
@@ -925,12 +1021,12 @@ class Axon( bittensor.grpc.BittensorServicer ):
         """
         # Reindex the pubkey to uid if metagraph is present.
         try:
-            index = [ metagraph.hotkeys.index(pubkey) for pubkey in self.stats.requests_per_pubkey.keys() if pubkey in metagraph.hotkeys ]
+            uids = { pubkey: metagraph.hotkey_to_uid(pubkey) for pubkey in self.stats.requests_per_pubkey.keys() }
+            index = [ uid for uid in uids.values() if uid != -1 ]
             columns = [ 'axon_n_requested', 'axon_n_success', 'axon_query_time','axon_avg_inbytes','axon_avg_outbytes', 'axon_qps' ]
             dataframe = pandas.DataFrame(columns = columns, index = index)
-            for pubkey in self.stats.requests_per_pubkey.keys():
-                if pubkey in metagraph.hotkeys:
-                    uid = metagraph.hotkeys.index(pubkey)
+            for pubkey, uid in uids.items():
+                if uid != -1:
                     dataframe.loc[ uid ] = pandas.Series( {
                         'axon_n_requested': int(self.stats.requests_per_pubkey[pubkey]),
                         'axon_n_success': int(self.stats.requests_per_pubkey[pubkey]),
@@ -971,4 +1067,173 @@ class Axon( bittensor.grpc.BittensorServicer ):
             return wandb_data
         except Exception as e:
             bittensor.logging.error(prefix='failed during axon.to_wandb()', sufix=str(e))
-            return {} 
\ No newline at end of file
+            return {} 
+
+class AsyncAxon( Axon ):
+    r""" Services Forward and Backward requests on a grpc.aio server. Requests are awaited on an asyncio event loop
+        running in a background thread, so pending requests do not hold a thread while they wait for the model.
+
+        Callback calls wait in an asyncio priority queue, from which max_workers dispatchers hand them to the
+        priority threadpool one at a time each, so the threadpool queue never fills up however many requests are
+        pending. The request logic, which deserializes the inputs and serializes the responses, runs on a
+        bounded step threadpool rather than on the event loop.
+    """
+    def __init__( self, loop: asyncio.AbstractEventLoop, **kwargs ):
+        r""" Initializes a new asyncio Axon tensor processing endpoint.
+
+            Args:
+                loop (:obj:`asyncio.AbstractEventLoop`, `required`):
+                    Running event loop the grpc.aio server was created on, see AsyncAxon.new_event_loop.
+                kwargs:
+                    See Axon.__init__. A priority_threadpool is required.
+        """
+        super().__init__( **kwargs )
+        self.loop = loop
+        if self.priority_threadpool == None:
+            raise ValueError('AsyncAxon requires a priority_threadpool to run callbacks.')
+
+        self.step_threadpool = concurrent.futures.ThreadPoolExecutor( thread_name_prefix = 'AsyncAxonSteps' )
+        self._sequence = itertools.count()
+        async def create_queue():
+            # The queue and its dispatchers must be created on the axon event loop.
+            self._pending = asyncio.PriorityQueue()
+            self._dispatchers = [ asyncio.ensure_future( self._dispatch() ) for _ in range( self.priority_threadpool.max_workers ) ]
+        asyncio.run_coroutine_threadsafe( create_queue(), self.loop ).result()
+
+    def __str__(self) -> str:
+        return "AsyncAxon({}, {}, {}, {})".format( self.ip, self.port, self.wallet.hotkey.ss58_address, "started" if self.started else "stopped")
+
+    @staticmethod
+    def new_event_loop() -> asyncio.AbstractEventLoop:
+        r""" Creates a new event loop running forever in a daemon thread.
+        """
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread( target = loop.run_forever, name = 'AsyncAxonLoop', daemon = True )
+        thread.start()
+        return loop
+
+    @staticmethod
+    def new_server( loop: asyncio.AbstractEventLoop, **kwargs ) -> 'grpc.aio.Server':
+        r""" Creates a grpc.aio server bound to the passed loop. kwargs are passed to grpc.aio.server.
+        """
+        async def create_server():
+            return grpc.aio.server( **kwargs )
+        return asyncio.run_coroutine_threadsafe( create_server(), loop ).result()
+
+    async def Forward(self, request: bittensor.proto.TensorMessage, context: 'grpc.aio.ServicerContext') -> bittensor.proto.TensorMessage:
+        r""" The function called by remote GRPC Forward requests from other neurons, see Axon.Forward.
+        """
+        forward_response_tensors, code, synapses = await self._async_run_steps( self._forward_steps( request ) )
+        response = bittensor.proto.TensorMessage(
+            version = bittensor.__version_as_int__, 
+            hotkey = self.wallet.hotkey.ss58_address, 
+            return_code = code,
+            tensors = forward_response_tensors if forward_response_tensors is not None else [],
+            requires_grad = request.requires_grad,
+            synapses = synapses,
+        )
+        return response
+
+    async def Backward( self, request: bittensor.proto.TensorMessage, context: 'grpc.aio.ServicerContext' ) -> bittensor.proto.TensorMessage:
+        r""" The function called by remote GRPC Backward requests from other neurons, see Axon.Backward.
+        """
+        backward_response_tensors, code, synapses = await self._async_run_steps( self._backward_steps( request ) )
+        response = bittensor.proto.TensorMessage(
+            version = bittensor.__version_as_int__, 
+            hotkey = self.wallet.hotkey.ss58_address, 
+            return_code = code,
+            tensors = backward_response_tensors,
+            requires_grad = request.requires_grad,
+            synapses = synapses
+        )
+        return response
+
+    async def _async_run_steps( self, steps ):
+        r""" Drives a _forward_steps or _backward_steps generator, awaiting each callback.
+            The generator itself is advanced on the step threadpool.
+        """
+        done, call = await self.loop.run_in_executor( self.step_threadpool, self._step, steps )
+        while not done:
+            try:
+                result = await self._async_call( call )
+            except Exception as e:
+                done, call = await self.loop.run_in_executor( self.step_threadpool, self._step, steps, None, e )
+            else:
+                done, call = await self.loop.run_in_executor( self.step_threadpool, self._step, steps, result )
+        return call
+
+    @staticmethod
+    def _step( steps, result = None, exception = None ):
+        r""" Runs the request logic up to its next callback call.
+            Returns (False, call) or (True, request result) once the generator returns.
+        """
+        try:
+            if exception != None:
+                return False, steps.throw( exception )
+            return False, steps.send( result )
+        except StopIteration as stop:
+            return True, stop.value
+
+    async def _async_call( self, call ):
+        r""" Queues the callback by priority and awaits its result without blocking a thread.
+            Calls without a priority get a random one, as in the priority threadpool.
+        """
+        priority = call.priority if call.priority != None else random.randint( 0, 1000000 )
+        waiter = self.loop.create_future() if call.wait else None
+        self._pending.put_nowait( ( -priority, next( self._sequence ), call, waiter ) )
+        if waiter == None:
+            return None
+        try:
+            # A waiter cancelled on timeout is skipped by the dispatchers.
+            return await asyncio.wait_for( waiter, timeout = call.timeout )
+        except asyncio.TimeoutError:
+            # The request logic handles the concurrent.futures timeout, as the threaded axon does.
+            raise concurrent.futures.TimeoutError()
+
+    async def _dispatch( self ):
+        r""" Hands the highest priority pending call to the priority threadpool and awaits it, forever.
+        """
+        while True:
+            neg_priority, _, call, waiter = await self._pending.get()
+            if waiter != None and waiter.done():
+                continue
+            try:
+                future = self.priority_threadpool.submit( call.callback, priority = -neg_priority, **call.kwargs )
+                # The threadpool drops work items older than a block without resolving their future.
+                result = await asyncio.wait_for( asyncio.wrap_future( future ), timeout = bittensor.__blocktime__ )
+            except Exception as e:
+                if waiter != None and not waiter.done():
+                    waiter.set_exception( e )
+            else:
+                if waiter != None and not waiter.done():
+                    waiter.set_result( result )
+
+    def start(self) -> 'AsyncAxon':
+        r""" Starts the grpc.aio server on the axon event loop.
+        """
+        if self.started:
+            self.stop()
+
+        asyncio.run_coroutine_threadsafe( self.server.start(), self.loop ).result()
+        logger.success("Axon Started:".ljust(20) + "<blue>{}</blue>", self.ip + ':' + str(self.port))
+        self.started = True
+
+        # Switch prometheus ENUM.
+        if self.prometheus_level != bittensor.prometheus.level.OFF.name:
+            PROM_axon_is_started.state('started')
+
+        return self
+
+    def stop(self) -> 'AsyncAxon':
+        r""" Stop the grpc.aio server.
+        """
+        if self.server != None and self.started and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe( self.server.stop( grace = 1 ), self.loop ).result()
+            logger.success("Axon Stopped:".ljust(20) + "<blue>{}</blue>", self.ip + ':' + str(self.port))
+        self.started = False
+
+        # Switch prometheus ENUM.
+        if self.prometheus_level != bittensor.prometheus.level.OFF.name:
+            PROM_axon_is_started.state('stopped')
+
+        return self
@@ -0,0 +1,243 @@
+""" Implementation of the axon request batcher, which merges concurrent synapse calls into one model forward.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import copy
+import threading
+from collections.abc import Mapping, MutableMapping
+from typing import Callable, List, Tuple
+
+import torch
+
+import bittensor
+
+class _Batch:
+    r""" Synapse calls gathered for a single batched callback.
+    """
+    def __init__( self ):
+        self.inputs = []
+        self.num_tokens = 0
+        self.closed = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.exception = None
+
+class RequestBatcher:
+    r""" Gathers synapse calls which arrive within max_wait seconds of each other, up to max_tokens input tokens,
+        and runs them through the synapse callback as one batch. The callback outputs are split back along the
+        batch dimension and returned to each caller.
+
+        Calls are only merged when they target the same callback with the same synapse arguments and the same
+        sequence length, so that no padding is introduced into the std tokens sent by the callers.
+        The first caller of a batch runs it, the other callers wait on its result. The merged model output is
+        split back per call as well, so that it is still shared with the following synapses of each request.
+    """
+    # Synapses whose callback outputs are aligned with the batch dimension of the inputs,
+    # or compacted along it as for TEXT_CAUSAL_LM_NEXT.
+    batchable_synapse_types = [
+        bittensor.proto.Synapse.SynapseType.TEXT_LAST_HIDDEN_STATE,
+        bittensor.proto.Synapse.SynapseType.TEXT_CAUSAL_LM,
+        bittensor.proto.Synapse.SynapseType.TEXT_CAUSAL_LM_NEXT,
+    ]
+
+    def __init__( self, max_wait: float, max_tokens: int ):
+        r""" Initializes a new request batcher.
+            Args:
+                max_wait (:type:`float`, `required`):
+                    Seconds the first call of a batch waits for other calls to join.
+                max_tokens (:type:`int`, `required`):
+                    Maximum number of input tokens in a batch, a full batch runs immediately.
+        """
+        self.max_wait = max_wait
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def __str__( self ) -> str:
+        return "RequestBatcher({}, {})".format( self.max_wait, self.max_tokens )
+
+    def __repr__( self ) -> str:
+        return self.__str__()
+
+    def is_batchable( self, synapse: 'bittensor.Synapse' ) -> bool:
+        r""" Returns true if calls for this synapse can be merged.
+        """
+        return synapse.synapse_type in self.batchable_synapse_types
+
+    def __call__( self, callback: Callable, inputs_x: torch.Tensor, synapse: 'bittensor.Synapse' ) -> Tuple[str, object, torch.Tensor]:
+        r""" Runs the synapse callback on inputs_x as part of a batch.
+            Args:
+                callback (:obj:`Callable`, `required`):
+                    Synapse callback with signature (inputs_x, synapse, model_output) -> (message, model_output, tensor).
+                inputs_x (:obj:`torch.Tensor`, `required`):
+                    Request inputs of shape [batch_size, sequence_len].
+                synapse (:obj:`bittensor.Synapse`, `required`):
+                    Synapse of the request.
+
+            Returns:
+                message (:type:`str`):
+                    Message returned by the callback.
+                model_output (:obj:`object`):
+                    Model output of the callback for this request's inputs, see split_model_output.
+                response_tensor (:obj:`torch.Tensor`):
+                    Callback output for this request's inputs.
+        """
+        key = ( callback, synapse.synapse_type, tuple( inputs_x.shape[1:] ), synapse.serialize_to_instance_proto().SerializeToString() )
+        num_tokens = inputs_x.numel()
+
+        with self._lock:
+            batch = self._pending.get( key )
+            if batch != None and batch.num_tokens + num_tokens > self.max_tokens:
+                self._close( key, batch )
+                batch = None
+
+            is_leader = batch == None
+            if is_leader:
+                batch = _Batch()
+                self._pending[ key ] = batch
+            index = len( batch.inputs )
+            batch.inputs.append( inputs_x )
+            batch.num_tokens += num_tokens
+            if batch.num_tokens >= self.max_tokens:
+                self._close( key, batch )
+
+        if is_leader:
+            batch.closed.wait( timeout = self.max_wait )
+            with self._lock:
+                self._close( key, batch )
+            self._run( batch, callback, synapse )
+        else:
+            batch.done.wait()
+
+        if batch.exception != None:
+            raise batch.exception
+        return batch.results[ index ]
+
+    def _close( self, key, batch: _Batch ):
+        r""" Stops batch from accepting calls. Must be called with the lock held.
+        """
+        if self._pending.get( key ) is batch:
+            del self._pending[ key ]
+        batch.closed.set()
+
+    @staticmethod
+    def _run( batch: _Batch, callback: Callable, synapse: 'bittensor.Synapse' ):
+        r""" Runs the callback on the gathered inputs and scatters the outputs back to the batch results.
+        """
+        try:
+            if len( batch.inputs ) == 1:
+                batch.results = [ callback( batch.inputs[0], synapse, None ) ]
+            else:
+                batch.results = RequestBatcher.split_outputs( callback( torch.cat( batch.inputs ), synapse, None ), [ inputs.shape[0] for inputs in batch.inputs ], synapse )
+        except Exception as e:
+            batch.exception = e
+        finally:
+            batch.done.set()
+
+    @staticmethod
+    def split_outputs( outputs: Tuple[str, object, torch.Tensor], batch_sizes: List[int], synapse: 'bittensor.Synapse' = None ) -> List[Tuple[str, object, torch.Tensor]]:
+        r""" Splits the output of a merged callback back into per call outputs.
+            Args:
+                outputs (:obj:`Tuple[str, object, torch.Tensor]`, `required`):
+                    (message, model_output, response_tensor) returned by the merged callback.
+                batch_sizes (:obj:`List[int]`, `required`):
+                    Batch size of each merged call, in order.
+                synapse (:obj:`bittensor.Synapse`, `optional`):
+                    Synapse of the merged calls.
+
+            Returns:
+                outputs (:obj:`List[Tuple[str, object, torch.Tensor]]`):
+                    (message, model_output, response_tensor) for each call.
+        """
+        message, model_output, response_tensor = outputs
+        if synapse != None and synapse.synapse_type == bittensor.proto.Synapse.SynapseType.TEXT_CAUSAL_LM_NEXT:
+            response_tensors = RequestBatcher.split_compact_topk( response_tensor, batch_sizes, synapse.topk )
+        elif response_tensor.shape[0] != sum( batch_sizes ):
+            raise ValueError( 'Batched synapse callback returned {} rows for {} inputs'.format( response_tensor.shape[0], sum( batch_sizes ) ) )
+        else:
+            response_tensors = response_tensor.split( batch_sizes )
+        try:
+            model_outputs = RequestBatcher.split_model_output( model_output, batch_sizes )
+        except Exception:
+            # The model output is then not shared with the following synapses of the requests.
+            model_outputs = [ None ] * len( batch_sizes )
+        return [ ( message, model_output, tensor ) for model_output, tensor in zip( model_outputs, response_tensors ) ]
+
+    @staticmethod
+    def split_model_output( model_output: object, batch_sizes: List[int] ) -> List[object]:
+        r""" Splits the model output of a merged callback back into the model output of each merged call.
+            Tensors whose first dimension is the merged batch are split along it. Tuples, lists and mappings,
+            such as transformers model outputs and the tokens attached to them, are split recursively.
+            Any other value is shared by every call.
+            Args:
+                model_output (:obj:`object`, `required`):
+                    Model output returned by the merged callback.
+                batch_sizes (:obj:`List[int]`, `required`):
+                    Batch size of each merged call, in order.
+
+            Returns:
+                model_outputs (:obj:`List[object]`):
+                    Model output of each call.
+        """
+        if isinstance( model_output, torch.Tensor ):
+            if model_output.dim() > 0 and model_output.shape[0] == sum( batch_sizes ):
+                return list( model_output.split( batch_sizes ) )
+            return [ model_output ] * len( batch_sizes )
+
+        if isinstance( model_output, ( tuple, list ) ) and not hasattr( model_output, '_fields' ):
+            parts = [ RequestBatcher.split_model_output( value, batch_sizes ) for value in model_output ]
+            return [ type( model_output )( part[ i ] for part in parts ) for i in range( len( batch_sizes ) ) ]
+
+        if isinstance( model_output, Mapping ):
+            model_outputs = [ copy.copy( model_output ) for _ in batch_sizes ]
+            if isinstance( model_output, MutableMapping ):
+                for key, value in list( model_output.items() ):
+                    for split_output, part in zip( model_outputs, RequestBatcher.split_model_output( value, batch_sizes ) ):
+                        split_output[ key ] = part
+            # Attributes, such as the tokens the server attaches to its model outputs.
+            for name, value in getattr( model_output, '__dict__', {} ).items():
+                for split_output, part in zip( model_outputs, RequestBatcher.split_model_output( value, batch_sizes ) ):
+                    split_output.__dict__[ name ] = part
+            return model_outputs
+
+        return [ model_output ] * len( batch_sizes )
+
+    @staticmethod
+    def split_compact_topk( compact_topk: torch.Tensor, batch_sizes: List[int], topk: int ) -> List[torch.Tensor]:
+        r""" Splits a compacted topk token phrases tensor back into the compacted tensors of each merged call.
+            Each batch item starts at the probability of its first phrase, probabilities being the only values
+            in [0, 1] since compact_topk_token_phrases offsets the token ids by 2.
+            Args:
+                compact_topk (:obj:`torch.Tensor`, `required`):
+                    [sum_b(sum_k(len(phrase_k) + 1)_b)] compacted 1-D tensor returned by the merged callback.
+                batch_sizes (:obj:`List[int]`, `required`):
+                    Batch size of each merged call, in order.
+                topk (:obj:`int`, `required`):
+                    Number of top phrases of each batch item.
+
+            Returns:
+                compact_topks (:obj:`List[torch.Tensor]`):
+                    Compacted 1-D tensor of each call.
+        """
+        atol = 1e-6
+        prob_idx = torch.where( ( -atol < compact_topk ) & ( compact_topk < 1 + atol ) )[0]
+        if len( prob_idx ) != sum( batch_sizes ) * ( topk + 1 ):
+            raise ValueError( 'Batched synapse callback returned {} topk probabilities for {} inputs with topk {}'.format( len( prob_idx ), sum( batch_sizes ), topk ) )
+        item_starts = prob_idx[ ::topk + 1 ].tolist() + [ len( compact_topk ) ]
+        call_starts = [ item_starts[ sum( batch_sizes[ :i ] ) ] for i in range( len( batch_sizes ) + 1 ) ]
+        return list( compact_topk.split( [ end - start for start, end in zip( call_starts[ :-1 ], call_starts[ 1: ] ) ] ) )
@@ -47,6 +47,10 @@ class dataset:
             save_dataset: bool=None,
             no_tokenizer: bool=None,
             num_batches: int = None,
+            tokenizer_workers: int = None,
+            cache_size: float = None,
+            seed: int = None,
+            prefetch_batches: int = None,
             _mock:bool=None
         ):
         r""" Create and init the GenesisTextDataset class, which handles dataloading from ipfs.
@@ -68,6 +72,14 @@ class dataset:
                     To return non-tokenized text (EXPERIMENTAL, DO NOT USE)
                 num_batches (:obj:`int`, `optional`):
                     The number of batches of data to prepare for the dataloader.
+                tokenizer_workers (:obj:`int`, `optional`):
+                    Number of processes tokenizing the downloaded text, 0 to tokenize in the producer thread.
+                cache_size (:obj:`float`, `optional`):
+                    Maximum size of the local dataset cache in MB, beyond which the least recently used files are evicted.
+                seed (:obj:`int`, `optional`):
+                    Seed of the random choices of the dataset, random if not set.
+                prefetch_batches (:obj:`int`, `optional`):
+                    Number of ready batches kept in the queue of the dataset.
                 _mock (:obj:`bool`, `optional`):
                     For testing, if true the dataset if filled with fake text data.  
         """   
@@ -81,6 +93,10 @@ class dataset:
         config.dataset.save_dataset = save_dataset if save_dataset != None else config.dataset.save_dataset
         config.dataset.no_tokenizer = no_tokenizer if no_tokenizer != None else config.dataset.no_tokenizer
         config.dataset.num_batches = num_batches if num_batches != None else config.dataset.num_batches
+        config.dataset.tokenizer_workers = tokenizer_workers if tokenizer_workers != None else config.dataset.tokenizer_workers
+        config.dataset.cache_size = cache_size if cache_size != None else config.dataset.cache_size
+        config.dataset.seed = seed if seed != None else config.dataset.seed
+        config.dataset.prefetch_batches = prefetch_batches if prefetch_batches != None else config.dataset.prefetch_batches
         config.dataset._mock = _mock if _mock != None else config.dataset._mock
         dataset.check_config( config )
         if config.dataset._mock:
@@ -94,7 +110,11 @@ class dataset:
                 max_datasets = config.dataset.max_datasets,
                 no_tokenizer = config.dataset.no_tokenizer,
                 num_batches = config.dataset.num_batches,
-                max_directories = config.dataset.max_directories
+                max_directories = config.dataset.max_directories,
+                tokenizer_workers = config.dataset.tokenizer_workers,
+                cache_size = config.dataset.cache_size,
+                seed = config.dataset.seed,
+                prefetch_batches = config.dataset.prefetch_batches
             )
         else:
             return dataset_impl.GenesisTextDataset(
@@ -107,7 +127,11 @@ class dataset:
                 max_datasets = config.dataset.max_datasets,
                 no_tokenizer = config.dataset.no_tokenizer,
                 num_batches = config.dataset.num_batches,
-                max_directories = config.dataset.max_directories
+                max_directories = config.dataset.max_directories,
+                tokenizer_workers = config.dataset.tokenizer_workers,
+                cache_size = config.dataset.cache_size,
+                seed = config.dataset.seed,
+                prefetch_batches = config.dataset.prefetch_batches
             )
 
     @classmethod
@@ -139,6 +163,10 @@ class dataset:
             parser.add_argument('--' + prefix_str + 'dataset.max_datasets',  type=int, help='Number of datasets to load', default = bittensor.defaults.dataset.max_datasets)
             parser.add_argument('--' + prefix_str + 'dataset.no_tokenizer', action='store_true', help='To return non-tokenized text (EXPERIMENTAL, DO NOT USE)',default=False)
             parser.add_argument('--' + prefix_str + 'dataset.num_batches', type=int, help='The number of data to download each time(measured by the number of batches).', default=bittensor.defaults.dataset.num_batches)
+            parser.add_argument('--' + prefix_str + 'dataset.tokenizer_workers', type=int, help='Number of processes tokenizing the downloaded text, 0 to tokenize in the producer thread.', default=bittensor.defaults.dataset.tokenizer_workers)
+            parser.add_argument('--' + prefix_str + 'dataset.cache_size', type=float, help='Maximum size of the local dataset cache in MB, beyond which the least recently used files are evicted.', default=bittensor.defaults.dataset.cache_size)
+            parser.add_argument('--' + prefix_str + 'dataset.seed', type=int, help='Seed of the random choices of the dataset, random if not set.', default=bittensor.defaults.dataset.seed)
+            parser.add_argument('--' + prefix_str + 'dataset.prefetch_batches', type=int, help='Number of ready batches kept in the queue of the dataset.', default=bittensor.defaults.dataset.prefetch_batches)
             parser.add_argument('--' + prefix_str + 'dataset._mock', action='store_true', help='To turn on dataset mocking for testing purposes.', default=False)
             parser.add_argument('--' + prefix_str + 'dataset.max_directories', type=int, help='Maximum number of directories to consider when loading text from IPFS', default=bittensor.defaults.dataset.max_directories)
 
@@ -169,6 +197,10 @@ class dataset:
         defaults.dataset.max_datasets = os.getenv('BT_DATASET_MAX_DATASETS') if os.getenv('BT_DATASET_MAX_DATASETS') != None else 3
         defaults.dataset.num_batches = os.getenv('BT_DATASET_NUM_BATCHES') if os.getenv('BT_DATASET_NUM_BATCHES') != None else 500
         defaults.dataset.max_directories = os.getenv('BT_DATASET_MAX_DIRECTORIES') if os.getenv('BT_DATASET_MAX_DIRECTORIES') != None else 250
+        defaults.dataset.tokenizer_workers = os.getenv('BT_DATASET_TOKENIZER_WORKERS') if os.getenv('BT_DATASET_TOKENIZER_WORKERS') != None else 1
+        defaults.dataset.cache_size = os.getenv('BT_DATASET_CACHE_SIZE') if os.getenv('BT_DATASET_CACHE_SIZE') != None else 1024
+        defaults.dataset.prefetch_batches = os.getenv('BT_DATASET_PREFETCH_BATCHES') if os.getenv('BT_DATASET_PREFETCH_BATCHES') != None else 2
+        defaults.dataset.seed = int(os.getenv('BT_DATASET_SEED')) if os.getenv('BT_DATASET_SEED') != None else None
 
     @classmethod
     def check_config( cls, config: 'bittensor.Config' ):
@@ -177,4 +209,7 @@ class dataset:
         assert config.dataset.batch_size > 0, 'Batch size must be larger than 0'
         assert config.dataset.block_size > 0, 'Block size must be larger than 0'
         assert config.dataset.num_workers >= 0, 'num_workers must be equal to or larger than 0'
+        assert config.dataset.tokenizer_workers >= 0, 'tokenizer_workers must be equal to or larger than 0'
+        assert config.dataset.cache_size > 0, 'cache_size must be larger than 0'
+        assert config.dataset.prefetch_batches > 0, 'prefetch_batches must be larger than 0'
         assert isinstance(config.dataset.save_dataset, bool) , 'save_dataset must be True/False only'
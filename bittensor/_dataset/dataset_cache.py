@@ -0,0 +1,258 @@
+""" Catalog of the local dataset cache, which holds the files downloaded from IPFS and their token shards.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from loguru import logger
+
+from . import token_shards
+
+logger = logger.opt(colors=True)
+
+# Name of the catalog in the data directory.
+CATALOG_NAME = 'catalog.sqlite'
+# Folders of the dataset listings, which are never evicted.
+PINNED_FOLDERS = ('meta_data', 'mountain')
+# Estimate of the bytes of text per token, for files which were not tokenized yet.
+BYTES_PER_TOKEN = 4
+
+class DatasetCache:
+    r""" Content-addressed catalog of the files in the data directory, keyed by their IPFS hash.
+
+        Each entry holds the folder of the file, the bytes of its text and token shard, its number of tokens and
+        its last access. The size of each folder is kept in the catalog alongside the entries, so that sizes are
+        read without walking the data directory, and the least recently used entries are evicted once the cache
+        is larger than max_size. The catalog is shared by every process using the data directory.
+    """
+    def __init__( self, data_dir: str, max_size: int ):
+        r""" Opens the catalog of data_dir, indexing the files already in data_dir when it is created.
+            Args:
+                data_dir (:obj:`str`, `required`):
+                    Data directory of the dataset.
+                max_size (:obj:`int`, `required`):
+                    Maximum number of bytes of the cache.
+        """
+        self.data_dir = os.path.expanduser( data_dir )
+        self.max_size = max_size
+        os.makedirs( self.data_dir, exist_ok = True )
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect( os.path.join( self.data_dir, CATALOG_NAME ), timeout = 60, check_same_thread = False, isolation_level = None )
+        with self._transaction() as cursor:
+            created = cursor.execute( "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'files'" ).fetchone() == None
+            cursor.execute( 'CREATE TABLE IF NOT EXISTS files ( hash TEXT PRIMARY KEY, folder TEXT NOT NULL, text_size INTEGER NOT NULL DEFAULT 0, '
+                            'shard_size INTEGER NOT NULL DEFAULT 0, tokens INTEGER NOT NULL DEFAULT 0, pinned INTEGER NOT NULL DEFAULT 0, last_access REAL NOT NULL )' )
+            cursor.execute( 'CREATE INDEX IF NOT EXISTS files_last_access ON files ( pinned, last_access )' )
+            cursor.execute( 'CREATE INDEX IF NOT EXISTS files_folder ON files ( folder )' )
+            cursor.execute( 'CREATE TABLE IF NOT EXISTS folders ( folder TEXT PRIMARY KEY, size INTEGER NOT NULL )' )
+        if created:
+            self.index_data_dir()
+
+    def close( self ):
+        with self._lock:
+            self._connection.close()
+
+    @contextmanager
+    def _transaction( self ):
+        r""" Runs the statements of the block in a write transaction, which other processes wait on.
+        """
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute( 'BEGIN IMMEDIATE' )
+            try:
+                yield cursor
+                cursor.execute( 'COMMIT' )
+            except BaseException:
+                cursor.execute( 'ROLLBACK' )
+                raise
+
+    def _update( self, cursor, folder: str, file_hash: str, text_size: int = None, shard_size: int = None, tokens: int = None, pinned: bool = False ):
+        row = cursor.execute( 'SELECT folder, text_size, shard_size, tokens FROM files WHERE hash = ?', ( file_hash, ) ).fetchone()
+        if row != None:
+            folder, old_text_size, old_shard_size, old_tokens = row
+        else:
+            old_text_size, old_shard_size, old_tokens = 0, 0, 0
+        text_size = old_text_size if text_size == None else text_size
+        shard_size = old_shard_size if shard_size == None else shard_size
+        tokens = old_tokens if tokens == None else tokens
+        cursor.execute( 'INSERT OR REPLACE INTO files ( hash, folder, text_size, shard_size, tokens, pinned, last_access ) VALUES ( ?, ?, ?, ?, ?, ?, ? )',
+                        ( file_hash, folder, text_size, shard_size, tokens, int( pinned or folder in PINNED_FOLDERS ), time.time() ) )
+        self._add_folder_size( cursor, folder, text_size + shard_size - old_text_size - old_shard_size )
+
+    def _add_folder_size( self, cursor, folder: str, size: int ):
+        cursor.execute( 'INSERT OR IGNORE INTO folders ( folder, size ) VALUES ( ?, 0 )', ( folder, ) )
+        cursor.execute( 'UPDATE folders SET size = size + ? WHERE folder = ?', ( size, folder ) )
+
+    def index_data_dir( self ):
+        r""" Adds the files in the data directory to the catalog, once when the catalog is created.
+        """
+        with self._transaction() as cursor:
+            for folder in os.listdir( self.data_dir ):
+                folder_path = os.path.join( self.data_dir, folder )
+                if not os.path.isdir( folder_path ):
+                    continue
+                for file_name in os.listdir( folder_path ):
+                    path = os.path.join( folder_path, file_name )
+                    if file_name.endswith( '.tmp' ) or os.path.islink( path ):
+                        continue
+                    try:
+                        if file_name.endswith( token_shards.TOKEN_SHARD_SUFFIX ):
+                            tokens = len( token_shards.load_token_shard( path ) )
+                            self._update( cursor, folder, file_name[ :-len( token_shards.TOKEN_SHARD_SUFFIX ) ], shard_size = os.path.getsize( path ), tokens = tokens )
+                        else:
+                            self._update( cursor, folder, file_name, text_size = os.path.getsize( path ) )
+                    except Exception as E:
+                        logger.warning( "Could not index:".ljust(20) + "<blue>{}</blue> {}".format( path, E ) )
+
+    def path( self, file_hash: str ) -> Optional[str]:
+        r""" Returns the path of the text of file_hash, None if it is not in the cache.
+        """
+        folder = self.folder( file_hash )
+        return None if folder == None else os.path.join( self.data_dir, folder, file_hash )
+
+    def folder( self, file_hash: str ) -> Optional[str]:
+        r""" Returns the folder of file_hash, None if it is not in the cache.
+        """
+        with self._lock:
+            row = self._connection.execute( 'SELECT folder FROM files WHERE hash = ?', ( file_hash, ) ).fetchone()
+        return None if row == None else row[0]
+
+    def tokens( self, file_hash: str ) -> int:
+        r""" Returns the number of tokens of file_hash, 0 if it was not tokenized.
+        """
+        with self._lock:
+            row = self._connection.execute( 'SELECT tokens FROM files WHERE hash = ?', ( file_hash, ) ).fetchone()
+        return 0 if row == None else row[0]
+
+    def add_text( self, folder: str, file_hash: str, size: int ):
+        r""" Records the text of file_hash, of size bytes, saved in folder.
+        """
+        with self._transaction() as cursor:
+            self._update( cursor, folder, file_hash, text_size = size )
+        self.evict()
+
+    def add_shard( self, folder: str, file_hash: str, size: int, tokens: int ):
+        r""" Records the token shard of file_hash, of size bytes and tokens tokens, saved in folder.
+        """
+        with self._transaction() as cursor:
+            self._update( cursor, folder, file_hash, shard_size = size, tokens = tokens )
+        self.evict()
+
+    def touch( self, file_hash: str ):
+        r""" Marks file_hash as accessed now.
+        """
+        with self._transaction() as cursor:
+            cursor.execute( 'UPDATE files SET last_access = ? WHERE hash = ?', ( time.time(), file_hash ) )
+
+    def remove( self, file_hash: str ):
+        r""" Deletes the text and token shard of file_hash and removes it from the catalog.
+        """
+        with self._transaction() as cursor:
+            self._remove( cursor, file_hash )
+
+    def _remove( self, cursor, file_hash: str ):
+        row = cursor.execute( 'SELECT folder, text_size, shard_size FROM files WHERE hash = ?', ( file_hash, ) ).fetchone()
+        if row == None:
+            return
+        folder, text_size, shard_size = row
+        path = os.path.join( self.data_dir, folder, file_hash )
+        for file_path in [ path, path + token_shards.TOKEN_SHARD_SUFFIX ]:
+            try:
+                os.remove( file_path )
+            except FileNotFoundError:
+                pass
+        cursor.execute( 'DELETE FROM files WHERE hash = ?', ( file_hash, ) )
+        self._add_folder_size( cursor, folder, -text_size - shard_size )
+
+    def size( self ) -> int:
+        r""" Returns the number of bytes in the cache.
+        """
+        with self._lock:
+            return self._connection.execute( 'SELECT COALESCE( SUM( size ), 0 ) FROM folders' ).fetchone()[0]
+
+    def folder_size( self, folder: str ) -> int:
+        r""" Returns the number of bytes of folder in the cache.
+        """
+        with self._lock:
+            row = self._connection.execute( 'SELECT size FROM folders WHERE folder = ?', ( folder, ) ).fetchone()
+        return 0 if row == None else row[0]
+
+    def folders( self ) -> List[str]:
+        r""" Returns the folders of the unpinned files in the cache.
+        """
+        with self._lock:
+            return [ row[0] for row in self._connection.execute( 'SELECT DISTINCT folder FROM files WHERE pinned = 0' ) ]
+
+    def evict( self ) -> int:
+        r""" Evicts the least recently used files which are not pinned, until the cache is at most max_size bytes.
+            Returns:
+                evicted (:obj:`int`):
+                    Number of evicted files.
+        """
+        evicted = 0
+        with self._transaction() as cursor:
+            size = cursor.execute( 'SELECT COALESCE( SUM( size ), 0 ) FROM folders' ).fetchone()[0]
+            while size > self.max_size:
+                rows = cursor.execute( 'SELECT hash, text_size + shard_size FROM files WHERE pinned = 0 ORDER BY last_access LIMIT 64' ).fetchall()
+                if len( rows ) == 0:
+                    break
+                for file_hash, file_size in rows:
+                    if size <= self.max_size:
+                        break
+                    self._remove( cursor, file_hash )
+                    size -= file_size
+                    evicted += 1
+        if evicted > 0:
+            logger.success( "Evicted from cache:".ljust(20) + "<blue>{} files</blue>".format( evicted ) )
+        return evicted
+
+    def sample( self, folders: List[str], min_tokens: int, rng: random.Random = random ) -> List[dict]:
+        r""" Picks random files of folders from the catalog, until their tokens add up to more than min_tokens.
+            The tokens of files which were not tokenized yet are estimated from the size of their text.
+            Args:
+                folders (:obj:`List[str]`, `required`):
+                    Folders to pick files from.
+                min_tokens (:obj:`int`, `required`):
+                    Minimum number of tokens of the picked files.
+                rng (:obj:`random.Random`, `optional`):
+                    Random number generator the files are picked with.
+
+            Returns:
+                files (:obj:`List[dict]`):
+                    The picked files, in the format of {'Name': , 'Folder': , 'Hash': , 'Tokens': }.
+        """
+        if len( folders ) == 0:
+            return []
+        with self._lock:
+            rows = self._connection.execute( 'SELECT hash, folder, tokens, text_size FROM files WHERE pinned = 0 AND folder IN ({}) ORDER BY hash'.format( ', '.join( '?' * len( folders ) ) ),
+                                             tuple( folders ) ).fetchall()
+        rng.shuffle( rows )
+        files = []
+        total_tokens = 0
+        for file_hash, folder, tokens, text_size in rows:
+            if total_tokens > min_tokens:
+                break
+            files.append( { 'Name': file_hash, 'Folder': folder, 'Hash': file_hash, 'Tokens': tokens } )
+            total_tokens += tokens if tokens > 0 else text_size // BYTES_PER_TOKEN
+        return files
@@ -19,12 +19,14 @@
 
 import concurrent
 import json
+import multiprocessing
 import os
 import random
-import time
+import threading
 from multiprocessing import cpu_count
 from typing import Union
 
+import numpy
 import requests
 import torch
 from loguru import logger
@@ -34,6 +36,8 @@ from torch.utils.data.dataloader import DataLoader
 
 import bittensor
 
+from . import token_shards
+from .dataset_cache import DatasetCache
 from .thread_queue import ThreadQueue
 
 logger = logger.opt(colors=True)
@@ -50,6 +54,31 @@ class Dataset:
         self.mountain_hash = 'QmSdDg6V9dgpdAFtActs75Qfc36qJtm9y8a7yrQ1rHm7ZX'
         # Used when current corpus has been exhausted
         self.refresh_corpus = False
+        # Client of the IPFS requests, sharing one pool of keep-alive connections.
+        self.ipfs = bittensor.Ipfs()
+        # Set to stop the downloads in flight once enough data was downloaded.
+        self.downloads_cancelled = threading.Event()
+
+    def state_dict(self):
+        r""" Returns the position of the iteration over the dataset, to resume from with load_state_dict.
+        """
+        return {}
+
+    def load_state_dict(self, state_dict):
+        r""" Resumes the iteration over the dataset from a state_dict returned by state_dict.
+        """
+        pass
+
+    def save(self, path):
+        r""" Saves the position of the iteration over the dataset to path/dataset.torch.
+        """
+        torch.save(self.state_dict(), '{}/dataset.torch'.format(path))
+
+    def load(self, path):
+        r""" Resumes the iteration over the dataset from path/dataset.torch, if it was saved.
+        """
+        if os.path.exists('{}/dataset.torch'.format(path)):
+            self.load_state_dict(torch.load('{}/dataset.torch'.format(path)))
         
 
     @staticmethod
@@ -84,7 +113,7 @@ class Dataset:
         session.mount('https://', adapter)
         return session
 
-    def get_ipfs_directory(self, address: str, file_meta: dict, action: str = 'post', timeout : int = 180):
+    def get_ipfs_directory(self, address: str, file_meta: dict, action: str = 'post', timeout : int = 180, cancelled: threading.Event = None):
         r"""Connects to IPFS gateway and retrieves directory.
         Args:
             address: (:type:`str`, required):
@@ -95,17 +124,15 @@ class Dataset:
                 POST or GET.
             timeout: (:type:`int`, optional):
                 Timeout for getting the server's response. 
+            cancelled: (:type:`threading.Event`, optional):
+                Stops the download once set, in which case None is returned.
         Returns:
             dict: A dictionary of the files inside of the genesis_datasets and their hashes.
         """
-        session = requests.Session()
-        session.params.update((('arg', file_meta['Hash']), ))
-        
         try:
-            if action == 'get':
-                response = self.requests_retry_session(session=session).get(address, timeout=timeout)
-            elif action == 'post':
-                response = self.requests_retry_session(session=session).post(address, timeout=timeout)
+            response = self.ipfs.retrieve_directory(address, (('arg', file_meta['Hash']), ), action = action, timeout = timeout, cancelled = cancelled)
+            if response == None:
+                return None
             logger.success("Loaded from IPFS:".ljust(20) + "<blue>{}</blue>".format(file_meta['Name']))
 
         except Exception as E:
@@ -136,7 +163,11 @@ class GenesisTextDataset( Dataset ):
         max_datasets,
         no_tokenizer, 
         num_batches,
-        max_directories
+        max_directories,
+        tokenizer_workers = 1,
+        cache_size = 1024,
+        seed = None,
+        prefetch_batches = 2
     ):
         super().__init__()
         self.block_size = block_size
@@ -148,29 +179,56 @@ class GenesisTextDataset( Dataset ):
         self.save_dataset = save_dataset
         self.datafile_size_bound = 262158
         self.max_datasets = max_datasets
-        self.__infinite_dataset_iterator = None
         self.no_tokenizer = no_tokenizer
         self.IPFS_fails = 0
-        self.backup_dataset_cap_size = 5e7 # set 50MB limit per folder
         self.IPFS_fails_max = 10
         self.num_batches = num_batches
         self.max_directories = max_directories
 
-        # Retrieve a random slice of the genesis dataset
-        self.data = []
-        self.data_reserved = []
+        # All the random choices of the dataset are made by its own generator, so that a seed reproduces them.
+        self.seed = seed if seed != None else random.randrange(2 ** 32)
+        self.random = random.Random(self.seed)
+        # State of the generator when the reserved data was last extended or taken, which state_dict saves
+        # along with that data, while the producer keeps drawing from the generator for the next download.
+        self.random_state = self.random.getstate()
+
+        # Retrieve a random slice of the genesis dataset, as token shards.
+        self.data = token_shards.TokenCorpus()
+        self.data_reserved = token_shards.TokenCorpus()
+
+        # Downloaded texts are tokenized in batches of tokenizer_batch_size by a pool of tokenizer_workers processes.
+        self.tokenizer_workers = tokenizer_workers
+        self.tokenizer_batch_size = 8
+        self.tokenizer_pool = None
+
+        # Batches are produced by the data queue for the data generation, which set_data_size moves on.
+        # The lock is reentrant since dataloader may reserve data while produce_batch holds it.
+        self.data_generation = 0
+        self.data_size_lock = threading.RLock()
+        self.batch_generation = None
+        self.batch_iterator = None
+
+        # The shards and dataloader seed of each epoch made by the producer, and the epoch and number of batches
+        # consumed by __next__, from which state_dict saves the position of the iteration.
+        self.epoch = 0
+        self.epochs = {}
+        self.position = None
+        self.resume_state = None
+        self.resume_epoch = None
 
         # Used to refresh corpus if we've exhausted the whole dataset
         self.refresh_corpus = True
 
-        self.build_hash_table()
+        # Catalog of the files saved in data_dir, which evicts the least recently used files beyond cache_size MB.
+        self.cache = DatasetCache(data_dir, max_size = int(cache_size * 2 ** 20))
 
-        os.makedirs(os.path.expanduser(data_dir), exist_ok=True)
+        self.build_hash_table()
             
+        # Up to prefetch_batches ready batches are kept in the queue.
         self.data_queue = ThreadQueue(
-            producer_target = self.reserve_multiple_data,
-            producer_arg = (self.num_batches, ),
-            buffer_size = 1
+            producer_target = self.produce_batch,
+            producer_arg = (),
+            buffer_size = prefetch_batches
         )
 
     def __del__(self):
@@ -178,6 +236,10 @@ class GenesisTextDataset( Dataset ):
 
     def close(self):
         self.data_queue.close()
+        if self.tokenizer_pool != None:
+            self.tokenizer_pool.shutdown()
+            self.tokenizer_pool = None
+        self.cache.close()
 
     def get_folder_size(self, folder):
         r""" Get the size (in byte) of a folder inside the data_dir.
@@ -187,18 +249,15 @@ class GenesisTextDataset( Dataset ):
         
         Returns:
             total_size (int):
-                The memory size of the folder (in byte). 
+                The memory size of the folder (in byte), as recorded by the cache. 
         """
-        total_size = 0
-        full_path = os.path.expanduser(os.path.join(self.data_dir, folder))
-        for dirpath, dirnames, filenames in os.walk(full_path):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                # skip if it is symbolic link
-                if not os.path.islink(fp):
-                    total_size += os.path.getsize(fp)
+        return self.cache.folder_size(folder)
 
-        return total_size
+    def file_path(self, file_meta):
+        r""" Returns the path of a file in the data_dir. Files are found by their hash, in the folder the cache has them in.
+        """
+        folder = self.cache.folder(file_meta['Hash'])
+        return os.path.expanduser(os.path.join(self.data_dir, folder if folder != None else file_meta['Folder'], file_meta['Hash']))
 
     def load_hash(self, file_meta):
         r""" Load a hash from disk.
@@ -210,13 +269,14 @@ class GenesisTextDataset( Dataset ):
             text (str): 
                 The text in the file.                
         """
-
-        full_path = os.path.expanduser(os.path.join(self.data_dir, file_meta['Folder'], file_meta['Hash']))
+        text = None
+        full_path = self.file_path(file_meta)
         if os.path.exists(full_path):
             try:
                 with open(full_path, mode='r') as f:
                     text = f.read()
 
+                self.cache.touch(file_meta['Hash'])
                 logger.success("Loaded from disk:".ljust(20) + "<blue>{}</blue>".format(file_meta['Name']))
             except Exception:
                 logger.success("Could not load from disk:".ljust(20) + "<blue>{}</blue>".format(file_meta['Name']))
@@ -238,14 +298,13 @@ class GenesisTextDataset( Dataset ):
             text (str):
                 The text in the file.                
         """
-        folder_path = os.path.expanduser(os.path.join(self.data_dir, file_meta['Folder']))
-        full_path = os.path.expanduser(os.path.join(self.data_dir, file_meta['Folder'], file_meta['Hash']))
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
+        full_path = self.file_path(file_meta)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
         try:
             with open(full_path, mode = 'w+') as f:
                 f.write(text)
                 logger.success("Saved:".ljust(20) + "<blue>{}</blue>".format(file_meta['Name']))
+            self.cache.add_text(file_meta['Folder'], file_meta['Hash'], os.path.getsize(full_path))
             return True
         
         except Exception as E:
@@ -263,14 +322,17 @@ class GenesisTextDataset( Dataset ):
                 The text that we get from the file (from disk or IPFS).     
         """
         text = None
-        response = self.get_ipfs_directory(self.text_dir, file_meta)
+        response = self.get_ipfs_directory(self.text_dir, file_meta, cancelled = self.downloads_cancelled)
         if (response != None) and (response.status_code == 200):
             text = response.text
             self.IPFS_fails = 0
             
-            if self.save_dataset and self.dataset_hashes[file_meta['Folder']]['Size'] < self.backup_dataset_cap_size:
+            if self.save_dataset:
                 self.save_hash( file_meta, text )
-                self.dataset_hashes[file_meta['Folder']]['Size'] += file_meta['Size']
+
+        elif self.downloads_cancelled.is_set():
+            # The download was stopped as enough data was downloaded.
+            pass
             
         else:
             logger.warning("Failed to get text".ljust(20) + "<blue>{}</blue>".format(file_meta['Name']))
@@ -278,6 +340,117 @@ class GenesisTextDataset( Dataset ):
             
         return text 
 
+    def token_shard_path(self, file_meta):
+        r""" Returns the path of the token shard of a file.
+        """
+        return self.file_path(file_meta) + token_shards.TOKEN_SHARD_SUFFIX
+
+    def load_token_shard(self, file_meta):
+        r""" Memory-maps the token shard of a file.
+        Args:
+            file_meta (dict of str: int):
+                Specify the details of the file in the format of {'Name': , 'Hash':}.
+
+        Return:
+            tokens (numpy.ndarray):
+                The tokens of the file, None if the file has no token shard.
+        """
+        full_path = self.token_shard_path(file_meta)
+        if os.path.exists(full_path):
+            try:
+                tokens = token_shards.load_token_shard(full_path)
+                self.cache.touch(file_meta['Hash'])
+                return tokens
+            except Exception as E:
+                logger.warning("Could not load token shard:".ljust(20) + "<blue>{}</blue> {}".format(file_meta['Name'], E))
+        return None
+
+    def save_token_shard(self, file_meta, tokens):
+        r""" Saves the tokens of a file to its token shard.
+        Args:
+            file_meta (dict of str: int):
+                Specify the details of the file in the format of {'Name': , 'Hash':}.
+            tokens (numpy.ndarray):
+                The tokens of the file.
+
+        Return:
+            tokens (numpy.ndarray):
+                The tokens of the file, memory-mapped from the token shard if it was saved.
+        """
+        full_path = self.token_shard_path(file_meta)
+        try:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            token_shards.save_token_shard(full_path, tokens)
+            self.cache.add_shard(file_meta['Folder'], file_meta['Hash'], os.path.getsize(full_path), len(tokens))
+            return token_shards.load_token_shard(full_path)
+        except Exception as E:
+            logger.warning("Could not save token shard:".ljust(20) + "<blue>{}</blue> {}".format(file_meta['Name'], E))
+            return tokens
+
+    def submit_tokenize(self, texts):
+        r""" Submits a batch of texts to the tokenizer pool, which is started on first use.
+        Args:
+            texts (list of str):
+                The texts to tokenize with one call of the batched tokenizer.
+
+        Return:
+            future (concurrent.futures.Future):
+                Future of the list of tokens of each text.
+        """
+        if self.tokenizer_workers == 0:
+            future = concurrent.futures.Future()
+            future.set_result(token_shards.tokenize_texts(texts, self.tokenizer))
+            return future
+
+        if self.tokenizer_pool == None:
+            # The pool is started from the producer thread while downloads are running, so the workers are spawned
+            # rather than forked with the locks held by the other threads.
+            self.tokenizer_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers = self.tokenizer_workers,
+                mp_context = multiprocessing.get_context('spawn'),
+                initializer = token_shards.init_tokenizer_worker,
+                initargs = (self.tokenizer, )
+            )
+        return self.tokenizer_pool.submit(token_shards.tokenize_texts, texts)
+
+    def get_shard_or_text(self, file_meta):
+        r""" Memory-maps the token shard of a file, or gets its text if there is no shard yet.
+        Args:
+            file_meta (dict of str: int):
+                Specify the details of the file in the format of {'Name': , 'Hash':}.
+
+        Return:
+            tokens_or_text (numpy.ndarray or str):
+                The tokens of the file, or its text if it has no shard, None if the file could not be retrieved.
+        """
+        tokens = self.load_token_shard(file_meta)
+        if tokens is not None:
+            return tokens
+        return self.get_text(file_meta)
+
+    def get_tokens(self, file_meta, text = None):
+        r""" Memory-maps the token shard of a file, tokenizing the file and saving its shard first if there is none.
+        Args:
+            file_meta (dict of str: int):
+                Specify the details of the file in the format of {'Name': , 'Hash':}.
+            text (str, optional):
+                The text of the file, downloaded from IPFS if not passed and there is no shard.
+
+        Return:
+            tokens (numpy.ndarray):
+                The tokens of the file, None if the file could not be retrieved.
+        """
+        tokens = self.load_token_shard(file_meta)
+        if tokens is not None:
+            return tokens
+
+        if text == None:
+            text = self.get_text(file_meta)
+        if text == None:
+            return None
+
+        return self.save_token_shard(file_meta, self.submit_tokenize([text]).result()[0])
+
     def get_dataset(self , file_meta):
         r""" Either load a dataset, which is a list of hashes, from disk or download it from IPFS
         Args:
@@ -348,7 +521,7 @@ class GenesisTextDataset( Dataset ):
         if self.dataset_name == 'default':
             i = 0
             dataset_hashes = list(self.dataset_hashes.values())
-            random.shuffle(dataset_hashes)
+            self.random.shuffle(dataset_hashes)
             
             for dataset_hash in dataset_hashes: 
                 dataset_meta = {'Folder': 'mountain', 'Name': dataset_hash['Name'], 'Hash': dataset_hash['Hash']}
@@ -400,7 +573,7 @@ class GenesisTextDataset( Dataset ):
             else:
                 sub_directories = response.json()
                 if sub_directories and 'Links' in sub_directories.keys() and len(sub_directories['Links']) >= 1:
-                    random_sub_directory = random.choice(sub_directories['Links'])
+                    random_sub_directory = self.random.choice(sub_directories['Links'])
 
                     # --- Fill the name of the random_sub_directory if it is empty. 
                     if random_sub_directory['Name'] == '':
@@ -414,39 +587,39 @@ class GenesisTextDataset( Dataset ):
         return None
 
     def get_text_from_local(self, min_data_len):
+        r""" Get the tokens of files picked from the cache, until we have reached the min data length.
+        The files are picked from the catalog of the cache, by their number of tokens.
 
-        folders = os.listdir( os.path.expanduser (self.data_dir))
+        Returns:
+            data_corpus (TokenCorpus):
+                Tokens of the text data, as memory-mapped token shards.
+        """
+        folders = self.cache.folders()
         if self.dataset_name == 'default':
             folders_avail = folders
-            random.shuffle(folders_avail)
+            self.random.shuffle(folders_avail)
             folders_avail = folders_avail[:self.max_datasets]
         else:
             folders_avail = []
             for dataset_name in self.dataset_name:
                 if dataset_name in folders:
                     folders_avail.append(dataset_name)
-            random.shuffle(folders_avail)
-
-        files = [] 
-        for folder in folders_avail:
-            file_names = os.listdir(os.path.expanduser(os.path.join(self.data_dir, folder)))
-            sub_files = [{'Name': file_name,'Folder': folder, 'Hash': file_name} for file_name in file_names]
-            files += sub_files
-
-        random.shuffle(files)
-        data_corpus = []
-        total_dataset_len = 0
-
-        for text_file in files:
-            # --- Get text from the datafile directory
-            text = self.load_hash(text_file)
-
-            if text != None:
-                text_list = text.split() 
-                data_corpus.extend(text_list)
-                total_dataset_len += len(text_list)
+            self.random.shuffle(folders_avail)
+
+        data_corpus = token_shards.TokenCorpus()
+
+        for text_file in self.cache.sample(folders_avail, min_data_len, rng = self.random):
+            # --- Get the tokens of the datafile, tokenizing its text if it has no shard yet.
+            tokens = self.load_token_shard(text_file)
+            if tokens is None:
+                text = self.load_hash(text_file)
+                if text != None:
+                    tokens = self.get_tokens(text_file, text = text)
+
+            if tokens is not None:
+                data_corpus.extend(tokens, (text_file['Hash'], 0))
             
-            if (total_dataset_len > min_data_len) :
+            if (len(data_corpus) > min_data_len) :
                 break
 
         return data_corpus
@@ -455,21 +628,21 @@ class GenesisTextDataset( Dataset ):
         """ Main function for generating the text data.
         1. Get directories from a random dataset_hash (dataset_hash is the result from calling pin/ls).
         2. Pick a random directory and get the directory that would lead to a datafile.    
-        3. Get text from the directory.
-        4. Repeat 2,3 until we have reached the min data length
+        3. Get the token shard, or the text, of the directory.
+        4. Repeat 2,3 until we have reached the min data length, while the texts are tokenized in batches by the tokenizer pool.
 
         Returns:
-            text: str: 
-                Contents of the text data.
+            data_corpus (TokenCorpus):
+                Tokens of the text data, as memory-mapped token shards.
         """
         self.IPFS_fails = 0
-        data_corpus = []
+        data_corpus = token_shards.TokenCorpus()
         try:
             # --- Get directories from a random dataset_hash
             directories = list(self.get_hashes_from_dataset())
 
             # --- Generate a random order of the directories
-            random.shuffle(directories)
+            self.random.shuffle(directories)
 
             # --- Pick random directories and get their text contents.
             if directories:
@@ -479,22 +652,45 @@ class GenesisTextDataset( Dataset ):
 
                 # --- Dont stop until the corpus size and the minimum data_length was reached.
                 n_workers = cpu_count() if self.num_workers == 0 else self.num_workers
-                with concurrent.futures.ThreadPoolExecutor(max_workers=n_workers) as executor:
-                    future_map = {}
-                    for idx, call_arg in enumerate(directories[:self.max_directories]):
-                        future = executor.submit(self.get_text, call_arg)
-                        future_map[future] = call_arg
-
-                    for i, future in enumerate(concurrent.futures.as_completed(future_map)):
-                        text = future.result()
-
-                        if text is not None:
-                            text_list = text.split()
-                            data_corpus.extend(text_list)
-                            total_dataset_len += len(text_list)
-
-                        if (total_dataset_len > min_data_len) or self.IPFS_fails > self.IPFS_fails_max:
-                            break
+                pending_files, pending_texts, tokenize_futures = [], [], []
+                shards = {}
+
+                def consume(file_meta, result):
+                    nonlocal total_dataset_len, pending_files, pending_texts
+                    if isinstance(result, str):
+                        pending_files.append(file_meta)
+                        pending_texts.append(result)
+                        # The number of words is a lower bound of the number of tokens.
+                        total_dataset_len += len(result.split())
+                    elif result is not None:
+                        shards[file_meta['Hash']] = result
+                        total_dataset_len += len(result)
+
+                    if len(pending_texts) >= self.tokenizer_batch_size:
+                        tokenize_futures.append((pending_files, self.submit_tokenize(pending_texts)))
+                        pending_files, pending_texts = [], []
+
+                    # The downloads are stopped as well once load_state_dict asks to resume from the cache.
+                    return (total_dataset_len > min_data_len) or self.IPFS_fails > self.IPFS_fails_max or self.resume_state != None
+
+                # --- Downloads which have not started are cancelled, and the ones in flight stopped, once consume returns True.
+                self.downloads_cancelled.clear()
+                try:
+                    self.ipfs.map_concurrently(self.get_shard_or_text, directories[:self.max_directories], consume, max_concurrency = n_workers)
+                finally:
+                    self.downloads_cancelled.set()
+
+                if len(pending_texts) > 0:
+                    tokenize_futures.append((pending_files, self.submit_tokenize(pending_texts)))
+
+                for files, tokenize_future in tokenize_futures:
+                    for file_meta, tokens in zip(files, tokenize_future.result()):
+                        shards[file_meta['Hash']] = self.save_token_shard(file_meta, tokens)
+
+                # --- Keep the seeded order of the directories, rather than the order the downloads completed in.
+                for directory in directories:
+                    if directory['Hash'] in shards:
+                        data_corpus.extend(shards.pop(directory['Hash']), (directory['Hash'], 0))
 
             else:
                 logger.error("It appears the directory is empty... Restart your miner to try again.")
@@ -526,8 +722,13 @@ class GenesisTextDataset( Dataset ):
         logger.success(f"Reserving data with multiples: {multiples}")
         data_size = epoch_length * self.batch_size * self.block_size
         
-        while len(self.data_reserved) < data_size * multiples :
-            self.data_reserved += self.construct_text_corpus(min_data_len = data_size)
+        self.apply_resume_state()
+        while len(self.data_reserved) < data_size * multiples and self.resume_epoch == None:
+            corpus = self.construct_text_corpus(min_data_len = data_size)
+            with self.data_size_lock:
+                self.data_reserved.extend_corpus(corpus)
+                self.random_state = self.random.getstate()
+            self.apply_resume_state()
 
         logger.success(f"Dataset download completed, {multiples} copy of data reserved")
         return True
@@ -552,76 +753,192 @@ class GenesisTextDataset( Dataset ):
 
         old_batch_size = self.batch_size
         old_block_size = self.block_size
-        
-        if check_valid(batch_size):
-            self.batch_size = batch_size
-        
-        if check_valid(block_size):
-            self.block_size = block_size
+        if (batch_size, block_size) == (old_batch_size, old_block_size):
+            return
+
+        with self.data_size_lock:
+            if check_valid(batch_size):
+                self.batch_size = batch_size
+            
+            if check_valid(block_size):
+                self.block_size = block_size
+
+            # batches of the old sizing are dropped by __next__
+            self.data_generation += 1
 
         # empty the queue
         while not self.data_queue.queue.empty():
             self.data_queue.queue.get()
 
-        # empty the dataset_iterator with the old sizing
-        self.__infinite_dataset_iterator = iter([])
-
         logger.success(f"Updated data size: batch_size: {old_batch_size} --> {self.batch_size}, block_size: {old_block_size} --> {self.block_size}")
 
     def dataloader(self, epoch_length = 100):
-        r""" Creates a torch dataloader out of a subclass of this class.
+        r""" Creates a torch dataloader out of a subclass of this class, for a new epoch.
+        The epoch resumed by load_state_dict is used if there is one, and a new epoch taken from the reserved data otherwise.
 
         Args:
-            epoch_length (int, optional): 
+            epoch_length (int, optional):
                 A dataloader for a subset of the dataset of epoch_length is returned.
 
         Returns:
             torch.utils.data.dataloader.DataLoader: Pytorch dataloader.
         """
         logger.success(f"Getting a new Dataloader")
-        data_size = epoch_length * self.batch_size * self.block_size
-        if len(self.data_reserved) < data_size:
-            self.reserve_multiple_data(self.num_batches, 1)
-
-        self.data = self.data_reserved[:data_size]
-
-        del self.data_reserved[:data_size]
+        with self.data_size_lock:
+            if self.resume_epoch != None:
+                self.data, seed, consumed = self.resume_epoch
+                self.resume_epoch = None
+            else:
+                data_size = epoch_length * self.batch_size * self.block_size
+                if len(self.data_reserved) < data_size:
+                    self.reserve_multiple_data(self.num_batches, 1)
+                self.data, seed, consumed = self.data_reserved.take(data_size), self.random.getrandbits(63), 0
+                self.random_state = self.random.getstate()
+
+            # --- Record the epoch, and forget the epochs before the one being consumed.
+            self.epoch += 1
+            self.epochs[self.epoch] = {'shards': self.data.state(), 'seed': seed, 'consumed': consumed}
+            consumed_epoch = self.position[0] if self.position != None else self.epoch
+            for epoch in [epoch for epoch in self.epochs if epoch < consumed_epoch]:
+                del self.epochs[epoch]
 
         # Datalaoder calls self._getitem_ functions until the self.data uses up, and group the result by batch size
         return DataLoader(self,
                     shuffle=True,
                     batch_size=self.batch_size,
                     num_workers=self.num_workers,
-                    drop_last=True)
+                    drop_last=True,
+                    generator=torch.Generator().manual_seed(seed))
     
-    def set_dataset_iterator(self):
-        r""" Get a new dataset that is ready from the queue. The result would be updated to self.__infinite_dataset_iterator__ . 
-        """
-        success = False 
-        while not success:
-            if not self.data_queue.queue.empty() :
-                ready = self.data_queue.queue.get() # the queue stores a bool ready signal
-                dataset = self.dataloader(self.num_batches)
-                if dataset:
-                    self.__infinite_dataset_iterator = iter([input for input in dataset])
-                    success = True
-            else:
-                time.sleep(2)
+    def produce_batch(self):
+        r""" Get the next batch from the dataloader of the producer, creating a new dataloader once it is exhausted.
+        Runs in the producer thread of the data queue, which pushes the batches to the queue.
 
-        return
+        Return:
+            generation (int):
+                The data generation the batch was made for.
+            epoch (int):
+                The epoch of the batch.
+            index (int):
+                The index of the batch in its epoch.
+            batch (torch.LongTensor of shape [batch_size, block_size]):
+                The batch.
+        """
+        while True:
+            if self.batch_iterator == None or self.batch_generation != self.data_generation:
+                self.reserve_multiple_data(self.num_batches, 1)
+                with self.data_size_lock:
+                    self.apply_resume_state()
+                    self.batch_generation = self.data_generation
+                    self.batch_iterator = enumerate(self.dataloader(self.num_batches))
+                    # --- Skip the batches of a resumed epoch which were consumed before its state was saved.
+                    for _ in range(self.epochs[self.epoch]['consumed']):
+                        next(self.batch_iterator, None)
+
+            with self.data_size_lock:
+                if self.batch_generation != self.data_generation:
+                    continue
+                try:
+                    index, batch = next(self.batch_iterator)
+                    return self.batch_generation, self.epoch, index, batch
+                except StopIteration:
+                    self.batch_iterator = None
 
     def __next__(self):
-        """Returns the next element from the dataset. 
+        """Returns the next element from the dataset.
         """
-        if self.__infinite_dataset_iterator == None:
-            self.set_dataset_iterator()
+        while True:
+            # Raises the exception the producer hit, the producer then keeps producing.
+            generation, epoch, index, batch = self.data_queue.get()
+            if generation == self.data_generation:
+                self.position = (epoch, index + 1)
+                return batch
 
-        try:
-            return next(self.__infinite_dataset_iterator)
-        
-        except StopIteration:
-            self.set_dataset_iterator()
-            return next(self.__infinite_dataset_iterator)
+    def corpus_from_state(self, slices):
+        r""" Loads a corpus saved by TokenCorpus.state from the token shards of the cache.
+        The slices of which the shard was evicted from the cache are left out.
+
+        Args:
+            slices (list of (str, int, int)):
+                The hash, start and stop token of each shard of the corpus.
+
+        Return:
+            corpus (TokenCorpus):
+                The corpus of the slices.
+        """
+        corpus = token_shards.TokenCorpus()
+        for file_hash, start, stop in slices:
+            tokens = self.load_token_shard({'Name': file_hash, 'Folder': '', 'Hash': file_hash})
+            if tokens is None or len(tokens) < stop:
+                logger.warning("Could not resume from shard:".ljust(20) + "<blue>{}</blue>".format(file_hash))
+                continue
+            corpus.extend(tokens[start:stop], (file_hash, start))
+        return corpus
+
+    def state_dict(self):
+        r""" Returns the position of the iteration over the dataset, to resume from with load_state_dict.
+        The data is saved as slices of the token shards in the cache, which are not copied.
+
+        Return:
+            state_dict (dict):
+                The seed and state of the random generator, the data size, the shards of the epoch being consumed
+                with its dataloader seed and number of consumed batches, and the shards reserved for later epochs.
+        """
+        with self.data_size_lock:
+            epochs = [epoch for epoch in sorted(self.epochs) if self.position == None or epoch > self.position[0]]
+            current = None
+            if self.position != None and self.position[0] in self.epochs:
+                current = dict(self.epochs[self.position[0]], consumed = self.position[1])
+            return {
+                'seed': self.seed,
+                'random_state': self.random_state,
+                'batch_size': self.batch_size,
+                'block_size': self.block_size,
+                'epoch': current,
+                'reserved': [shard for epoch in epochs for shard in self.epochs[epoch]['shards']] + self.data_reserved.state(),
+            }
+
+    def load_state_dict(self, state_dict):
+        r""" Resumes the iteration over the dataset from a state_dict returned by state_dict, reading its shards
+        from the cache instead of downloading new data. The batches of the queue are dropped, and the producer
+        continues with the batch after the last one consumed when the state_dict was saved.
+
+        Args:
+            state_dict (dict):
+                The state returned by state_dict.
+        """
+        if len(state_dict) == 0:
+            return
+
+        with self.data_size_lock:
+            self.batch_size = state_dict['batch_size']
+            self.block_size = state_dict['block_size']
+            self.resume_state = state_dict
+            self.data_generation += 1
+
+        # empty the queue
+        while not self.data_queue.queue.empty():
+            self.data_queue.queue.get()
+
+    def apply_resume_state(self):
+        r""" Applies the state_dict passed to load_state_dict, in the producer thread. Its reserved shards are put
+        before the data reserved so far, and its epoch is resumed by the next dataloader.
+        """
+        with self.data_size_lock:
+            state_dict = self.resume_state
+            if state_dict == None:
+                return
+            self.resume_state = None
+            self.seed = state_dict['seed']
+            self.random.setstate(state_dict['random_state'])
+            self.random_state = state_dict['random_state']
+            reserved = self.corpus_from_state(state_dict['reserved'])
+            reserved.extend_corpus(self.data_reserved)
+            self.data_reserved = reserved
+            if state_dict['epoch'] != None:
+                epoch = state_dict['epoch']
+                self.resume_epoch = (self.corpus_from_state(epoch['shards']), epoch['seed'], epoch['consumed'])
+        logger.success(f"Resumed dataset iteration from {len(self.data_reserved)} reserved tokens")
 
     def __len__(self):
         """Returns number of samples (blocks) of dataset
@@ -644,13 +961,15 @@ class GenesisTextDataset( Dataset ):
         """
         start_idx = (idx * self.block_size) % len(self.data)
         end_idx = start_idx + self.block_size
-        text = " ".join(self.data[start_idx:end_idx])
+        tokens = self.data[start_idx:end_idx]
+        if len(tokens) < self.block_size:
+            # Wrap around to the start of the corpus for the last block.
+            tokens = numpy.concatenate([tokens, self.data[:self.block_size - len(tokens)]])
 
         if self.no_tokenizer is True:
-            return text
+            return self.tokenizer.decode(tokens.tolist())
         else:
-            tokens = self.tokenizer(text, padding=True, truncation=True)["input_ids"]
-            return torch.tensor(tokens, dtype=torch.long)[:self.block_size]
+            return torch.from_numpy(tokens.astype(numpy.int64))
 
     def build_hash_table(self):
         self.IPFS_fails = 0
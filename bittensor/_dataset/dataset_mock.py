@@ -39,7 +39,11 @@ class MockGenesisTextDataset( dataset_impl.Dataset ):
         max_datasets,
         no_tokenizer,
         num_batches,
-        max_directories
+        max_directories,
+        tokenizer_workers = 1,
+        cache_size = 1024,
+        seed = None,
+        prefetch_batches = 2
     ):
         super().__init__()
         self.block_size = block_size
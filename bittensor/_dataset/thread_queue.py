@@ -16,7 +16,6 @@
 # DEALINGS IN THE SOFTWARE.
 
 import threading
-import time
 import queue
 from loguru import logger
 
@@ -46,13 +45,20 @@ class ProducerThread(threading.Thread):
         self._stop_event = threading.Event()
 
     def run(self):
-        r""" Work of the thread. Keep checking if the queue is full, if it is not full, run the target function to fill the queue.
+        r""" Work of the thread. Keep running the target function and putting its result to the queue, waiting while the queue is full.
+        An exception raised by the target function is put to the queue in place of a result, see ThreadQueue.get.
         """
         while not self.stopped():
-            if not self.queue.full():
-                item = self.target(*self.arg, self.queue.qsize()+1 )
-                self.queue.put(item)
-            time.sleep(2)
+            try:
+                item = self.target(*self.arg)
+            except Exception as e:
+                item = e
+            while not self.stopped():
+                try:
+                    self.queue.put(item, timeout = 1)
+                    break
+                except queue.Full:
+                    pass
         return
 
     def stop(self):
@@ -86,6 +92,14 @@ class ThreadQueue():
     def __del__(self):
         self.close()
 
+    def get(self):
+        r""" Returns the next result of the producer, or raises the exception the producer hit instead.
+        """
+        item = self.queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
     def close(self):
         self.producer.stop()
         self.producer.join()
@@ -0,0 +1,182 @@
+""" Token shards, the pre-tokenized on-disk form of the dataset files, and the token corpus built from them.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import numpy
+
+# Suffix of the token shard saved next to each dataset file.
+TOKEN_SHARD_SUFFIX = '.tokens.npy'
+
+def token_dtype( vocab_size: int ) -> numpy.dtype:
+    r""" Returns the smallest unsigned dtype holding the token ids of a vocabulary.
+    """
+    return numpy.dtype( numpy.uint16 ) if vocab_size <= 2 ** 16 else numpy.dtype( numpy.uint32 )
+
+def tokenize_text( tokenizer: 'bittensor.tokenizer', text: str ) -> numpy.ndarray:
+    r""" Tokenizes the whitespace separated words of text into a flat token array.
+        Args:
+            tokenizer (:obj:`bittensor.tokenizer`, `required`):
+                Tokenizer of the dataset.
+            text (:obj:`str`, `required`):
+                Text of a dataset file.
+
+        Returns:
+            tokens (:obj:`numpy.ndarray`):
+                Token ids of the text, of the token_dtype of the tokenizer.
+    """
+    return numpy.array( tokenizer( " ".join( text.split() ) )['input_ids'], dtype = token_dtype( len( tokenizer ) ) )
+
+# Tokenizer of a tokenizer worker process, set by init_tokenizer_worker.
+_worker_tokenizer = None
+
+def init_tokenizer_worker( tokenizer: 'bittensor.tokenizer' ):
+    r""" Initializer of the tokenizer worker processes, which keep their own copy of the tokenizer.
+    """
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer
+
+def tokenize_texts( texts: List[str], tokenizer: 'bittensor.tokenizer' = None ) -> List[numpy.ndarray]:
+    r""" Tokenizes a batch of texts with a single call of the batched tokenizer API.
+        Args:
+            texts (:obj:`List[str]`, `required`):
+                Texts of dataset files.
+            tokenizer (:obj:`bittensor.tokenizer`, `optional`):
+                Tokenizer of the dataset, defaults to the tokenizer of the worker process.
+
+        Returns:
+            tokens (:obj:`List[numpy.ndarray]`):
+                Token ids of each text, of the token_dtype of the tokenizer.
+    """
+    tokenizer = tokenizer if tokenizer != None else _worker_tokenizer
+    dtype = token_dtype( len( tokenizer ) )
+    input_ids = tokenizer( [ " ".join( text.split() ) for text in texts ] )['input_ids']
+    return [ numpy.array( ids, dtype = dtype ) for ids in input_ids ]
+
+def save_token_shard( path: str, tokens: numpy.ndarray ):
+    r""" Saves tokens to a token shard at path. The shard is written to a temporary file which then replaces path,
+        so that concurrent readers never see a partially written shard.
+    """
+    temporary_path = '{}.{}.tmp'.format( path, os.getpid() )
+    with open( temporary_path, 'wb' ) as file:
+        numpy.save( file, tokens )
+    os.replace( temporary_path, path )
+
+def load_token_shard( path: str ) -> numpy.ndarray:
+    r""" Memory-maps the token shard at path read-only.
+    """
+    return numpy.load( path, mmap_mode = 'r' )
+
+class TokenCorpus:
+    r""" A flat token stream over a list of token shards, which are indexed through the offset of each shard
+        in the stream. Slicing the corpus only copies the tokens of the slice.
+
+        A token shard holds the tokens of one dataset file, which is one document, so offsets are the document
+        offsets of the stream: document i spans tokens offsets[i] to offsets[i + 1]. Documents cut by take are
+        split across the two corpora.
+
+        Each shard may have a source, the hash of the file it was read from and the offset of its first token
+        in the file, so that the corpus can be saved as a list of file slices and loaded again.
+    """
+    def __init__( self, shards: List[numpy.ndarray] = None, sources: List[Optional[Tuple[str, int]]] = None ):
+        self._lock = threading.Lock()
+        self.shards = []
+        self.sources = []
+        self.offsets = numpy.zeros( 1, dtype = numpy.int64 )
+        shards = shards if shards != None else []
+        for shard, source in zip( shards, sources if sources != None else [ None ] * len( shards ) ):
+            self.extend( shard, source )
+
+    def __len__( self ) -> int:
+        return int( self.offsets[-1] )
+
+    def extend( self, shard: numpy.ndarray, source: Tuple[str, int] = None ):
+        r""" Appends the tokens of shard to the end of the corpus.
+            Args:
+                shard (:obj:`numpy.ndarray`, `required`):
+                    Tokens to append.
+                source (:obj:`Tuple[str, int]`, `optional`):
+                    Hash of the file of the tokens and the offset of the first token in the file.
+        """
+        if len( shard ) == 0:
+            return
+        with self._lock:
+            self.shards.append( shard )
+            self.sources.append( source )
+            self.offsets = numpy.append( self.offsets, self.offsets[-1] + len( shard ) )
+
+    def extend_corpus( self, corpus: 'TokenCorpus' ):
+        r""" Appends the shards of corpus to the end of the corpus.
+        """
+        for shard, source in zip( corpus.shards, corpus.sources ):
+            self.extend( shard, source )
+
+    def state( self ) -> List[Tuple[str, int, int]]:
+        r""" Returns the file slices of the corpus.
+            Returns:
+                slices (:obj:`List[Tuple[str, int, int]]`):
+                    The hash, start and stop token of each shard which has a source.
+        """
+        with self._lock:
+            return [ ( source[0], source[1], source[1] + len( shard ) ) for shard, source in zip( self.shards, self.sources ) if source != None ]
+
+    def take( self, length: int ) -> 'TokenCorpus':
+        r""" Removes the first length tokens from the corpus.
+            Args:
+                length (:obj:`int`, `required`):
+                    Number of tokens to take.
+
+            Returns:
+                corpus (:obj:`TokenCorpus`):
+                    Corpus of the taken tokens, sharing the shards of this corpus.
+        """
+        with self._lock:
+            taken, taken_sources = [], []
+            while length > 0 and len( self.shards ) > 0:
+                shard, source = self.shards[0], self.sources[0]
+                if len( shard ) <= length:
+                    taken.append( self.shards.pop( 0 ) )
+                    taken_sources.append( self.sources.pop( 0 ) )
+                else:
+                    taken.append( shard[ :length ] )
+                    taken_sources.append( source )
+                    self.shards[0] = shard[ length: ]
+                    self.sources[0] = None if source == None else ( source[0], source[1] + length )
+                length -= len( taken[-1] )
+            self.offsets = numpy.concatenate( [ [ 0 ], numpy.cumsum( [ len( shard ) for shard in self.shards ], dtype = numpy.int64 ) ] ).astype( numpy.int64 )
+        return TokenCorpus( taken, taken_sources )
+
+    def __getitem__( self, index: slice ) -> numpy.ndarray:
+        r""" Returns the tokens of a contiguous slice of the corpus.
+        """
+        start, stop, step = index.indices( len( self ) )
+        if step != 1:
+            raise ValueError( 'TokenCorpus only supports contiguous slices' )
+        pieces = []
+        shard_index = int( numpy.searchsorted( self.offsets, start, side = 'right' ) ) - 1
+        while start < stop:
+            shard_start = int( self.offsets[ shard_index ] )
+            pieces.append( self.shards[ shard_index ][ start - shard_start : stop - shard_start ] )
+            start += len( pieces[-1] )
+            shard_index += 1
+        if len( pieces ) == 0:
+            return numpy.zeros( 0, dtype = self.shards[0].dtype if len( self.shards ) > 0 else numpy.int64 )
+        return numpy.concatenate( pieces )
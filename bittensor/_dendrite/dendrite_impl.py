@@ -18,7 +18,7 @@
 # DEALINGS IN THE SOFTWARE.
 
 from types import SimpleNamespace
-from typing import Tuple, List, Union, Optional
+from typing import Callable, Tuple, List, Union, Optional
 
 import sys
 import torch
@@ -116,6 +116,9 @@ class Dendrite(torch.autograd.Function):
             synapses: List[ 'bittensor.Synapse' ],
             timeout: int,
             requires_grad: bool,
+            min_success: Optional[int],
+            deadline: Optional[float],
+            callback: Optional[Callable],
             *inputs: torch.Tensor
     ) -> Tuple[torch.Tensor, ...]:
         """ Internal autograd-friendly Forward RPC call to a list of neuron endpoints.
@@ -144,6 +147,15 @@ class Dendrite(torch.autograd.Function):
                 requires_grad (int, default = dendrite.requires_grad, `optional`):
                     If true, the backward pass triggers passing gradients on the wire.
 
+                min_success (int, `optional`):
+                    Return once this many endpoints responded successfully, cancelling the other calls.
+
+                deadline (float, `optional`):
+                    Return after this many seconds, cancelling the outstanding calls.
+
+                callback (:obj:`Callable`, `optional`):
+                    Called with (index, outputs, codes, times) as each endpoint response completes.
+
                 inputs (:obj:`List[torch.Tensor]` of shape :obj:`(n_endpoints)`, `required`):
                     List of torch tensors to be sent to the associated endpoints.
 
@@ -168,6 +180,9 @@ class Dendrite(torch.autograd.Function):
             synapses = synapses,
             inputs = inputs,
             timeout = timeout,
+            min_success = min_success,
+            deadline = deadline,
+            callback = callback,
         )
         ctx.forward_codes = forward_codes
 
@@ -233,11 +248,11 @@ class Dendrite(torch.autograd.Function):
             def flatten(t):
                 return [item for sublist in t for item in sublist]
             flattened_input_grads: List[torch.FloatTensor]  = flatten( input_grads )
-            return (None, None, None, None, None, None, *flattened_input_grads)
+            return (None, None, None, None, None, None, None, None, None, *flattened_input_grads)
         else:
             # Create nill responses for each input and each synapse.
             input_grads = [ syn.nill_backward_response_tensor ( inp ) for inp in ctx.inputs for syn in ctx.synapses ]
-            return (None, None, None, None, None, None, *input_grads)
+            return (None, None, None, None, None, None, None, None, None, *input_grads)
 
     def _forward(
             self,
@@ -246,6 +261,9 @@ class Dendrite(torch.autograd.Function):
             inputs: List [ torch.Tensor ],
             timeout: Optional [ int ]  = None,
             requires_grad: Optional [ bool ] = None,
+            min_success: Optional [ int ] = None,
+            deadline: Optional [ float ] = None,
+            callback: Optional [ Callable ] = None,
     ) -> Tuple [ List[ torch.Tensor ], List[ torch.LongTensor ], List [ torch.FloatTensor ]]:
         r""" Internal Forward tensor inputs to a list of neuron endpoints.
 
@@ -267,6 +285,15 @@ class Dendrite(torch.autograd.Function):
                 requires_grad (int, default = dendrite.requires_grad, `optional`):
                     If true, the backward pass triggers passing gradients on the wire.
 
+                min_success (int, `optional`):
+                    Return once this many endpoints responded successfully, cancelling the other calls.
+
+                deadline (float, `optional`):
+                    Return after this many seconds, cancelling the outstanding calls.
+
+                callback (:obj:`Callable`, `optional`):
+                    Called with (index, outputs, codes, times) as each endpoint response completes.
+
             Returns:
                 outputs (:obj:`List[torch.FloatTensor]` of shape :obj:`(batch_size, sequence_len, bittensor.__network_dim__)`, `required`):
                     Output encodings of inputs produced by the remote endpoints. Non-responses are zeroes of common shape.
@@ -291,6 +318,9 @@ class Dendrite(torch.autograd.Function):
             synapses,
             timeout,
             requires_grad,
+            min_success,
+            deadline,
+            callback,
             *inputs
         )
 
@@ -469,6 +499,9 @@ class Dendrite(torch.autograd.Function):
         inputs: Union[str, List[str], List[torch.LongTensor], torch.LongTensor],
         timeout: int = None,
         requires_grad: bool = None,
+        min_success: int = None,
+        deadline: float = None,
+        callback: Callable = None,
     ) -> Tuple[ Union[List[torch.FloatTensor], torch.FloatTensor], torch.LongTensor, torch.FloatTensor]:
         r""" Forward text inputs to a list of neuron endpoints and returns logit encodings or timeout.
 
@@ -500,6 +533,17 @@ class Dendrite(torch.autograd.Function):
                     requires_grad (:type:`int`, default = dendrite.requires_grad, `optional`):
                         If true, the backward pass triggers passing gradients on the wire.
 
+                    min_success (:type:`int`, `optional`):
+                        Return once this many endpoints responded successfully. Outstanding calls are cancelled
+                        and returned as zeros with a Timeout code.
+
+                    deadline (:type:`float`, `optional`):
+                        Return after this many seconds. Outstanding calls are cancelled and returned as zeros with a Timeout code.
+
+                    callback (:obj:`Callable`, `optional`):
+                        Called with (index, outputs, codes, times) as each endpoint response completes, where index is the
+                        position of the endpoint. Outputs passed to the callback are not attached to the autograd graph.
+
                 Returns:
                     outputs (:obj:`List[ List[ torch.FloatTensor ] ]` of shape :obj:`num_synapses * ( num_endpoints * ( -1, -1, -1 ) )`, `required`):
                         List of outputs from synapses, each a list of size num_endpoints of tensors with relevant size. Non-responses are zeroes of relevant 
@@ -521,6 +565,9 @@ class Dendrite(torch.autograd.Function):
             inputs = formatted_inputs,
             timeout = timeout,
             requires_grad = requires_grad,
+            min_success = min_success,
+            deadline = deadline,
+            callback = callback,
         )
         # Return.
         self.update_stats( formatted_endpoints, synapses, formatted_inputs, outputs, codes, times )
@@ -980,12 +1027,12 @@ class Dendrite(torch.autograd.Function):
                 dataframe (:obj:`pandas.Dataframe`)
         """
         try:
-            index = [ metagraph.hotkeys.index(pubkey) for pubkey in self.stats.requests_per_pubkey.keys() if pubkey in metagraph.hotkeys]
+            uids = { pubkey: metagraph.hotkey_to_uid(pubkey) for pubkey in self.stats.requests_per_pubkey.keys() }
+            index = [ uid for uid in uids.values() if uid != -1 ]
             columns = [ 'dendrite_n_requested', 'dendrite_n_success', 'dendrite_query_time', 'dendrite_avg_inbytes', 'dendrite_avg_outbytes', 'dendrite_qps' ]
             dataframe = pandas.DataFrame(columns = columns, index = index)
-            for pubkey in self.stats.requests_per_pubkey.keys():
-                if pubkey in metagraph.hotkeys:
-                    uid = metagraph.hotkeys.index(pubkey)
+            for pubkey, uid in uids.items():
+                if uid != -1:
                     dataframe.loc[ uid ] = pandas.Series( {
                         'dendrite_n_requested': int(self.stats.requests_per_pubkey[pubkey]),
                         'dendrite_n_success': int(self.stats.successes_per_pubkey[pubkey]),
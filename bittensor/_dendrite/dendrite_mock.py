@@ -681,12 +681,12 @@ class DendriteMock(torch.autograd.Function):
                 dataframe (:obj:`pandas.Dataframe`)
         """
         try:
-            index = [ metagraph.hotkeys.index(pubkey) for pubkey in self.stats.requests_per_pubkey.keys() if pubkey in metagraph.hotkeys]
+            uids = { pubkey: metagraph.hotkey_to_uid(pubkey) for pubkey in self.stats.requests_per_pubkey.keys() }
+            index = [ uid for uid in uids.values() if uid != -1 ]
             columns = [ 'dendrite_n_requested', 'dendrite_n_success', 'dendrite_query_time', 'dendrite_avg_inbytes', 'dendrite_avg_outbytes', 'dendrite_qps' ]
             dataframe = pandas.DataFrame(columns = columns, index = index)
-            for pubkey in self.stats.requests_per_pubkey.keys():
-                if pubkey in metagraph.hotkeys:
-                    uid = metagraph.hotkeys.index(pubkey)
+            for pubkey, uid in uids.items():
+                if uid != -1:
                     dataframe.loc[ uid ] = pandas.Series( {
                         'dendrite_n_requested': int(self.stats.requests_per_pubkey[pubkey]),
                         'dendrite_n_success': int(self.stats.successes_per_pubkey[pubkey]),
@@ -1,4 +1,9 @@
 
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
 from socket import timeout
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
@@ -7,6 +12,14 @@ import requests
 class Ipfs():
     """ Implementation for the dataset class, which handles dataloading from ipfs
     """
+    # Maximum number of keep-alive connections kept open to each IPFS host.
+    pool_maxsize = 64
+    # Size of the chunks response bodies are streamed in.
+    chunk_size = 2 ** 16
+
+    _session = None
+    _session_lock = threading.Lock()
+
     def __init__(self):
         
         # Used to retrieve directory contentx
@@ -54,16 +67,104 @@ class Ipfs():
         session.mount('https://', adapter)
         return session
 
-    def retrieve_directory(self, address: str, params = None, action: str = 'post', timeout: int = 180):
+    @classmethod
+    def session(cls) -> requests.Session:
+        r""" Returns the session shared by all IPFS requests of this process, which keeps a pool of keep-alive
+        connections to each IPFS host.
+
+        Returns:
+            requests.Session(): The shared session, set up for retries and backoff.
+        """
+        with cls._session_lock:
+            if cls._session == None:
+                session = requests.Session()
+                retry = Retry(
+                    total=1,
+                    read=1,
+                    connect=1,
+                    backoff_factor=0.5,
+                    status_forcelist=(104, 500, 502, 504),
+                )
+                adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=cls.pool_maxsize)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                cls._session = session
+            return cls._session
+
+    def retrieve_directory(self, address: str, params = None, action: str = 'post', timeout: int = 180, cancelled: threading.Event = None):
         r"""Connects to Pinata IPFS gateway and retrieves directory.
+        The response body is streamed in chunks of chunk_size over the shared session.
+
+        Args:
+            address: (:type:`str`, required):
+                The target address of the request.
+            params: (:type:`tuple`, optional):
+                The arguments of the request. eg. (('arg', dataset_hash),)
+            action: (:type:`str`, optional):
+                POST or GET.
+            timeout: (:type:`int`, optional):
+                Timeout for getting the server's response.
+            cancelled: (:type:`threading.Event`, optional):
+                Stops streaming the body once set, in which case None is returned.
 
         Returns:
             dict: A dictionary of the files inside of the genesis_datasets and their hashes.
         """
-        session = requests.Session()
-        session.params.update(params)
-        if action == 'get':
-            response = Ipfs.requests_retry_session(session=session).get(address, timeout=timeout)
-        elif action == 'post':
-            response = Ipfs.requests_retry_session(session=session).post(address, timeout=timeout)
-        return response
\ No newline at end of file
+        response = Ipfs.session().request(action.upper(), address, params=params, timeout=timeout, stream=True)
+        chunks = []
+        with response:
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if cancelled != None and cancelled.is_set():
+                    return None
+                chunks.append(chunk)
+        # The body is read, so the connection is back in the pool.
+        response._content = b''.join(chunks)
+        return response
+
+    def map_concurrently(self, function: Callable, arguments: Iterable, consume: Callable[[Any, Any], bool], max_concurrency: int = 8) -> int:
+        r""" Calls function on each of arguments from an asyncio event loop, with at most max_concurrency calls in flight,
+        and passes the results to consume in the order they complete. Once consume returns True the calls which have not
+        started are cancelled.
+
+        Args:
+            function (:type:`Callable`, required):
+                Function of one argument, e.g. downloading a file through retrieve_directory.
+            arguments (:type:`Iterable`, required):
+                The arguments to call function on.
+            consume (:type:`Callable[[Any, Any], bool]`, required):
+                Called with each argument and its result, returns True to stop.
+            max_concurrency (:type:`int`, optional):
+                Maximum number of calls in flight.
+
+        Returns:
+            int: The number of results passed to consume.
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self._map_concurrently(loop, function, list(arguments), consume, max_concurrency))
+        finally:
+            loop.close()
+
+    async def _map_concurrently(self, loop, function, arguments, consume, max_concurrency):
+        semaphore = asyncio.Semaphore(max_concurrency)
+        executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+        async def call(argument):
+            async with semaphore:
+                return argument, await loop.run_in_executor(executor, function, argument)
+
+        tasks = [loop.create_task(call(argument)) for argument in arguments]
+        consumed = 0
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                argument, result = await next_completed
+                consumed += 1
+                if consume(argument, result):
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Calls in flight finish in the background.
+            executor.shutdown(wait=False)
+        return consumed
\ No newline at end of file
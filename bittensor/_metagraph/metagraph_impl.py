@@ -19,10 +19,11 @@
 
 import os
 
-from typing import List
+from typing import List, Tuple
 from loguru import logger
 
 import ast
+import numpy
 import pandas
 import torch.nn.functional as f
 import torch
@@ -32,6 +33,7 @@ import json
 import bittensor
 import bittensor.utils.networking as net
 import bittensor.utils.weight_utils as weight_utils
+from . import snapshot_impl
 
 RAOPERTAO = 1000000000
 U64MAX = 18446744073709551615
@@ -90,9 +92,18 @@ class Metagraph( torch.nn.Module ):
         self.endpoints = torch.nn.Parameter( torch.tensor( [], dtype=torch.int64), requires_grad=False )
         self.uids = torch.nn.Parameter( torch.tensor([], dtype = torch.int64),requires_grad=False )
         self._endpoint_objs = None
+        self._reset_key_caches()
         self.neurons = None
         return self
 
+    def _reset_key_caches( self ):
+        r""" Drops the hotkeys, coldkeys and addresses lists and the hotkey to uid index, which are rebuilt on next access.
+        """
+        self._hotkeys = None
+        self._coldkeys = None
+        self._addresses = None
+        self._hotkey_uids = None
+
     def forward (
         self, 
         uid: int, 
@@ -231,22 +242,28 @@ class Metagraph( torch.nn.Module ):
         r""" Returns hotkeys for each neuron.
             Returns:
                 hotkeys (:obj:`List[str] of shape :obj:`(metagraph.n)`):
-                    Neuron hotkeys.
+                    Neuron hotkeys, a copy of the cached list which the caller may modify.
         """
         if self.n.item() == 0:
             return []
-        return [ neuron.hotkey if neuron != bittensor.endpoint.dummy() else '' for neuron in self.endpoint_objs ]
+        elif self._hotkeys == None:
+            dummy = bittensor.endpoint.dummy()
+            self._hotkeys = [ neuron.hotkey if neuron != dummy else '' for neuron in self.endpoint_objs ]
+        return list( self._hotkeys )
 
     @property
     def coldkeys( self ) -> List[str]:
         r""" Returns coldkeys for each neuron.
             Returns:
                 coldkeys (:obj:`List[str] of shape :obj:`(metagraph.n)`):
-                    Neuron coldkeys.
+                    Neuron coldkeys, a copy of the cached list which the caller may modify.
         """
         if self.n.item() == 0:
             return []
-        return [ neuron.coldkey if neuron != bittensor.endpoint.dummy() else '' for neuron in self.endpoint_objs ]
+        elif self._coldkeys == None:
+            dummy = bittensor.endpoint.dummy()
+            self._coldkeys = [ neuron.coldkey if neuron != dummy else '' for neuron in self.endpoint_objs ]
+        return list( self._coldkeys )
 
     @property
     def modalities( self ) -> List[str]:
@@ -268,7 +285,10 @@ class Metagraph( torch.nn.Module ):
         """
         if self.n.item() == 0:
             return []
-        return [ net.ip__str__( neuron.ip_type, neuron.ip, neuron.port ) if neuron != bittensor.endpoint.dummy() else '' for neuron in self.endpoint_objs ]
+        elif self._addresses == None:
+            dummy = bittensor.endpoint.dummy()
+            self._addresses = [ net.ip__str__( neuron.ip_type, neuron.ip, neuron.port ) if neuron != dummy else '' for neuron in self.endpoint_objs ]
+        return self._addresses
 
     @property
     def endpoint_objs( self ) -> List['bittensor.Endpoint']:
@@ -298,23 +318,35 @@ class Metagraph( torch.nn.Module ):
                 uid: (`int`):
                     The uid for specified hotkey, -1 if hotkey does not exist.
         """ 
-        if hotkey in self.hotkeys:
-            return self.hotkeys.index(hotkey) 
-        else:
-            return -1
+        if self._hotkey_uids == None:
+            self._build_hotkey_index()
+        return self._hotkey_uids.get( hotkey, -1 )
 
-    def load( self, network:str = None  ) -> 'Metagraph':
+    def _build_hotkey_index( self ):
+        r""" Builds the hashed hotkey to uid index used by hotkey_to_uid.
+        """
+        hotkey_uids = {}
+        for uid, key in enumerate( self.hotkeys ):
+            # Keep the first uid of a hotkey, as hotkeys.index does.
+            hotkey_uids.setdefault( key, uid )
+        self._hotkey_uids = hotkey_uids
+
+    def load( self, network:str = None, mmap:bool = False ) -> 'Metagraph':
         r""" Loads this metagraph object's state_dict from bittensor root dir.
             Args: 
                 network: (:obj:`str`, required):
                     Name of state_dict to load, defaults to kusanagi
+                mmap: (:obj:`bool`, optional):
+                    Memory-map the snapshot saved with save( snapshot = True ) instead of loading the state_dict.
         """
         try:
             if network == None:
                 network = self.subtensor.network
-            metagraph_path = '~/.bittensor/' + str(network) + '.pt'
+            metagraph_path = '~/.bittensor/' + str(network) + ( '.snapshot' if mmap else '.pt' )
             metagraph_path = os.path.expanduser(metagraph_path)
-            if os.path.isfile(metagraph_path):
+            if os.path.isfile(metagraph_path) and mmap:
+                self.load_from_snapshot( path = metagraph_path )
+            elif os.path.isfile(metagraph_path):
                 self.load_from_path( path = metagraph_path )
             else:
                 logger.warning('Did not load metagraph from path: {}, file does not exist. Run metagraph.save() first.', metagraph_path)
@@ -322,14 +354,19 @@ class Metagraph( torch.nn.Module ):
             logger.exception(e)
         return self
 
-    def save( self, network:str = None ) -> 'Metagraph':
+    def save( self, network:str = None, snapshot:bool = False ) -> 'Metagraph':
         r""" Saves this metagraph object's state_dict under bittensor root dir.
             Args: 
                 network: (:obj:`str`, required):
                     Name of state_dict, defaults to kusanagi
+                snapshot: (:obj:`bool`, optional):
+                    Save a snapshot which can be memory-mapped with load( mmap = True ). The snapshot
+                    atomically replaces the previous one, processes which mapped it keep a consistent view.
         """
         if network == None:
             network = self.subtensor.network
+        if snapshot:
+            return self.save_to_snapshot( path = '~/.bittensor/' + str(network) + '.snapshot' )
         return self.save_to_path( path = '~/.bittensor/', filename = str(network) + '.pt')
 
     def load_from_path(self, path:str ) -> 'Metagraph':
@@ -354,6 +391,44 @@ class Metagraph( torch.nn.Module ):
         torch.save(metastate, full_path + '/' + filename)
         return self
 
+    def save_to_snapshot(self, path:str, in_place:bool = False ) -> 'Metagraph':
+        r""" Saves this metagraph object to a columnar snapshot at the specified path, see load_from_snapshot.
+            Args: 
+                path: (:obj:`str`, required):
+                    Snapshot file.
+                in_place: (:obj:`bool`, optional):
+                    Only write the rows which changed since the snapshot at path was saved. Processes which
+                    mapped that snapshot see the update and may read a partially written row, so only use it
+                    when readers tolerate that. Falls back to a new snapshot when the layout changed.
+        """
+        full_path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(full_path) or '.', exist_ok=True)
+        columns = { name: tensor.detach().cpu().numpy() for name, tensor in self.state_dict().items() }
+        columns['hotkeys_offsets'], columns['hotkeys_data'] = snapshot_impl.encode_strings( self.hotkeys )
+        columns['coldkeys_offsets'], columns['coldkeys_data'] = snapshot_impl.encode_strings( self.coldkeys )
+        if not in_place or not snapshot_impl.update( full_path, self.block.item(), columns ):
+            snapshot_impl.write( full_path, self.block.item(), columns )
+        return self
+
+    def load_from_snapshot(self, path:str, block:int = None ) -> 'Metagraph':
+        r""" Loads this metagraph object from a snapshot saved with save_to_snapshot. The snapshot is memory-mapped
+            copy-on-write, so neuron processes on one machine loading the same snapshot share its pages.
+            Args: 
+                path: (:obj:`str`, required):
+                    Snapshot file.
+                block: (:obj:`int`, optional):
+                    Raise if the snapshot was not saved at this block.
+        """
+        header, columns = snapshot_impl.read( os.path.expanduser(path) )
+        if block != None and header['block'] != block:
+            raise ValueError('Metagraph snapshot {} is at block {}, expected {}'.format( path, header['block'], block ))
+        hotkeys = snapshot_impl.decode_strings( columns.pop('hotkeys_offsets'), columns.pop('hotkeys_data') )
+        coldkeys = snapshot_impl.decode_strings( columns.pop('coldkeys_offsets'), columns.pop('coldkeys_data') )
+        self.load_from_state_dict( { name: torch.from_numpy( column ) for name, column in columns.items() } )
+        self._hotkeys = hotkeys
+        self._coldkeys = coldkeys
+        return self
+
     def load_from_state_dict(self, state_dict:dict ) -> 'Metagraph':
         r""" Loads this metagraph object from passed state_dict.
             Args: 
@@ -378,6 +453,8 @@ class Metagraph( torch.nn.Module ):
         self.bonds = torch.nn.Parameter( state_dict['bonds'], requires_grad=False )
         self.endpoints = torch.nn.Parameter( state_dict['endpoints'], requires_grad=False )
         self._endpoint_objs = None
+        self._reset_key_caches()
+        self.neurons = None
         return self
 
     def retrieve_cached_neurons( self, block: int = None ):
@@ -424,8 +501,16 @@ class Metagraph( torch.nn.Module ):
 
         return neurons
 
-    def sync ( self, block: int = None, cached: bool = True ) -> 'Metagraph':
+    def sync ( self, block: int = None, cached: bool = True, incremental: bool = False ) -> 'Metagraph':
         r""" Synchronizes this metagraph with the chain state.
+            Args:
+                block (:obj:`int`, `optional`):
+                    Block to sync at, defaults to the current block.
+                cached (:obj:`bool`, `optional`):
+                    Retrieve the neurons from the IPFS cache when available.
+                incremental (:obj:`bool`, `optional`):
+                    Only rebuild the weight rows and endpoints of neurons whose hotkey, last_update or endpoint
+                    changed since the previous sync. Falls back to a full sync when the network size changed.
         """
         logger.success(self.subtensor)
         if block == None:
@@ -474,34 +559,48 @@ class Metagraph( torch.nn.Module ):
                 neurons = self.subtensor.neurons( block = block )
                 n_total = len(neurons)
 
+        # Weight rows and endpoints are only rebuilt for neurons which changed since the previous sync.
+        previous_neurons = self.neurons if incremental and self.neurons != None and len(self.neurons) == n_total and self.n.item() == n_total else None
+
         # Fill arrays.
-        uids = [ i for i in range(n_total) ]
-        active = [ 0 for _ in range(n_total) ]
-        stake = [ 0 for _ in range(n_total) ]
-        ranks = [ 0 for _ in range(n_total) ]
-        trust = [ 0 for _ in range(n_total) ]
-        consensus = [ 0 for _ in range(n_total) ]
-        incentive = [ 0 for _ in range(n_total) ]
-        emission = [ 0 for _ in range(n_total) ]
-        dividends = [ 0 for _ in range(n_total) ]
-        last_updates = [ -1 for _ in range(n_total) ]
-        endpoints = [ [-1 for _ in range(250) ]  for _ in range(n_total) ]
-        weights = [ [ 0 for _ in range(n_total) ] for _ in range(n_total) ]
-        bonds = [ [0 for _ in range(n_total) ] for _ in range(n_total) ]
-        self._endpoint_objs = [ bittensor.endpoint.dummy() for _ in range(n_total) ]
-        self.neurons = [None for _ in range(n_total)]
+        neuron_uids = torch.tensor( [ n.uid for n in neurons ], dtype=torch.int64 )
+        def column( values: list, dtype: torch.dtype, fill: int = 0 ) -> torch.Tensor:
+            tcolumn = torch.full( [ n_total ], fill, dtype = dtype )
+            tcolumn[ neuron_uids ] = torch.tensor( values, dtype = dtype )
+            return tcolumn
+
+        def uid_value_pairs( row_neurons: list, attribute: str ) -> Tuple[torch.LongTensor, torch.LongTensor, torch.LongTensor]:
+            # Flattens the chain (uid, value) lists of each neuron into row, uid and value tensors.
+            lengths = [ len( getattr( n, attribute ) ) for n in row_neurons ]
+            pairs = numpy.fromiter( ( value for n in row_neurons for pair in getattr( n, attribute ) for value in pair ), dtype=numpy.int64, count=2 * sum(lengths) ).reshape( -1, 2 )
+            rows = numpy.repeat( numpy.array( [ n.uid for n in row_neurons ], dtype=numpy.int64 ), lengths )
+            return torch.from_numpy( rows ), torch.from_numpy( pairs[:, 0].copy() ), torch.from_numpy( pairs[:, 1].copy() )
+
+        tn = torch.tensor( n_total, dtype=torch.int64 )
+        tblock = torch.tensor( block, dtype=torch.int64 )
+        tuids = torch.arange( n_total, dtype=torch.int64 )
+        tactive = column( [ n.active for n in neurons ], torch.int64 )
+        tstake = column( [ n.stake for n in neurons ], torch.float32 )
+        tranks = column( [ n.rank for n in neurons ], torch.float32 )
+        ttrust = column( [ n.trust for n in neurons ], torch.float32 )
+        tconsensus = column( [ n.consensus for n in neurons ], torch.float32 )
+        tincentive = column( [ n.incentive for n in neurons ], torch.float32 )
+        temission = column( [ n.emission for n in neurons ], torch.float32 )
+        tdividends = column( [ n.dividends for n in neurons ], torch.float32 )
+        tlast_update = column( [ n.last_update for n in neurons ], torch.int64, fill = -1 )
+
+        # Endpoints.
+        if previous_neurons == None:
+            self._endpoint_objs = [ bittensor.endpoint.dummy() for _ in range(n_total) ]
+            tendpoints = torch.full( [ n_total, 250 ], -1, dtype=torch.int64 )
+        else:
+            self._endpoint_objs = list( self.endpoint_objs )
+            tendpoints = self.endpoints.data.clone()
+        endpoint_uids, endpoint_tensors = [], []
         for n in neurons:
-            self.neurons[n.uid] = n
-            uids[n.uid] = n.uid 
-            active[n.uid] = n.active
-            stake[n.uid] = n.stake 
-            ranks[n.uid] = n.rank
-            trust[n.uid] = n.trust
-            consensus[n.uid] = n.consensus
-            incentive[n.uid] = n.incentive
-            dividends[n.uid] = n.dividends
-            emission[n.uid] = n.emission
-            last_updates[n.uid] = n.last_update
+            previous = previous_neurons[n.uid] if previous_neurons != None else None
+            if previous != None and ( previous.version, previous.hotkey, previous.ip_type, previous.ip, previous.port, previous.modality, previous.coldkey ) == ( n.version, n.hotkey, n.ip_type, n.ip, n.port, n.modality, n.coldkey ):
+                continue
             endpoint =  bittensor.endpoint(
                 version = int(n.version),
                 uid = int(n.uid), 
@@ -513,34 +612,31 @@ class Metagraph( torch.nn.Module ):
                 coldkey = str(n.coldkey) 
             )
             self._endpoint_objs[n.uid] = endpoint 
-            endpoints[n.uid] = endpoint.to_tensor().tolist()
-            if len(n.weights) > 0:
-                w_uids, w_weights = zip(*n.weights)
-                weights[n.uid] = weight_utils.convert_weight_uids_and_vals_to_tensor( n_total, w_uids, w_weights ).tolist()
-            else:
-                weights[n.uid] = [0] * n_total
-            if len(n.bonds) > 0:
-                b_uids, b_bonds = zip(*n.bonds)
-                bonds[n.uid] = weight_utils.convert_bond_uids_and_vals_to_tensor( n_total, b_uids, b_bonds ).tolist()
-            else:
-                bonds[n.uid] = [0] * n_total
+            endpoint_uids.append( n.uid )
+            endpoint_tensors.append( endpoint.to_tensor() )
+        if len( endpoint_uids ) > 0:
+            tendpoints[ torch.tensor( endpoint_uids, dtype=torch.int64 ) ] = torch.stack( endpoint_tensors )
+
+        # Weights are scattered into a preallocated matrix, rows of neurons with an unchanged
+        # hotkey and last_update are kept from the previous sync.
+        if previous_neurons == None:
+            tweights = torch.zeros( [ n_total, n_total ], dtype=torch.float32 )
+            weight_neurons = neurons
+        else:
+            tweights = self.weights.data.clone()
+            weight_neurons = [ n for n in neurons if previous_neurons[n.uid] == None or previous_neurons[n.uid].hotkey != n.hotkey or previous_neurons[n.uid].last_update != n.last_update ]
+            tweights[ torch.tensor( [ n.uid for n in weight_neurons ], dtype=torch.int64 ) ] = 0
+        w_rows, w_uids, w_vals = uid_value_pairs( weight_neurons, 'weights' )
+        tweights[ w_rows, w_uids ] = ( w_vals.double() / float( weight_utils.U32_MAX ) ).float()
 
-        # Set tensors.
-        tn = torch.tensor( n_total, dtype=torch.int64 )
-        tblock = torch.tensor( block, dtype=torch.int64 )
-        tuids = torch.tensor( uids, dtype=torch.int64 )
-        tactive = torch.tensor( active, dtype=torch.int64 )
-        tstake = torch.tensor( stake, dtype=torch.float32 )
-        tranks = torch.tensor( ranks, dtype=torch.float32 )
-        ttrust = torch.tensor( trust, dtype=torch.float32 )
-        tconsensus = torch.tensor( consensus, dtype=torch.float32 )
-        tincentive = torch.tensor( incentive, dtype=torch.float32 )
-        temission = torch.tensor( emission, dtype=torch.float32 )
-        tdividends = torch.tensor( dividends, dtype=torch.float32 )
-        tlast_update = torch.tensor( last_updates, dtype=torch.int64 )
-        tbonds = torch.tensor( bonds, dtype=torch.int64 )
-        tweights = torch.tensor( weights, dtype=torch.float32 )
-        tendpoints = torch.tensor( endpoints, dtype=torch.int64 )
+        # Bonds change every block and are always rebuilt.
+        tbonds = torch.zeros( [ n_total, n_total ], dtype=torch.int64 )
+        b_rows, b_uids, b_vals = uid_value_pairs( neurons, 'bonds' )
+        tbonds[ b_rows, b_uids ] = b_vals
+
+        self.neurons = [None for _ in range(n_total)]
+        for n in neurons:
+            self.neurons[n.uid] = n
 
         # Normalize bond ownership.
         tbonds = torch.nn.functional.normalize( tbonds.float(), p=1, dim=0, eps=1e-12 ) * 0.5 + torch.eye( tn ) * 0.5
@@ -561,6 +657,11 @@ class Metagraph( torch.nn.Module ):
         self.weights = torch.nn.Parameter( tweights, requires_grad=False )
         self.bonds = torch.nn.Parameter( tbonds, requires_grad=False )
         self.endpoints = torch.nn.Parameter( tendpoints, requires_grad=False )
+
+        # The hotkey index is read on every request by the axon priority and blacklist callbacks,
+        # it is rebuilt here once per sync rather than on first access.
+        self._reset_key_caches()
+        self._build_hotkey_index()
             
         # For contructor.
         return self
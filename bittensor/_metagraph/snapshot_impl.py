@@ -0,0 +1,177 @@
+""" Implementation of the columnar metagraph snapshot, a versioned on-disk format which can be memory-mapped.
+
+Layout:
+    magic (8 bytes) | header length (uint64) | json header, padded to HEADER_SIZE | columns, each aligned to ALIGNMENT
+
+The header holds the block of the snapshot and the dtype, shape and offset of each column. Columns are fixed-width
+arrays stored in native byte order, strings are stored as a table of offsets into a utf-8 byte column.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import os
+import json
+import struct
+from typing import Dict, List, Tuple
+
+import numpy
+
+MAGIC = b'BTMGSNAP'
+FORMAT_VERSION = 1
+HEADER_SIZE = 4096
+ALIGNMENT = 64
+
+def _aligned( offset: int ) -> int:
+    return ( offset + ALIGNMENT - 1 ) // ALIGNMENT * ALIGNMENT
+
+def _encode_header( header: dict ) -> bytes:
+    body = json.dumps( header ).encode( 'utf-8' )
+    if len( MAGIC ) + 8 + len( body ) > HEADER_SIZE:
+        raise ValueError( 'Metagraph snapshot header of {} bytes does not fit in {} bytes'.format( len( body ), HEADER_SIZE ) )
+    return ( MAGIC + struct.pack( '<Q', len( body ) ) + body ).ljust( HEADER_SIZE, b' ' )
+
+def read_header( path: str ) -> dict:
+    r""" Returns the header of the snapshot at path.
+        Args:
+            path (:obj:`str`, `required`):
+                Snapshot file.
+
+        Returns:
+            header (:obj:`dict`):
+                Snapshot block and column layout.
+    """
+    with open( path, 'rb' ) as file:
+        prefix = file.read( len( MAGIC ) + 8 )
+        if len( prefix ) < len( MAGIC ) + 8 or prefix[ :len( MAGIC ) ] != MAGIC:
+            raise ValueError( '{} is not a metagraph snapshot'.format( path ) )
+        header = json.loads( file.read( struct.unpack( '<Q', prefix[ len( MAGIC ): ] )[0] ) )
+    if header[ 'format_version' ] != FORMAT_VERSION:
+        raise ValueError( 'Metagraph snapshot {} has format version {}, expected {}'.format( path, header[ 'format_version' ], FORMAT_VERSION ) )
+    return header
+
+def write( path: str, block: int, columns: Dict[str, numpy.ndarray] ):
+    r""" Writes columns to a new snapshot at path. The snapshot is written to a temporary file which then replaces
+        path, so that processes which mapped the previous snapshot keep a consistent view of it.
+        Args:
+            path (:obj:`str`, `required`):
+                Snapshot file.
+            block (:obj:`int`, `required`):
+                Block the columns were synced at.
+            columns (:obj:`Dict[str, numpy.ndarray]`, `required`):
+                Column name to array.
+    """
+    columns = { name: numpy.asarray( array, order = 'C' ) for name, array in columns.items() }
+    header = { 'format_version': FORMAT_VERSION, 'block': block, 'columns': {} }
+    offset = HEADER_SIZE
+    for name, array in columns.items():
+        header[ 'columns' ][ name ] = { 'dtype': array.dtype.str, 'shape': list( array.shape ), 'offset': offset }
+        offset = _aligned( offset + array.nbytes )
+
+    # Per-process name so concurrent writers do not interleave into the same temporary file.
+    temporary_path = '{}.{}.tmp'.format( path, os.getpid() )
+    with open( temporary_path, 'wb' ) as file:
+        file.write( _encode_header( header ) )
+        for name, array in columns.items():
+            file.seek( header[ 'columns' ][ name ][ 'offset' ] )
+            file.write( array.data )
+        file.truncate( offset )
+    os.replace( temporary_path, path )
+
+def read( path: str ) -> Tuple[dict, Dict[str, numpy.ndarray]]:
+    r""" Memory-maps the snapshot at path copy-on-write. Pages are shared with every other process mapping the same
+        snapshot until they are written to, writes stay private to this process.
+        Args:
+            path (:obj:`str`, `required`):
+                Snapshot file.
+
+        Returns:
+            header (:obj:`dict`):
+                Snapshot block and column layout.
+            columns (:obj:`Dict[str, numpy.ndarray]`):
+                Column name to array, backed by the mapped file.
+    """
+    header = read_header( path )
+    buffer = numpy.memmap( path, dtype = numpy.uint8, mode = 'c' )
+    columns = {}
+    for name, column in header[ 'columns' ].items():
+        dtype = numpy.dtype( column[ 'dtype' ] )
+        nbytes = int( numpy.prod( column[ 'shape' ], dtype = numpy.int64 ) ) * dtype.itemsize
+        columns[ name ] = buffer[ column[ 'offset' ]: column[ 'offset' ] + nbytes ].view( dtype ).reshape( tuple( column[ 'shape' ] ) )
+    return header, columns
+
+def update( path: str, block: int, columns: Dict[str, numpy.ndarray] ) -> bool:
+    r""" Updates the snapshot at path in place, writing only the rows which differ from the passed columns.
+        Processes which mapped the snapshot see the updated rows.
+        Args:
+            path (:obj:`str`, `required`):
+                Snapshot file.
+            block (:obj:`int`, `required`):
+                Block the columns were synced at.
+            columns (:obj:`Dict[str, numpy.ndarray]`, `required`):
+                Column name to array.
+
+        Returns:
+            updated (:obj:`bool`):
+                False if there is no snapshot at path or its layout differs from columns, in which case
+                nothing was written and the snapshot must be written again.
+    """
+    try:
+        header = read_header( path )
+    except ( OSError, ValueError ):
+        return False
+    layout = { name: ( numpy.asarray( array ).dtype.str, list( numpy.shape( array ) ) ) for name, array in columns.items() }
+    if layout != { name: ( column[ 'dtype' ], column[ 'shape' ] ) for name, column in header[ 'columns' ].items() }:
+        return False
+
+    buffer = numpy.memmap( path, dtype = numpy.uint8, mode = 'r+' )
+    for name, array in columns.items():
+        column = header[ 'columns' ][ name ]
+        array = numpy.asarray( array )
+        mapped = buffer[ column[ 'offset' ]: column[ 'offset' ] + array.nbytes ].view( array.dtype ).reshape( array.shape )
+        if array.ndim < 2 or array.shape[0] == 0:
+            if not numpy.array_equal( mapped, array ):
+                mapped[ ... ] = array
+        else:
+            changed_rows = numpy.flatnonzero( ( mapped != array ).reshape( array.shape[0], -1 ).any( axis = 1 ) )
+            mapped[ changed_rows ] = array[ changed_rows ]
+    header[ 'block' ] = block
+    buffer[ :HEADER_SIZE ] = numpy.frombuffer( _encode_header( header ), dtype = numpy.uint8 )
+    buffer.flush()
+    return True
+
+def encode_strings( strings: List[str] ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    r""" Encodes strings as a string table.
+        Args:
+            strings (:obj:`List[str]`, `required`):
+                Strings to encode.
+
+        Returns:
+            offsets (:obj:`numpy.ndarray` of shape :obj:`(len(strings) + 1)`):
+                Start offset of each string in data, followed by the length of data.
+            data (:obj:`numpy.ndarray`):
+                Concatenated utf-8 bytes of the strings.
+    """
+    encoded = [ string.encode( 'utf-8' ) for string in strings ]
+    offsets = numpy.zeros( len( encoded ) + 1, dtype = numpy.int64 )
+    offsets[ 1: ] = numpy.cumsum( [ len( string ) for string in encoded ], dtype = numpy.int64 )
+    return offsets, numpy.frombuffer( b''.join( encoded ), dtype = numpy.uint8 )
+
+def decode_strings( offsets: numpy.ndarray, data: numpy.ndarray ) -> List[str]:
+    r""" Decodes a string table created by encode_strings.
+    """
+    data = data.tobytes()
+    return [ data[ start:end ].decode( 'utf-8' ) for start, end in zip( offsets[ :-1 ].tolist(), offsets[ 1: ].tolist() ) ]
@@ -1,5 +1,7 @@
 import argparse
 import math
+import threading
+from collections import OrderedDict
 import bittensor
 import torch
 from torch import nn
@@ -83,8 +85,9 @@ class server(torch.nn.Module):
             self.pre_model.config.pad_token_id = self.pre_model.config.eos_token_id
 
         self.tokenizer = prep_tokenizer(self.tokenizer, self.std_tokenizer)
-        self.to_translation_map = get_translation_map(self.tokenizer, self.std_tokenizer)
-        self.from_translation_map = get_translation_map(self.std_tokenizer, self.tokenizer)
+        translation_map_cache_dir = config.neuron.translation_map_cache_dir if config.neuron.translation_map_cache_dir else None
+        self.to_translation_map = get_translation_map(self.tokenizer, self.std_tokenizer, cache_dir=translation_map_cache_dir)
+        self.from_translation_map = get_translation_map(self.std_tokenizer, self.tokenizer, cache_dir=translation_map_cache_dir)
         self.split_map_cache = {}
 
         if self.config.neuron.local_train or self.config.neuron.remote_train:
@@ -107,6 +110,13 @@ class server(torch.nn.Module):
         self.mapping_function= mapping_function
         self.token_remap = token_remap if token_remap is not None else self.remapping_token
 
+        # -- bounded LRU cache of remapped token batches, keyed by content
+        self.token_remap_cache = OrderedDict()
+        self.token_remap_cache_size = config.neuron.token_remap_cache_size
+        self.token_remap_cache_lock = threading.Lock()
+        self.token_remap_cache_hits = 0
+        self.token_remap_cache_misses = 0
+
         if self.config.neuron.padding == False:
             self.mapping = torch.nn.Linear( self.pre_dimension, self.final_dim)
 
@@ -204,6 +214,30 @@ class server(torch.nn.Module):
         if std_tokenizer is None:
             std_tokenizer = self.std_tokenizer
 
+        if self.token_remap_cache_size <= 0:
+            return self._remapping_token(token_batch, std_tokenizer, return_offsets_mapping)
+
+        key = (id(std_tokenizer), token_batch.dtype, tuple(token_batch.shape), token_batch.cpu().numpy().tobytes())
+        with self.token_remap_cache_lock:
+            # tokens with offsets mapping also serve requests without
+            for cache_key in [key + (return_offsets_mapping,), key + (True,)]:
+                if cache_key in self.token_remap_cache:
+                    self.token_remap_cache.move_to_end(cache_key)
+                    self.token_remap_cache_hits += 1
+                    return self.token_remap_cache[cache_key]
+            self.token_remap_cache_misses += 1
+
+        tokens = self._remapping_token(token_batch, std_tokenizer, return_offsets_mapping)
+
+        with self.token_remap_cache_lock:
+            self.token_remap_cache[key + (return_offsets_mapping,)] = tokens
+            while len(self.token_remap_cache) > self.token_remap_cache_size:
+                self.token_remap_cache.popitem(last=False)
+        return tokens
+
+    def _remapping_token(self, token_batch, std_tokenizer, return_offsets_mapping=False):
+        r""" Uncached tokenizer remapping, see remapping_token.
+        """
         text_batch = std_tokenizer.batch_decode(token_batch)  # decode tokens to original text
         result = translate_special_token_text(text_batch, std_tokenizer, self.tokenizer)  # translate special tokens
         to_text_batch, from_offsets_batch, to_offsets_batch, pad_offsets_batch = result
@@ -221,6 +255,32 @@ class server(torch.nn.Module):
                                                        pad_offsets_batch)
         return tokens
 
+    def token_remap_cache_info(self) -> SimpleNamespace:
+        r""" Returns the hits, misses, current size and max size of the token remap cache.
+        """
+        with self.token_remap_cache_lock:
+            return SimpleNamespace(hits=self.token_remap_cache_hits, misses=self.token_remap_cache_misses,
+                                   currsize=len(self.token_remap_cache), maxsize=self.token_remap_cache_size)
+
+    def shared_token_remap(self, token_batch, std_tokenizer=None, return_offsets_mapping=False, model_output=None):
+        r""" Returns the server tokens of token_batch, reusing the tokens of model_output when it was computed
+             by another synapse on the same token_batch.
+            Args:
+                token_batch ( :obj:`torch.LongTensor`, `required`):
+                    token_batch to be retokenized, [batch_size, sequence_len]
+                std_tokenizer ( :obj:`transformers.Tokenizer`, `optional`):
+                    The standard tokenizer which was used to tokenize the input.
+                return_offsets_mapping ( :obj:`bool`, `required`):
+                    Return offsets_mapping in tokenization to delineate token segment positions.
+                model_output (:obj:`transformers.modeling_outputs.BaseModelOutputWithCrossAttentions`, `optional`):
+                    The shared output of huggingface auto model.
+        """
+        tokens = getattr(model_output, 'tokens', None)
+        if tokens is not None and (not return_offsets_mapping or 'offset_mapping' in tokens):
+            return tokens
+
+        return self.token_remap(token_batch, std_tokenizer=std_tokenizer, return_offsets_mapping=return_offsets_mapping)
+
     def forward(self, inputs, tokenizer=None):
         """
             Forward pass through the whole server model. Returns the loss and decoded predictions.
@@ -303,9 +363,9 @@ class server(torch.nn.Module):
         transformers.enable_full_determinism(0)
 
         sen_len = inputs.size()
-        tokens = self.token_remap(inputs, tokenizer)  # remap to server tokenizer
 
         if model_output == None:
+            tokens = self.token_remap(inputs, tokenizer)  # remap to server tokenizer
             if self.config.neuron.remote_train:
                 model_output = self.pre_model(input_ids=tokens['input_ids'],
                                                 attention_mask=tokens['attention_mask'],
@@ -315,6 +375,7 @@ class server(torch.nn.Module):
                     model_output = self.pre_model(input_ids=tokens['input_ids'],
                                                     attention_mask=tokens['attention_mask'],
                                                     output_hidden_states=True)
+            model_output.tokens = tokens  # share the server tokens with the other synapses of the request
 
         pre_hidden = model_output.hidden_states[-1]
 
@@ -359,7 +420,8 @@ class server(torch.nn.Module):
         transformers.set_seed(0)
         transformers.enable_full_determinism(0)
 
-        tokens = self.token_remap(token_batch, std_tokenizer=tokenizer, return_offsets_mapping=True)  # remap to server tokenizer
+        # remap to server tokenizer
+        tokens = self.shared_token_remap(token_batch, std_tokenizer=tokenizer, return_offsets_mapping=True, model_output=model_output)
 
         def _forward(_model_output=model_output):
             if _model_output is None:
@@ -367,6 +429,7 @@ class server(torch.nn.Module):
                 _model_output = self.pre_model(input_ids=tokens['input_ids'],
                                                 #attention_mask=tokens['attention_mask'],
                                                output_hidden_states=True)
+            _model_output.tokens = tokens  # share the server tokens with the other synapses of the request
             pre_logits = _model_output.logits  # [batch_size, sequence_len, self.tokenizer.vocab_len]
 
             probs_std = translate_logits_to_probs_std(pre_logits,
@@ -432,13 +495,14 @@ class server(torch.nn.Module):
         if std_tokenizer is None:
             std_tokenizer = self.std_tokenizer
 
-        tokens = self.token_remap(token_batch, std_tokenizer)
+        tokens = self.shared_token_remap(token_batch, std_tokenizer, model_output=model_output)
 
         def _forward(_model_output=model_output):
             if _model_output is None:
                 _model_output = self.pre_model(input_ids=tokens['input_ids'],
                                                attention_mask=tokens['attention_mask'],
                                                output_hidden_states=True)
+                _model_output.tokens = tokens  # share the server tokens with the other synapses of the request
 
             # model_output.logits: [batch_size, sequence_len, server_vocab_size]
             last_logits = _model_output.logits[:, -1, :]  # [batch_size] server prediction of continuation, right-aligned
@@ -553,6 +617,8 @@ class server(torch.nn.Module):
         parser.add_argument('--neuron.disable_blacklist', action='store_true', help='Turns off blacklisting', default=False)
         parser.add_argument('--neuron.disable_priority', action='store_true', help='Turns off priority threadpool', default=False)
         parser.add_argument('--neuron.num_remote_loss', type=int, help='Number of past remote loss to keep in stat.', default=20)
+        parser.add_argument('--neuron.translation_map_cache_dir', type=str, help='Directory of persisted tokenizer translation maps, empty to rebuild them on every startup.', default='~/.bittensor/translation_maps')
+        parser.add_argument('--neuron.token_remap_cache_size', type=int, help='Number of remapped token batches to cache, 0 turns the cache off.', default=256)
 
         # Synapse Arguements
         parser.add_argument('--neuron.lasthidden', action='store_false', help='To turn off last hidden synapse', default=True)
@@ -105,8 +105,8 @@ def serve(
                     the request type ('FORWARD' or 'BACKWARD').
         """
         try:        
-            uid = metagraph.hotkeys.index(pubkey)
-            priority = metagraph.S[uid].item()
+            uid = metagraph.hotkey_to_uid(pubkey)
+            priority = metagraph.S[uid].item() if uid != -1 else 0
         
         except:
             # zero priority for those who are not registered.
@@ -172,7 +172,7 @@ def serve(
 
         def registration_check():
             # If we allow non-registered requests return False = not blacklisted.
-            is_registered = pubkey in metagraph.hotkeys
+            is_registered = metagraph.hotkey_to_uid(pubkey) != -1
             if not is_registered:
                 if config.neuron.blacklist_allow_non_registered:
                     return False
@@ -184,7 +184,9 @@ def serve(
         # Check for stake
         def stake_check() -> bool:
             # Check stake.
-            uid = metagraph.hotkeys.index(pubkey)
+            uid = metagraph.hotkey_to_uid(pubkey)
+            if uid == -1:
+                raise Exception('Not registered')
             if metagraph.S[uid].item() < config.neuron.blacklist.stake:
                 prometheus_counters.labels("blacklisted.stake").inc()
 
@@ -234,7 +236,9 @@ def serve(
 
         """
         ## Uid that sent the request
-        incoming_uid = metagraph.hotkeys.index(hotkey)
+        incoming_uid = metagraph.hotkey_to_uid(hotkey)
+        if incoming_uid == -1:
+            raise ValueError('{} is not registered'.format(hotkey))
         if synapse.synapse_type == bittensor.proto.Synapse.SynapseType.TEXT_LAST_HIDDEN_STATE:
             
             if metagraph.S[incoming_uid] < config.neuron.lasthidden_stake:
@@ -345,6 +349,8 @@ def serve(
     # load our old model
     if not config.neuron.restart :
         model.load(config.neuron.full_path)
+        if config.neuron.local_train:
+            dataset.load(config.neuron.full_path)
 
     if config.wandb.api_key != 'default':
         # --- Init Wandb.
@@ -413,6 +419,7 @@ def serve(
                 if local_data['local/loss'] < model.best_loss:
                     model.best_loss = local_data['local/loss']
                     model.save(config.neuron.full_path)
+                    dataset.save(config.neuron.full_path)
 
             # Save it only when it gives a low average loss over a large sample size (config.neuron.num_remote_loss), default to 20. 
             elif (config.neuron.remote_train and len(model.remote_losses) >= config.neuron.num_remote_loss):
@@ -453,10 +460,16 @@ def serve(
         prometheus_guages.labels("consensus").set( nn.consensus )
         prometheus_guages.labels("incentive").set( nn.incentive )
         prometheus_guages.labels("emission").set( nn.emission )
+        token_remap_cache_info = model.token_remap_cache_info()
+        prometheus_guages.labels("token_remap_cache_hits").set( token_remap_cache_info.hits )
+        prometheus_guages.labels("token_remap_cache_misses").set( token_remap_cache_info.misses )
+        subtensor_cache_info = subtensor.cache_info()
+        prometheus_guages.labels("subtensor_cache_hits").set( subtensor_cache_info.hits )
+        prometheus_guages.labels("subtensor_cache_misses").set( subtensor_cache_info.misses )
 
         if current_block - last_set_block > blocks_per_set_weights:
             bittensor.__console__.print('[green]Current Status:[/green]', {**wandb_data, **local_data})
-            metagraph.sync()
+            metagraph.sync( incremental = True )
             last_set_block = current_block
             if not config.neuron.no_set_weights:
                 try: 
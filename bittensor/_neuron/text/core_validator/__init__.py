@@ -22,6 +22,7 @@ Example:
 
 """
 import argparse
+import asyncio
 import time
 import datetime
 import bittensor
@@ -29,6 +30,7 @@ import torch
 import os
 import wandb
 import math
+import numbers
 import random
 import pandas
 import traceback
@@ -48,6 +50,9 @@ from torch.nn.utils import clip_grad_norm_
 from torch.nn import TransformerEncoder, TransformerEncoderLayer
 from loguru import logger
 from threading import Lock
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from prometheus_client import Counter, Gauge, Histogram, Summary, Info
 
 logger = logger.opt( colors=True )
@@ -92,6 +97,298 @@ neuron_stats_columns = [
 ]
 
 
+class NeuronStats:
+    r"""
+    Columnar store of validator neuron statistics, one row per uid and one column per stat key.
+    Stat values are kept in a [max_n, n_keys] float64 tensor with a validity mask per entry, and the
+    EMA update counters (keys starting with 'updates') in a [max_n, n_counters] integer tensor,
+    so that EMA updates and weight extraction are tensor operations over all uids at once.
+    Rows and columns grow as higher uids and new keys are observed.
+
+    Reads as a dict of dicts [uid] -> {'stat1': val1, 'stat2': val2, ...} for uids with stats.
+    """
+    def __init__(self, max_n: int = 4096):
+        r""" Initializes an empty neuron stats store.
+            Args:
+                max_n (:obj:`int`, `optional`):
+                    Initial number of uid rows.
+        """
+        self.clear(max_n)
+
+    def clear(self, max_n: int = 4096):
+        r""" Removes all stats and keys.
+        """
+        self.stat_keys = []  # stat key per values column
+        self.key_index = {}  # stat key -> values column
+        self.counter_keys = []  # counter key per counts column
+        self.counter_index = {}  # counter key -> counts column
+
+        self.values = torch.zeros(max_n, 0, dtype=torch.float64)  # [max_n, n_keys] stat values
+        self.valid = torch.zeros(max_n, 0, dtype=torch.bool)  # [max_n, n_keys] stat value is set
+        self.counts = torch.zeros(max_n, 0, dtype=torch.long)  # [max_n, n_counters] EMA update counters
+        self.present = torch.zeros(max_n, dtype=torch.bool)  # [max_n] uid has stats
+
+    def __contains__(self, uid) -> bool:
+        # numbers.Integral also admits numpy integer uids, e.g. from metagraph or numpy indexing.
+        return isinstance(uid, numbers.Integral) and 0 <= uid < len(self.present) and bool(self.present[uid])
+
+    def __getitem__(self, uid: int) -> Dict[str, Any]:
+        if uid not in self:
+            raise KeyError(uid)
+        return self.to_dict([uid])[uid]
+
+    def __delitem__(self, uid: int):
+        if uid not in self:
+            raise KeyError(uid)
+        self.present[uid] = False
+        self.values[uid] = 0
+        self.valid[uid] = False
+        self.counts[uid] = 0
+
+    def __iter__(self):
+        return iter(self.uids())
+
+    def __len__(self) -> int:
+        return int(self.present.sum())
+
+    def get(self, uid: int, default=None):
+        return self[uid] if uid in self else default
+
+    def uids(self) -> List[int]:
+        r""" Returns the uids with stats, in increasing order.
+        """
+        return torch.nonzero(self.present).squeeze(dim=1).tolist()
+
+    def keys(self) -> List[int]:
+        return self.uids()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def to_dict(self, uids: List[int] = None) -> Dict[int, Dict[str, Any]]:
+        r""" Returns the stats of uids (default all uids with stats) as a dict of dicts, read in one pass.
+            Args:
+                uids (:obj:`List[int]`, `optional`):
+                    Uids to return stats for, uids without stats are skipped.
+
+            Returns:
+                neuron_stats (:obj:`Dict[int, Dict[str, Any]]`):
+                    [uid] -> {'stat1': val1, 'stat2': val2, ...}
+        """
+        uids = self.uids() if uids is None else [uid for uid in uids if uid in self]
+        rows = torch.tensor(uids, dtype=torch.long)
+        values, valid, counts = self.values[rows].tolist(), self.valid[rows].tolist(), self.counts[rows].tolist()
+
+        neuron_stats = {}
+        for i, uid in enumerate(uids):
+            stats = {key: val for key, val, is_valid in zip(self.stat_keys, values[i], valid[i]) if is_valid}
+            stats.update({key: count for key, count in zip(self.counter_keys, counts[i]) if count > 0})
+            neuron_stats[uid] = stats
+        return neuron_stats
+
+    def _reserve(self, uid: int):
+        r""" Grows the rows to hold uid.
+        """
+        max_n = len(self.present)
+        if uid < max_n:
+            return
+        grow = max(max_n, uid + 1 - max_n)
+        self.values = torch.cat([self.values, torch.zeros(grow, len(self.stat_keys), dtype=self.values.dtype)])
+        self.valid = torch.cat([self.valid, torch.zeros(grow, len(self.stat_keys), dtype=torch.bool)])
+        self.counts = torch.cat([self.counts, torch.zeros(grow, len(self.counter_keys), dtype=torch.long)])
+        self.present = torch.cat([self.present, torch.zeros(grow, dtype=torch.bool)])
+
+    def _column(self, key: str) -> int:
+        r""" Returns the values column of key, adding it if new.
+        """
+        if key not in self.key_index:
+            self.key_index[key] = len(self.stat_keys)
+            self.stat_keys += [key]
+            self.values = torch.cat([self.values, torch.zeros(len(self.values), 1, dtype=self.values.dtype)], dim=1)
+            self.valid = torch.cat([self.valid, torch.zeros(len(self.valid), 1, dtype=torch.bool)], dim=1)
+        return self.key_index[key]
+
+    def _counter(self, key: str) -> int:
+        r""" Returns the counts column of key, adding it if new.
+        """
+        if key not in self.counter_index:
+            self.counter_index[key] = len(self.counter_keys)
+            self.counter_keys += [key]
+            self.counts = torch.cat([self.counts, torch.zeros(len(self.counts), 1, dtype=torch.long)], dim=1)
+        return self.counter_index[key]
+
+    def _ema(self, rows: torch.LongTensor, cols: torch.LongTensor, vals: torch.DoubleTensor, alpha: float):
+        r""" Pushes vals into the EMA of (rows, cols) entries, or sets entries not yet valid. NaN values are skipped.
+        """
+        keep = ~vals.isnan()
+        rows, cols, vals = rows[keep], cols[keep], vals[keep]
+        ema = (1 - alpha) * self.values[rows, cols] + alpha * vals  # update EMA
+        self.values[rows, cols] = torch.where(self.valid[rows, cols], ema, vals)
+        self.valid[rows, cols] = True
+
+    def update(self, neuron_stats: Dict[int, Dict[str, Any]], alpha: float, synapse_keys: List[str],
+               scaling_law_power: float, logits_divergence: float) -> Tuple[List[int], List[int]]:
+        r""" Updates the stats EMAs with new individual dictionaries per uid.
+            Args:
+                neuron_stats (:obj:`Dict[int, Dict[str, Any]]`, `required`):
+                    New stats per queried uid from the latest validator forward.
+                alpha (:obj:`float`, `required`):
+                    EMA coefficient in [0, 1], higher alpha discounts older observations faster.
+                synapse_keys (:obj:`List[str]`, `required`):
+                    Stat keys to duplicate (['key']->['key!']) and push zero to its EMA if neuron non-responsive.
+                scaling_law_power (:obj:`float`, `required`):
+                    Power for modified scaling law on the EMA phrase loss.
+                logits_divergence (:obj:`float`, `required`):
+                    Penalty scaling for logits divergence excess.
+
+            Returns:
+                responsive_uids (:obj:`List[int]`):
+                    Uids with a valid synapse key value.
+                queried_uids (:obj:`List[int]`):
+                    Uids in neuron_stats.
+        """
+        uids = list(neuron_stats.keys())
+        if len(uids) == 0:
+            return [], []
+        self._reserve(max(uids))
+        rows = torch.tensor(uids, dtype=torch.long)  # [n]
+        nan = float('nan')
+
+        def incoming(key):
+            # [n] has key and [n] value (nan if absent) of the new stats
+            return (torch.tensor([key in _stats for _stats in neuron_stats.values()], dtype=torch.bool),
+                    torch.tensor([float(_stats.get(key, nan)) for _stats in neuron_stats.values()], dtype=torch.float64))
+
+        # === EMA normal update ===
+        # If synapse responsive push available values into EMA for normal update.
+        # Normal EMA values provide a view on neuron performance if fully responsive.
+        entries = [(uid, self._column(key), float(val)) for uid, _stats in neuron_stats.items() for key, val in _stats.items()]
+        if len(entries):
+            entry_rows, entry_cols, entry_vals = zip(*entries)
+            self._ema(torch.tensor(entry_rows, dtype=torch.long), torch.tensor(entry_cols, dtype=torch.long),
+                      torch.tensor(entry_vals, dtype=torch.float64), alpha)
+        self.present[rows] = True
+
+        # === Extra stats computation ===
+        # Compute values on EMA stats, such as the scaling law on EMA loss.
+        # Required for values that need to be computed on longer-term stats.
+        extra_stats = {}  # key -> ([n] has extra stat, [n] extra stat value)
+        if 'loss_nxt' in self.key_index:  # elif neuron not responsive then omit
+            loss_col = self.key_index['loss_nxt']
+            has_loss = incoming('loss_nxt')[0] & self.valid[rows, loss_col]
+
+            # estimate the effective number of model parameters from EMA loss
+            _num_params = scaling_law_loss_to_params(self.values[rows, loss_col].float())
+
+            # powered down number of params, e.g. dynamic range 3 → 6 nats for scaling_law_power=0.5
+            _pow_num_params = torch.pow(_num_params, scaling_law_power)
+
+            extra_stats['est_params_nxt'] = (has_loss, _num_params.double())
+            extra_stats['base_params_nxt'] = (has_loss, _pow_num_params.double())
+
+            if 'synergy_nxt' in self.key_index:
+                synergy_col = self.key_index['synergy_nxt']
+                has_synergy = has_loss & self.valid[rows, synergy_col]
+                shapley_values = _pow_num_params.double() + self.values[rows, synergy_col]
+
+                if 'logits_excess_nxt' in self.key_index:
+                    # penalize by logits divergence excess
+                    excess_col = self.key_index['logits_excess_nxt']
+                    penalized = shapley_values / (1 + logits_divergence * self.values[rows, excess_col])
+                    shapley_values = torch.where(self.valid[rows, excess_col], penalized, shapley_values)
+
+                extra_stats['shapley_values_nxt'] = (has_synergy, shapley_values)
+
+        # === EMA zeroing update ===
+        # Push zero into EMA for synapse_keys to exponentially decay weighting keys if neuron non-responsive
+        counter = self._counter('updates!')  # number of EMA zeroing updates
+        self.counts[rows, counter] += 1  # increment number of EMA zeroing updates
+
+        responsive = torch.zeros(len(uids), len(synapse_keys), dtype=torch.bool)
+        for k, key in enumerate(synapse_keys):
+            has_key, key_vals = incoming(key)
+            has_extra, extra_vals = extra_stats.get(key, (torch.zeros(len(uids), dtype=torch.bool),
+                                                          torch.full((len(uids),), nan, dtype=torch.float64)))
+            has_stat = has_key & ~key_vals.isnan()
+            has_extra_stat = has_extra & ~has_stat & ~extra_vals.isnan()
+            responsive[:, k] = has_stat | has_extra_stat
+
+            val = torch.zeros(len(uids), dtype=torch.float64)
+            val[has_stat] = key_vals[has_stat]
+            val[has_extra_stat] = extra_vals[has_extra_stat]
+
+            zcol = self._column(key + '!')  # zeroing key, initialized to zero to gradually increase with observations
+            zvals = torch.where(self.valid[rows, zcol], self.values[rows, zcol], torch.zeros_like(val))
+            self.values[rows, zcol] = (1 - alpha) * zvals + alpha * val
+            self.valid[rows, zcol] = True
+
+            # === EMA normal update ===
+            # Count normal EMA updates made to synapse keys.
+            counter = self._counter('updates_' + key)  # number of normal EMA updates made
+            self.counts[rows[has_key | has_extra], counter] += 1
+
+        for key, (has_extra, extra_vals) in extra_stats.items():  # detailed neuron evaluation fields
+            col = self._column(key)
+            self._ema(rows[has_extra], torch.full((int(has_extra.sum()),), col, dtype=torch.long), extra_vals[has_extra], alpha)
+
+        responsive_uids = [uid for uid, _responsive in zip(uids, responsive.tolist()) for r in _responsive if r]
+        return responsive_uids, uids  # responsive_uids, queried_uids
+
+    def weights(self, key: str, n: int) -> torch.DoubleTensor:
+        r""" Returns the key stat of uids [0, n) as weights, zero for uids without a key stat.
+            Args:
+                key (:obj:`str`, `required`):
+                    Stat key to obtain weights from.
+                n (:obj:`int`, `required`):
+                    Number of uids.
+
+            Returns:
+                weights (:obj:`torch.DoubleTensor`):
+                    [n] Key stat per uid.
+        """
+        weights = torch.zeros(n, dtype=torch.float64)
+        if key in self.key_index:
+            rows = min(n, len(self.present))
+            valid = self.valid[:rows, self.key_index[key]] & self.present[:rows]
+            weights[:rows] = torch.where(valid, self.values[:rows, self.key_index[key]], weights[:rows])
+        return weights
+
+    def state_dict(self) -> Dict[str, Any]:
+        r""" Returns the stats of uids with stats as compact tensors for saving.
+        """
+        rows = torch.nonzero(self.present).squeeze(dim=1)
+        return {'keys': list(self.stat_keys), 'counter_keys': list(self.counter_keys), 'uids': rows,
+                'values': self.values[rows], 'valid': self.valid[rows], 'counts': self.counts[rows]}
+
+    def load_state_dict(self, state_dict: Dict):
+        r""" Loads stats from state_dict(), or from a legacy dict of dicts [uid] -> {'stat1': val1, ...}.
+        """
+        self.clear(len(self.present))
+        if 'keys' in state_dict and 'values' in state_dict:
+            uids = state_dict['uids'].tolist()
+            if len(uids):
+                self._reserve(max(uids))
+            cols = torch.tensor([self._column(key) for key in state_dict['keys']], dtype=torch.long)
+            counter_cols = torch.tensor([self._counter(key) for key in state_dict['counter_keys']], dtype=torch.long)
+            rows = state_dict['uids'].long()
+            self.values[rows[:, None], cols] = state_dict['values'].double()
+            self.valid[rows[:, None], cols] = state_dict['valid']
+            self.counts[rows[:, None], counter_cols] = state_dict['counts'].long()
+            self.present[rows] = True
+        else:  # legacy dict of dicts
+            for uid, stats in state_dict.items():
+                self._reserve(uid)
+                self.present[uid] = True
+                for key, val in stats.items():
+                    if key.startswith('updates'):
+                        counter = self._counter(key)
+                        self.counts[uid, counter] = int(val)
+                    else:
+                        col = self._column(key)
+                        self.values[uid, col] = float(val)
+                        self.valid[uid, col] = True
+
+
 class neuron:
     r"""
     Creates a bittensor neuron that specializes validating other peers. The core validator
@@ -175,12 +472,19 @@ class neuron:
             self.nucleus.parameters(), lr=self.config.neuron.learning_rate, momentum=self.config.neuron.momentum
         )
 
+        # === Create query thread ===
+        # Pipelined dendrite queries run on one long-lived thread with one persistent event loop,
+        # since the grpc channels of the receptors stay bound to the event loop they were first used on.
+        self.query_loop = asyncio.new_event_loop() if self.config.neuron.pipeline_depth > 0 else None
+        self.query_pool = (ThreadPoolExecutor(max_workers=1, initializer=asyncio.set_event_loop, initargs=(self.query_loop,))
+                           if self.config.neuron.pipeline_depth > 0 else None)
+
         # === Create thread queue ===
         self.loss = None
         self.loss_agg_mutex = Lock()
 
         # === Neuron statistics variables ===
-        self.neuron_stats = {}  # neuron statistics dict of dicts: [uid] -> {'stat1': val1, 'stat2': val2, ...}
+        self.neuron_stats = NeuronStats()  # neuron statistics, reads as dict of dicts: [uid] -> {'stat1': val1, 'stat2': val2, ...}
         self.neuron_hotkeys = []  # keep neuron hotkeys to compare and check for changes after metagraph.sync()
         self.neuron_changes = {}  # neuron hotkey changes dict of dicts of dicts: [uid] -> [block] -> {'new_hotkey': , 'old_hotkey': , 'old_stats':}
         self.alpha = 0.1  # EMA coefficient in [0, 1], higher alpha discounts older observations faster
@@ -201,6 +505,7 @@ class neuron:
         self.prometheus_gauges = Gauge('validator_gauges', 'Gauges for the running validator.', ['validator_gauges_name'])
         self.prometheus_counters = Counter('validator_counters', 'Counters for the running validator.', ['validator_counters_name'])
         self.prometheus_step_time = Histogram('validator_step_time', 'Validator step time histogram.', buckets=list(range(0,2*bittensor.__blocktime__,1)))
+        self.prometheus_completion_time = Histogram('validator_completion_time', 'Validator query completion time histogram, one sample per endpoint response.', buckets=[0.25 * i for i in range(4 * bittensor.__blocktime__ + 1)])
 
         # load last saved validator values from the file system
         if not config.neuron.restart:
@@ -245,6 +550,9 @@ class neuron:
         parser.add_argument('--neuron.forward_num', type=int, help='''How much forward request before a backward call.''', default=3)
         parser.add_argument('--neuron.validation_synapse', type=str, help='''Synapse used for validation.''', default='TextCausalLMNext', choices = ['TextCausalLMNext', 'TextCausalLM'])
         parser.add_argument('--neuron.exclude_quantile', type=float, help='Exclude the lowest quantile from weight setting. (default value: -1, pulling from subtensor directly)', default=-1)
+        parser.add_argument('--neuron.query_quorum', type=int, help='''Return a step query once this many endpoints responded successfully and cancel the others, 0 waits for all endpoints.''', default=0)
+        parser.add_argument('--neuron.query_deadline', type=float, help='''Return a step query after this many seconds and cancel the outstanding calls, 0 waits up to the blocktime.''', default=0)
+        parser.add_argument('--neuron.pipeline_depth', type=int, help='''Number of next step dendrite queries kept in flight while a step is validated, 0 runs steps sequentially.''', default=0)
 
     @classmethod
     def config ( cls ):
@@ -271,6 +579,12 @@ class neuron:
                 f'{self.config.wallet.hotkey}:[bold]{self.wallet.hotkey.ss58_address[:7]}[/bold])')
 
     def __del__(self):
+        if self.query_pool is not None:
+            # Waits for the outstanding query, the event loop can only be closed once it is no longer running.
+            self.query_pool.shutdown(wait=True)
+            self.query_pool = None
+            self.query_loop.close()
+            self.query_loop = None
         self.dataset.close()
         self.dendrite.__del__()
 
@@ -325,8 +639,9 @@ class neuron:
                 path = self.config.neuron.full_path
 
             state_dict = {
-                'neuron_stats': self.neuron_stats,
-                'neuron_hotkeys': self.neuron_hotkeys
+                'neuron_stats': self.neuron_stats.state_dict(),
+                'neuron_hotkeys': self.neuron_hotkeys,
+                'dataset': self.dataset.state_dict()
             }
 
             if self.config.neuron.track_hotkey_changes:
@@ -345,12 +660,15 @@ class neuron:
                 path = self.config.neuron.full_path
             state_dict = torch.load(f'{path}/model.torch')
 
-            self.neuron_stats = state_dict['neuron_stats']
+            self.neuron_stats.load_state_dict(state_dict['neuron_stats'])  # also loads legacy dict of dicts
             self.neuron_hotkeys = state_dict['neuron_hotkeys']
 
             if 'neuron_changes' in state_dict and self.config.neuron.track_hotkey_changes:
                 self.neuron_changes = state_dict['neuron_changes']
 
+            if 'dataset' in state_dict:
+                self.dataset.load_state_dict(state_dict['dataset'])
+
             bittensor.logging.success(prefix='Reloaded model', sufix=f'<blue>{path}/model.torch</blue>')
 
         except Exception as e:
@@ -396,19 +714,20 @@ class neuron:
         """
         # === Get params for epoch ===
         # Pulling the latest chain parameters.
-        current_block = self.subtensor.block
-        batch_size = self.subtensor.validator_batch_size 
-        sequence_length = self.subtensor.validator_sequence_length
+        hyperparameters = self.subtensor.get_hyperparameters()  # read in one batched query
+        current_block = hyperparameters.block
+        batch_size = hyperparameters.validator_batch_size
+        sequence_length = hyperparameters.validator_sequence_length
         validation_len = self.config.neuron.validation_len  # Number of tokens to holdout for phrase validation beyond sequence context
         # Number of tokens to prune for phrase validation beyond sequence context
-        prune_len = self.config.neuron.prune_len = self.subtensor.prune_len
-        min_allowed_weights = self.subtensor.min_allowed_weights
-        max_weight_limit = self.subtensor.max_weight_limit
-        blocks_per_epoch = self.subtensor.validator_epoch_length if self.config.neuron.blocks_per_epoch == -1 else self.config.neuron.blocks_per_epoch
-        epochs_until_reset = self.subtensor.validator_epochs_per_reset if self.config.neuron.epochs_until_reset == -1 else self.config.neuron.epochs_until_reset
-        self.config.nucleus.scaling_law_power = self.subtensor.scaling_law_power
-        self.config.nucleus.synergy_scaling_law_power = self.subtensor.synergy_scaling_law_power
-        self.config.nucleus.logits_divergence = self.subtensor.logits_divergence
+        prune_len = self.config.neuron.prune_len = hyperparameters.prune_len
+        min_allowed_weights = hyperparameters.min_allowed_weights
+        max_weight_limit = hyperparameters.max_weight_limit
+        blocks_per_epoch = hyperparameters.validator_epoch_length if self.config.neuron.blocks_per_epoch == -1 else self.config.neuron.blocks_per_epoch
+        epochs_until_reset = hyperparameters.validator_epochs_per_reset if self.config.neuron.epochs_until_reset == -1 else self.config.neuron.epochs_until_reset
+        self.config.nucleus.scaling_law_power = hyperparameters.scaling_law_power
+        self.config.nucleus.synergy_scaling_law_power = hyperparameters.synergy_scaling_law_power
+        self.config.nucleus.logits_divergence = hyperparameters.logits_divergence
 
         # === Logs Prometheus ===
         self.prometheus_gauges.labels("current_block").set( current_block )
@@ -445,133 +764,180 @@ class neuron:
 
         self.prometheus_gauges.labels("epoch_steps").set(0)
 
+        # === Pipelined queries ===
+        # With neuron.pipeline_depth > 0 the dendrite queries of the next steps are queued on the query thread
+        # while the responses of the current step are validated and backpropagated.
+        pipeline_depth = self.config.neuron.pipeline_depth
+        pending_requests = deque()  # (request, future) of queued requests, in query order
+
         # normal epoch duration is blocks_per_epoch if all UIDs have been queried
         # try to query each UID at least once - assumes nucleus samples without replacement
         # but keep minimum epoch duration at blocks_per_epoch * block_period
         # in case of subtensor outage causing invalid block readings to prevent fast repeated weight setting
-        start_block = self.subtensor.block
-        while (self.subtensor.block < start_block + blocks_per_epoch or
-               time.time() - epoch_start_time < blocks_per_epoch * bittensor.__blocktime__):
-
-            logger.info(f'Run epoch {self.epoch} (step {epoch_steps}) while '
-                        f'({self.subtensor.block} < {start_block + blocks_per_epoch} '
-                        f'= {start_block} + {blocks_per_epoch}) or '
-                        f'({time.time() - epoch_start_time:.2f} < {blocks_per_epoch * bittensor.__blocktime__})')
-
-            start_time = time.time()
-
-            # === Forward ===
-            # Forwards inputs through the network and returns the loss
-            # and endpoint scores using shapely approximation of salience.
-            loss, stats = self.nucleus( next(self.dataset) , self.metagraph, self.dendrite )
-            self.prometheus_gauges.labels("loss").set( loss.item() )
-
-            # === Backward ===
-            # Backwards gradients through model to train gating and remote endpoints.
-            if hasattr(loss, 'grad_fn') and loss.grad_fn is not None:
-                logger.info(f'Backward <dim>(loss: {loss:.3f})</dim>')
+        # the block is polled once per step, at the end of the step
+        try:
+            start_block = current_block = self.subtensor.block
+            while (current_block < start_block + blocks_per_epoch or
+                   time.time() - epoch_start_time < blocks_per_epoch * bittensor.__blocktime__):
+
+                logger.info(f'Run epoch {self.epoch} (step {epoch_steps}) while '
+                            f'({current_block} < {start_block + blocks_per_epoch} '
+                            f'= {start_block} + {blocks_per_epoch}) or '
+                            f'({time.time() - epoch_start_time:.2f} < {blocks_per_epoch * bittensor.__blocktime__})')
+
+                start_time = time.time()
+
+                # === Query ===
+                # Queries the network with the next inputs, or takes the oldest pipelined query
+                # and submits queries of the next steps up to pipeline_depth.
+                if self.query_pool is None:
+                    request = self.nucleus.query(self.nucleus.prepare(next(self.dataset), self.metagraph), self.dendrite)
+                else:
+                    while len(pending_requests) < pipeline_depth + 1:
+                        request = self.nucleus.prepare(next(self.dataset), self.metagraph)
+                        pending_requests.append((request, self.query_pool.submit(self.nucleus.query, request, self.dendrite)))
+                    request = pending_requests.popleft()[1].result()
+                query_wait_time = time.time() - start_time
+
+                # === Forward ===
+                # Returns the loss and endpoint scores using shapely approximation of salience.
+                validate_start_time = time.time()
+                loss, stats = self.nucleus.validate(request)
+                validate_time = time.time() - validate_start_time
+                self.prometheus_gauges.labels("loss").set( loss.item() )
+
+                # === Backward ===
+                # Backwards gradients through model to train gating and remote endpoints.
                 bw_start_time = time.time()
-                (loss / self.config.neuron.forward_num).backward()
-                logger.info(f'Backward <dim>[{time.time() - bw_start_time:.3g}s]</dim>')
-
-            # === Stats update ===
-            # Updates moving averages and history.
-            responsive_uids, queried_uids = self.neuron_stats_update(stats)
-
-            epoch_responsive_uids |= set(responsive_uids)
-            epoch_queried_uids |= set(queried_uids)
-
-            # === State update ===
-            # Prints step logs to screen.
-            epoch_steps += 1
-            self.global_step += 1
-            self.prometheus_gauges.labels("global_step").inc()
-            self.prometheus_gauges.labels("epoch_steps").inc()
-
-            # === Block state ===
-            current_block = self.subtensor.block
-            self.prometheus_gauges.labels("current_block").set(current_block)
-            self.prometheus_gauges.labels("last_updated").set( current_block - self.metagraph.last_update[self.uid] )
-
-            # === Step time ===
-            step_time = time.time() - start_time
-            self.prometheus_step_time.observe( step_time )
-            self.prometheus_gauges.labels('step_time').set( step_time )
+                if hasattr(loss, 'grad_fn') and loss.grad_fn is not None:
+                    logger.info(f'Backward <dim>(loss: {loss:.3f})</dim>')
+                    (loss / self.config.neuron.forward_num).backward()
+                    logger.info(f'Backward <dim>[{time.time() - bw_start_time:.3g}s]</dim>')
+                backward_time = time.time() - bw_start_time
+
+                # === Stats update ===
+                # Updates moving averages and history.
+                stats_start_time = time.time()
+                responsive_uids, queried_uids = self.neuron_stats_update(stats)
+                stats_time = time.time() - stats_start_time
+
+                # === Stage times ===
+                for completion_time in request.completion_times:
+                    self.prometheus_completion_time.observe( completion_time )
+                self.prometheus_gauges.labels("stage_query").set( request.query_time )
+                self.prometheus_gauges.labels("stage_query_wait").set( query_wait_time )
+                self.prometheus_gauges.labels("stage_validate").set( validate_time )
+                self.prometheus_gauges.labels("stage_backward").set( backward_time )
+                self.prometheus_gauges.labels("stage_stats_update").set( stats_time )
+                logger.info(f'Step stages \t| query {request.query_time:.3g}s (wait {query_wait_time:.3g}s) | '
+                            f'validate {validate_time:.3g}s | backward {backward_time:.3g}s | stats {stats_time:.3g}s '
+                            f'<dim>[pipeline_depth={pipeline_depth}]</dim>')
+
+                epoch_responsive_uids |= set(responsive_uids)
+                epoch_queried_uids |= set(queried_uids)
+
+                # === State update ===
+                # Prints step logs to screen.
+                epoch_steps += 1
+                self.global_step += 1
+                self.prometheus_gauges.labels("global_step").inc()
+                self.prometheus_gauges.labels("epoch_steps").inc()
+
+                # === Block state ===
+                current_block = self.subtensor.block
+                self.prometheus_gauges.labels("current_block").set(current_block)
+                self.prometheus_gauges.labels("last_updated").set( current_block - self.metagraph.last_update[self.uid] )
+                subtensor_cache_info = self.subtensor.cache_info()
+                self.prometheus_gauges.labels("subtensor_cache_hits").set( subtensor_cache_info.hits )
+                self.prometheus_gauges.labels("subtensor_cache_misses").set( subtensor_cache_info.misses )
+
+                # === Step time ===
+                step_time = time.time() - start_time
+                self.prometheus_step_time.observe( step_time )
+                self.prometheus_gauges.labels('step_time').set( step_time )
             
-            if epoch_steps % 25 == 1:
-                # validator identifier status console message (every 25 validation steps)
+                if epoch_steps % 25 == 1:
+                    # validator identifier status console message (every 25 validation steps)
+                    print(f"[white not bold]{datetime.datetime.now():%Y-%m-%d %H:%M:%S}[/white not bold]{' ' * 4} | "
+                          f"{f'[bright_white]core_validator[/bright_white]'.center(16 + len('[bright_white][/bright_white]'))} | "
+                          f"UID [cyan]{self.uid}[/cyan] "
+                          f"[dim white not bold][{self.dendrite.receptor_pool.external_ip}][/dim white not bold] "
+                          f"[white not bold]cold:[bold]{self.wallet.name}[/bold]:"
+                          f"[bright_white not bold]{self.wallet.coldkeypub.ss58_address}[/bright_white not bold] "
+                          f"[dim white]/[/dim white] "
+                          f"hot:[bold]{self.config.wallet.hotkey}[/bold]:"
+                          f"[bright_white not bold]{self.wallet.hotkey.ss58_address}[/bright_white not bold][/white not bold]")
+
+                    # validator update status console message
+                    print(f"[white not bold]{datetime.datetime.now():%Y-%m-%d %H:%M:%S}[/white not bold]{' ' * 4} | "
+                          f"{f'UID [bright_cyan]{self.uid}[/bright_cyan]'.center(16 + len('[bright_cyan][/bright_cyan]'))} | "
+                          f'Updated [yellow]{current_block - self.metagraph.last_update[self.uid]}[/yellow] [dim]blocks ago[/dim] | '
+                          f'Dividends [green not bold]{self.metagraph.dividends[self.uid]:.5f}[/green not bold] | '
+                          f'Stake \u03C4[magenta not bold]{self.metagraph.stake[self.uid]:.5f}[/magenta not bold] '
+                          f'[dim](retrieved [yellow]{current_block - start_block}[/yellow] blocks ago from {self.subtensor.network})[/dim]')
+
+                    # save neuron_stats to filesystem
+                    self.save()
+
+                # step update console message (every validation step)
                 print(f"[white not bold]{datetime.datetime.now():%Y-%m-%d %H:%M:%S}[/white not bold]{' ' * 4} | "
-                      f"{f'[bright_white]core_validator[/bright_white]'.center(16 + len('[bright_white][/bright_white]'))} | "
-                      f"UID [cyan]{self.uid}[/cyan] "
-                      f"[dim white not bold][{self.dendrite.receptor_pool.external_ip}][/dim white not bold] "
-                      f"[white not bold]cold:[bold]{self.wallet.name}[/bold]:"
-                      f"[bright_white not bold]{self.wallet.coldkeypub.ss58_address}[/bright_white not bold] "
-                      f"[dim white]/[/dim white] "
-                      f"hot:[bold]{self.config.wallet.hotkey}[/bold]:"
-                      f"[bright_white not bold]{self.wallet.hotkey.ss58_address}[/bright_white not bold][/white not bold]")
-
-                # validator update status console message
-                print(f"[white not bold]{datetime.datetime.now():%Y-%m-%d %H:%M:%S}[/white not bold]{' ' * 4} | "
-                      f"{f'UID [bright_cyan]{self.uid}[/bright_cyan]'.center(16 + len('[bright_cyan][/bright_cyan]'))} | "
-                      f'Updated [yellow]{current_block - self.metagraph.last_update[self.uid]}[/yellow] [dim]blocks ago[/dim] | '
-                      f'Dividends [green not bold]{self.metagraph.dividends[self.uid]:.5f}[/green not bold] | '
-                      f'Stake \u03C4[magenta not bold]{self.metagraph.stake[self.uid]:.5f}[/magenta not bold] '
-                      f'[dim](retrieved [yellow]{current_block - start_block}[/yellow] blocks ago from {self.subtensor.network})[/dim]')
-
-                # save neuron_stats to filesystem
-                self.save()
-
-            # step update console message (every validation step)
-            print(f"[white not bold]{datetime.datetime.now():%Y-%m-%d %H:%M:%S}[/white not bold]{' ' * 4} | "
-                  f"{f'[magenta dim not bold]#{current_block}[/magenta dim not bold]'.center(16 + len('[magenta dim not bold][/magenta dim not bold]'))} | "
-                  f'[green not bold]{current_block - start_block}[/green not bold]/'
-                  f'[white not bold]{blocks_per_epoch}[/white not bold] [dim]blocks/epoch[/dim] | '
-                  f'[white not bold]Step {epoch_steps}[white not bold] '
-                  f'[dim] Epoch {self.epoch}[/dim] | '
-                  f'[bright_green not bold]{len(responsive_uids)}[/bright_green not bold]/'
-                  f'[white]{len(queried_uids)}[/white] '
-                  f'[[yellow]{step_time:.3g}[/yellow]s] '
-                  f'[dim white not bold][green]{len(epoch_responsive_uids)}[/green]/'
-                  f'{len(epoch_queried_uids)}[/dim white not bold]')
-
-            if self.config.logging.debug or self.config.logging.trace:
-                # === Print stats update (table) ===
-                # Prints exponential moving average statistics of valid neurons from latest validator forward
-                stats_table({uid: self.neuron_stats[uid]
-                             for uid, stat in stats.items() if len(set(stat.keys()) & set(self.synapse_keys))},
-                            self.weight_key, self.config.get('width', None),
-                            f'[white] Stats update [/white] | ' + str(self),  # title
-                            f'#{current_block}: '
-                            f'[bold]{current_block - start_block}[/bold]/{blocks_per_epoch} (blocks/epoch) | '
-                            f'Epoch {self.epoch} | '
-                            f'[white] Step {epoch_steps} ({self.global_step} global) \[{step_time:.3g}s] [/white]')  # caption
-
-                # === Calculate neuron weights ===
-                sample_uids, sample_weights = self.calculate_weights()
-                self.weights_table(sample_uids, sample_weights,
-                                   include_uids=list(stats.keys()), num_rows=len(stats) + 25)  # print weights table
-
-            # === Logs ===
-            if self.config.using_wandb:
-                for uid, vals in self.neuron_stats.items():
-                    for key in vals:  # detailed neuron evaluation fields, e.g. loss, shapley_values, synergy
-                        wandb.log({f'stats/{key}_{uid}': vals[key]}, step=current_block, commit=False)
-
-                wandb.log({'epoch/epoch': self.epoch, 'epoch/epoch_steps': epoch_steps,
-                           'epoch/global_steps': self.global_step, 'epoch/loss': loss.item(),
-                           'epoch/time': step_time}, step=current_block, commit=True)
-
-            # Do the backward request after the a queue of forward requests got finished.  
-            if epoch_steps % self.config.neuron.forward_num == 1:
-                start_time = time.time()
-                logger.info('Model update \t| Optimizer step')
-
-                # === Apply gradients ===
-                # Applies local gradients to parameters.
-                clip_grad_norm_(self.nucleus.parameters(), self.config.neuron.clip_gradients)
-                self.optimizer.step()
-                self.optimizer.zero_grad()
-                logger.info(f'Model update \t| Optimizer step <dim>[{time.time() - start_time:.3g}s]</dim>')
+                      f"{f'[magenta dim not bold]#{current_block}[/magenta dim not bold]'.center(16 + len('[magenta dim not bold][/magenta dim not bold]'))} | "
+                      f'[green not bold]{current_block - start_block}[/green not bold]/'
+                      f'[white not bold]{blocks_per_epoch}[/white not bold] [dim]blocks/epoch[/dim] | '
+                      f'[white not bold]Step {epoch_steps}[white not bold] '
+                      f'[dim] Epoch {self.epoch}[/dim] | '
+                      f'[bright_green not bold]{len(responsive_uids)}[/bright_green not bold]/'
+                      f'[white]{len(queried_uids)}[/white] '
+                      f'[[yellow]{step_time:.3g}[/yellow]s] '
+                      f'[dim white not bold][green]{len(epoch_responsive_uids)}[/green]/'
+                      f'{len(epoch_queried_uids)}[/dim white not bold]')
+
+                if self.config.logging.debug or self.config.logging.trace:
+                    # === Print stats update (table) ===
+                    # Prints exponential moving average statistics of valid neurons from latest validator forward
+                    stats_table(self.neuron_stats.to_dict([uid for uid, stat in stats.items()
+                                                           if len(set(stat.keys()) & set(self.synapse_keys))]),
+                                self.weight_key, self.config.get('width', None),
+                                f'[white] Stats update [/white] | ' + str(self),  # title
+                                f'#{current_block}: '
+                                f'[bold]{current_block - start_block}[/bold]/{blocks_per_epoch} (blocks/epoch) | '
+                                f'Epoch {self.epoch} | '
+                                f'[white] Step {epoch_steps} ({self.global_step} global) \[{step_time:.3g}s] [/white]')  # caption
+
+                    # === Calculate neuron weights ===
+                    sample_uids, sample_weights = self.calculate_weights()
+                    self.weights_table(sample_uids, sample_weights,
+                                       include_uids=list(stats.keys()), num_rows=len(stats) + 25)  # print weights table
+
+                # === Logs ===
+                if self.config.using_wandb:
+                    for uid, vals in self.neuron_stats.items():
+                        for key in vals:  # detailed neuron evaluation fields, e.g. loss, shapley_values, synergy
+                            wandb.log({f'stats/{key}_{uid}': vals[key]}, step=current_block, commit=False)
+
+                    wandb.log({'epoch/epoch': self.epoch, 'epoch/epoch_steps': epoch_steps,
+                               'epoch/global_steps': self.global_step, 'epoch/loss': loss.item(),
+                               'epoch/time': step_time}, step=current_block, commit=True)
+
+                # Do the backward request after the a queue of forward requests got finished.  
+                if epoch_steps % self.config.neuron.forward_num == 1:
+                    start_time = time.time()
+                    logger.info('Model update \t| Optimizer step')
+
+                    # === Apply gradients ===
+                    # Applies local gradients to parameters.
+                    clip_grad_norm_(self.nucleus.parameters(), self.config.neuron.clip_gradients)
+                    self.optimizer.step()
+                    self.optimizer.zero_grad()
+                    logger.info(f'Model update \t| Optimizer step <dim>[{time.time() - start_time:.3g}s]</dim>')
+        finally:
+            # === Drain pipelined queries ===
+            # Queries beyond the epoch are not validated, their UIDs are restored to be queried first next epoch.
+            # Queries which have not started are cancelled rather than waited for.
+            for request, future in reversed(pending_requests):
+                future.cancel()
+                self.nucleus.restore(request)
+            pending_requests.clear()
 
         self.metagraph_sync()  # Reset metagraph.
 
@@ -632,7 +998,7 @@ class neuron:
         r""" Syncing metagraph together with other metagraph-size related objects
         """
         old_hotkeys = self.neuron_hotkeys + [] if self.neuron_hotkeys else self.metagraph.hotkeys
-        self.metagraph.sync()
+        self.metagraph.sync(incremental=True)
         self.neuron_hotkeys = self.metagraph.hotkeys
 
         changed_hotkeys = []
@@ -657,80 +1023,8 @@ class neuron:
     def neuron_stats_update(self, neuron_stats: Dict[int, Dict[str, Any]]):
         r""" Updates self.neuron_stats with new individual dictionaries per uid.
         """
-        responsive_uids = []
-        for _uid, _stats in neuron_stats.items():
-            stats = self.neuron_stats.setdefault(_uid, {})
-
-            # === EMA normal update ===
-            # If synapse responsive push available values into EMA for normal update.
-            # Normal EMA values provide a view on neuron performance if fully responsive.
-            for key in _stats:  # detailed neuron evaluation fields, e.g. loss, shapley_values, synergy
-                if math.isnan(_stats[key]):
-                    continue
-                if key in stats:
-                    stats[key] = (1 - self.alpha) * stats[key] + self.alpha * _stats[key]  # update EMA
-                else:
-                    stats.setdefault(key, _stats[key])
-
-            # === Extra stats computation ===
-            # Compute values on EMA stats, such as the scaling law on EMA loss.
-            # Required for values that need to be computed on longer-term stats.
-            extra_stats = {}
-            if 'loss_nxt' in _stats and 'loss_nxt' in stats:  # elif neuron not responsive then omit
-                # estimate the effective number of model parameters from EMA loss
-                _num_params = scaling_law_loss_to_params(torch.tensor(stats['loss_nxt']))
-
-                # powered down number of params, e.g. dynamic range 3 → 6 nats for scaling_law_power=0.5
-                _pow_num_params = torch.pow(_num_params, self.config.nucleus.scaling_law_power)
-
-                extra_stats.update({'est_params_nxt': _num_params.item(), 'base_params_nxt': _pow_num_params.item()})
-
-                if 'synergy_nxt' in stats:
-                    extra_stats['shapley_values_nxt'] = extra_stats['base_params_nxt'] + stats['synergy_nxt']
-
-                if 'logits_excess_nxt' in stats:
-                    # penalize by logits divergence excess
-                    extra_stats['shapley_values_nxt'] /= 1 + self.config.nucleus.logits_divergence * stats['logits_excess_nxt']
-
-            # === EMA zeroing update ===
-            # Push zero into EMA for synapse_keys to exponentially decay weighting keys if neuron non-responsive
-            if 'updates!' in stats:
-                stats['updates!'] += 1  # increment number of EMA zeroing updates
-            else:
-                stats.setdefault('updates!', 1)  # number of EMA zeroing updates init to zero
-
-            for key in self.synapse_keys:
-                zkey = key + '!'  # zeroing key
-                stats.setdefault(zkey, 0.)  # initialize zkey val to zero to gradually increase with observations
-                if key in _stats and not math.isnan(_stats[key]):
-                    responsive_uids += [_uid]
-                    stats[zkey] = (1 - self.alpha) * stats[zkey] + self.alpha * _stats[key]
-                elif key in extra_stats and not math.isnan(extra_stats[key]):
-                    responsive_uids += [_uid]
-                    stats[zkey] = (1 - self.alpha) * stats[zkey] + self.alpha * extra_stats[key]
-                else:
-                    stats[zkey] = (1 - self.alpha) * stats[zkey]  # + self.alpha * 0
-
-            # === EMA normal update ===
-            # If synapse responsive push available values into EMA for normal update.
-            # Normal EMA values provide a view on neuron performance if fully responsive.
-            for key in self.synapse_keys:
-                if key in _stats or key in extra_stats:
-                    updates = 'updates_' + key
-                    if updates in stats:
-                        stats[updates] += 1  # increment number of normal EMA updates made
-                    else:
-                        stats.setdefault(updates, 1)  # add updates fields for new uid entries
-
-            for key in extra_stats:  # detailed neuron evaluation fields, e.g. loss, shapley_values, synergy
-                if math.isnan(extra_stats[key]):
-                    continue
-                if key in stats:
-                    stats[key] = (1 - self.alpha) * stats[key] + self.alpha * extra_stats[key]  # update EMA
-                else:
-                    stats.setdefault(key, extra_stats[key])
-
-        return responsive_uids, list(neuron_stats.keys())  # responsive_uids, queried_uids
+        return self.neuron_stats.update(neuron_stats, self.alpha, self.synapse_keys,
+                                        self.config.nucleus.scaling_law_power, self.config.nucleus.logits_divergence)
 
     def calculate_weights(self):
         r""" Calculates neuron set-weights from weight_key mapped values. Defines weight_key as the neuron stats key
@@ -743,10 +1037,8 @@ class neuron:
         max_weight_limit = self.subtensor.max_weight_limit
 
         # === Populate neuron weights ===
-        neuron_weights = torch.zeros_like(self.metagraph.S)  # allow unevaluated UIDs for min_allowed_weights
-        for uid in self.neuron_stats:
-            if weight_key in self.neuron_stats[uid]:
-                neuron_weights[uid] = torch.tensor([self.neuron_stats[uid][weight_key]])
+        # allow unevaluated UIDs for min_allowed_weights
+        neuron_weights = self.neuron_stats.weights(weight_key, len(self.metagraph.S)).to(self.metagraph.S.dtype)
 
         # === Filter to non-zero weights ===
         sample_uids = torch.argwhere(neuron_weights > 0).squeeze(dim=1)  # find uids with non-zero weight
@@ -787,9 +1079,10 @@ class neuron:
         _neuron_stats = {}
         uid_weights = []  # (uid, weight) tuples for sorting to find top/bottom weights
         unvalidated = []
+        sample_stats = self.neuron_stats.to_dict(sample_uids.tolist())
         for uid, weight in zip(sample_uids.tolist(), sample_weights.tolist()):
-            if uid in self.neuron_stats:
-                _neuron_stats[uid] = {k: v for k, v in self.neuron_stats[uid].items()}
+            if uid in sample_stats:
+                _neuron_stats[uid] = sample_stats[uid]
                 _neuron_stats[uid]['weight'] = weight
                 uid_weights += [(uid, weight)]
             else:
@@ -924,48 +1217,31 @@ class nucleus( torch.nn.Module ):
                 neuron_stats (:obj:`Dict`, `required`):
                     Statistics per endpoint for this batch.
         """
-        start_time = time.time()
+        request = self.query(self.prepare(inputs, metagraph), dendrite)
+        return self.validate(request)
 
+    def prepare(
+            self,
+            inputs: torch.FloatTensor,
+            metagraph: 'bittensor.Metagraph',
+    ) -> SimpleNamespace:
+        r"""
+        Prunes the inputs and selects the endpoints and synapses of a validator request.
+        Takes the next UIDs from self.permute_uids, so requests must be prepared in query order.
+            Args:
+                inputs (:obj:`torch.FloatTensor` of shape :obj:`(batch_size, *-1*)`, `required`):
+                    Tensor inputs to distribute to neurons using query context.
+                metagraph (bittensor.Metagraph):
+                    Metagraph object used to query network information.
+            Returns:
+                request (:obj:`SimpleNamespace`):
+                    Request with inputs, inputs_seq, uids, endpoints and synapses to query.
+        """
         val_len = self.config.neuron.validation_len  # Number of tokens to holdout for phrase validation beyond sequence context
         prune_len = self.config.neuron.prune_len  # Number of tokens to prune from each validation input sequence
         inputs = prune_tokens(inputs.to(self.device), prune_len=prune_len, margin=val_len+3)  # prune input sequence without last validation tokens [batch_size, sequence_len]
         inputs_seq = inputs[..., :-val_len]  # sequence without validation tokens [batch_size, sequence_len]
 
-        # === Create the local context used to select endpoints ===
-        # The context tensor returns a hidden unit representation for the text inputs
-        # this context can be used as input to the gates in the next step.
-        # embedding: retrieve learned representation vectors for input vocabulary tokens.
-        # inputs.shape = [batch_size, sequence_len]
-        # embedding.shape = [batch_size, sequence_len, bittensor.__network_dim__]
-        embedding = self.token_embedding(inputs_seq) * math.sqrt(bittensor.__network_dim__)
-
-        # === Create an attention mask ===
-        # The attention mask will mask out parts of the context
-        # This prevents cheating and forward-looking when predicting each token in the sequence.
-        # src_mask: (torch.FloatTensor) attention mask adds -inf to positions not allowed to attend
-        # src_mask.shape = [sequence_len, sequence_len]
-        src_mask = torch.triu(torch.ones(embedding.size(1), embedding.size(1)) * float('-inf'), diagonal=1)
-        src_mask = src_mask.to(self.device)
-
-        # === Apply the positional encoding to help select endpoints ===
-        # The positional encoder provides information based on the relative postion of each token
-        # embedding.shape = [batch_size, sequence_len, bittensor.__network_dim__]
-        # pos_embedding: (torch.FloatTensor) positional encoded embedding.
-        # pos_embedding.shape = [batch_size, sequence_len, bittensor.__network_dim__]
-        pos_embedding = self.local_pos_encoder(embedding)
-
-        # routing_context: (torch.FloatTensor): context tensor which is used to select endpoints.
-        # routing_context.shape = [ batch size, __network_dim__ ]
-        routing_context = self.routing_encoder(pos_embedding, mask=src_mask)
-
-        # === Get gate values for UIDs. ===
-        # We iterate over each of the network UIDs and compute a querying score for each
-        # using the gating function. This returns a score per endpoint per example.
-        # routing_score: (torch.FloatTensor): score per example, per endpoint.
-        # routing_score.shape = [metagraph.n]
-        # The gates act over the last embedding of the routing_context.
-        routing_score = torch.mean(self.sigmoid(self.gates(routing_context[:, -1, :])), dim=0)
-
         # Ensure number of queried neurons does not exceed metagraph.n
         num_endpoints = min([self.config.nucleus.topk, metagraph.n])
 
@@ -984,11 +1260,6 @@ class nucleus( torch.nn.Module ):
         # random_endpoints: List[bittensor.endpoints]: endpoint information for filtered uids.
         # len(neurons) == self.config.nucleus.topk
         random_endpoints = [metagraph.endpoints[uid] for uid in random_uids]
-        num_endpoints = len(random_endpoints)  # in case len(self.permute_uids) < num_endpoints during random_uids select
-
-        logger.info(f'Forward \t| Routing forward <dim>[{time.time() - start_time:.3g}s]</dim>')
-        logger.info(f'Dendrite \t| Request {num_endpoints} x {list(inputs_seq.shape)} (prune_len={prune_len})')
-        request_start_time = time.time()
 
         # === Define which synapse we want to use ===
         # The synapse defines the task we are sending to the neurons
@@ -999,6 +1270,44 @@ class nucleus( torch.nn.Module ):
         else: 
             synapses = [(bittensor.synapse.TextCausalLM(), textcausallm)]
 
+        return SimpleNamespace(inputs=inputs, inputs_seq=inputs_seq, uids=random_uids,
+                               endpoints=random_endpoints, synapses=synapses)
+
+    def restore(self, request: SimpleNamespace):
+        r"""
+        Returns the UIDs of a prepared request that will not be validated to the front of self.permute_uids,
+        so that they are queried next.
+            Args:
+                request (:obj:`SimpleNamespace`):
+                    Request from prepare().
+        """
+        if len(self.permute_uids) == 0:
+            self.permute_uids = request.uids
+        else:
+            self.permute_uids = torch.cat([request.uids, self.permute_uids])
+
+    def query(
+            self,
+            request: SimpleNamespace,
+            dendrite: 'bittensor.Dendrite',
+    ) -> SimpleNamespace:
+        r"""
+        Queries the request endpoints with the request synapses. Does not use nucleus parameters,
+        so it can run in a background thread while earlier requests are validated.
+            Args:
+                request (:obj:`SimpleNamespace`):
+                    Request from prepare().
+                dendrite (bittensor.Dendrite):
+                    Dendrite RPC client used to make network queries.
+            Returns:
+                request (:obj:`SimpleNamespace`):
+                    Request with query_responses, return_ops, times and query_time added.
+        """
+        prune_len = self.config.neuron.prune_len
+        num_endpoints = len(request.endpoints)  # in case len(self.permute_uids) < num_endpoints during random_uids select
+        logger.info(f'Dendrite \t| Request {num_endpoints} x {list(request.inputs_seq.shape)} (prune_len={prune_len})')
+        request_start_time = time.time()
+
         # === Query the endpoints ===
         # Makes the dendrite call into the network returning the representations
         # for each of the endpoints. The return ops can be used to filter weights and outputs.
@@ -1006,12 +1315,20 @@ class nucleus( torch.nn.Module ):
         # query_responses.shape = self.config.nucleus.topk * num_synapses * [batch_size, sequence_len, synapse_dim]
         # return_ops: (torch.int64): Return ops.
         # return_ops.shape = self.config.nucleus.topk * [num_synapses]
+        # === Stream until quorum or deadline ===
+        # Records the completion time of each endpoint response as it arrives, outstanding
+        # calls are cancelled once query_quorum endpoints succeeded or query_deadline passed.
+        completion_times = []
         query_responses, return_ops, times = dendrite.text(
-            endpoints=random_endpoints,
-            inputs=inputs_seq,
-            synapses=[syn for syn, _ in synapses],
-            timeout=bittensor.__blocktime__
+            endpoints=request.endpoints,
+            inputs=request.inputs_seq,
+            synapses=[syn for syn, _ in request.synapses],
+            timeout=bittensor.__blocktime__,
+            min_success=self.config.neuron.query_quorum if self.config.neuron.query_quorum > 0 else None,
+            deadline=self.config.neuron.query_deadline if self.config.neuron.query_deadline > 0 else None,
+            callback=lambda *_: completion_times.append(time.time() - request_start_time)
         )
+        request.completion_times = completion_times
 
         if self.config.nucleus.no_dendrite_backward:
             query_responses = [[syn.detach().to(self.device) for syn in res] for res in query_responses]
@@ -1024,12 +1341,73 @@ class nucleus( torch.nn.Module ):
             for response in responses:
                 response.to(self.device)
 
-        logger.info(f'Dendrite \t| Request {num_endpoints} x {list(inputs_seq.shape)} '
-                    f'<dim>[{time.time() - request_start_time:.3g}s]</dim>')
+        request.query_time = time.time() - request_start_time
+        logger.info(f'Dendrite \t| Request {num_endpoints} x {list(request.inputs_seq.shape)} '
+                    f'({len(completion_times)}/{num_endpoints} completed) <dim>[{request.query_time:.3g}s]</dim>')
+
+        request.query_responses, request.return_ops, request.times = query_responses, return_ops, times
+        return request
+
+    def validate(
+            self,
+            request: SimpleNamespace,
+    ):
+        r"""
+        Calculates routing_score and Shapley values for the synapse responses of a queried request.
+            Args:
+                request (:obj:`SimpleNamespace`):
+                    Request from query().
+            Returns:
+                loss (:obj:`torch.FloatTensor`):
+                    Loss for training validator nucleus and dendrite backward to endpoints.
+                neuron_stats (:obj:`Dict`, `required`):
+                    Statistics per endpoint for this batch.
+        """
+        start_time = time.time()
+
+        val_len = self.config.neuron.validation_len  # Number of tokens to holdout for phrase validation beyond sequence context
+        inputs, inputs_seq = request.inputs, request.inputs_seq
+
+        # === Create the local context used to select endpoints ===
+        # The context tensor returns a hidden unit representation for the text inputs
+        # this context can be used as input to the gates in the next step.
+        # embedding: retrieve learned representation vectors for input vocabulary tokens.
+        # inputs.shape = [batch_size, sequence_len]
+        # embedding.shape = [batch_size, sequence_len, bittensor.__network_dim__]
+        embedding = self.token_embedding(inputs_seq) * math.sqrt(bittensor.__network_dim__)
+
+        # === Create an attention mask ===
+        # The attention mask will mask out parts of the context
+        # This prevents cheating and forward-looking when predicting each token in the sequence.
+        # src_mask: (torch.FloatTensor) attention mask adds -inf to positions not allowed to attend
+        # src_mask.shape = [sequence_len, sequence_len]
+        src_mask = torch.triu(torch.ones(embedding.size(1), embedding.size(1)) * float('-inf'), diagonal=1)
+        src_mask = src_mask.to(self.device)
+
+        # === Apply the positional encoding to help select endpoints ===
+        # The positional encoder provides information based on the relative postion of each token
+        # embedding.shape = [batch_size, sequence_len, bittensor.__network_dim__]
+        # pos_embedding: (torch.FloatTensor) positional encoded embedding.
+        # pos_embedding.shape = [batch_size, sequence_len, bittensor.__network_dim__]
+        pos_embedding = self.local_pos_encoder(embedding)
+
+        # routing_context: (torch.FloatTensor): context tensor which is used to select endpoints.
+        # routing_context.shape = [ batch size, __network_dim__ ]
+        routing_context = self.routing_encoder(pos_embedding, mask=src_mask)
+
+        # === Get gate values for UIDs. ===
+        # We iterate over each of the network UIDs and compute a querying score for each
+        # using the gating function. This returns a score per endpoint per example.
+        # routing_score: (torch.FloatTensor): score per example, per endpoint.
+        # routing_score.shape = [metagraph.n]
+        # The gates act over the last embedding of the routing_context.
+        routing_score = torch.mean(self.sigmoid(self.gates(routing_context[:, -1, :])), dim=0)
+
+        logger.info(f'Forward \t| Routing forward <dim>[{time.time() - start_time:.3g}s]</dim>')
 
         # === Prepare validation parameter set ===
         console_width = self.config.get('width', None)  # console width for rich table displays of synapse measures
-        validation_params = (random_uids, query_responses, return_ops, times, routing_score,
+        validation_params = (request.uids, request.query_responses, request.return_ops, request.times, routing_score,
                              inputs, val_len, self.loss_fct,
                              self.config.nucleus.scaling_law_power, self.config.nucleus.synergy_scaling_law_power,
                              self.config.nucleus.logits_divergence,
@@ -1040,7 +1418,7 @@ class nucleus( torch.nn.Module ):
 
         # === Validate synapse responses ===
         # Iterate over all queried synapses and validate responses
-        for i, (synapse, validate_func) in enumerate(synapses):
+        for i, (synapse, validate_func) in enumerate(request.synapses):
             _loss, stats = validate_func(*validation_params, synapse=synapse, index_s=i)  # validate individual synapse
             loss += _loss  # add neuron_loss and routing_loss
 
@@ -1129,13 +1507,12 @@ def textcausallm(uids: torch.Tensor, query_responses: List[List[torch.FloatTenso
                            'est_params' + _ext: _num_params, 'base_params' + _ext: _pow_num_params,
                            'synergy' + _ext: 0, 'synergy_loss_diff' + _ext: 0})
 
-    def _synergy(first, second, target, _ext):
-        # Combined logits: log of average probabilities per token between responses
-        combined_logits = torch.log((torch.softmax(first['logits' + _ext], dim=-1) +
-                                     torch.softmax(second['logits' + _ext], dim=-1)) / 2 + 1e-40)
-        measured_loss = calc_loss_fct(loss_fct, combined_logits, target)  # actual measured loss
+    def _synergy(_stats, target, _ext):
+        # Target token probabilities, combined logits of a pair are the log of their average probabilities per token
+        logits = _stats['logits' + _ext]
+        probs = torch.softmax(logits.reshape(-1, logits.shape[-1]), dim=-1)  # [batch_size * sequence_len, vocab_size]
 
-        return measured_loss
+        return probs.gather(-1, target.reshape(-1, 1).to(probs.device))[:, 0]  # [batch_size * sequence_len]
 
     shapley_start_time = time.time()
 
@@ -1147,10 +1524,10 @@ def textcausallm(uids: torch.Tensor, query_responses: List[List[torch.FloatTenso
 
     synergy_start_time = time.time()
 
-    syn_loss_diff = shapley_synergy(stats, _synergy, ext='', target=inputs_seq[:, 1:],
-                                    scaling_law_power=synergy_scaling_law_power)
-    syn_loss_diff_val = shapley_synergy(stats, _synergy, ext='_val', target=inputs_val,
-                                        scaling_law_power=synergy_scaling_law_power)
+    syn_loss_diff, synergy_bytes = shapley_synergy(stats, _synergy, ext='', target=inputs_seq[:, 1:],
+                                                   scaling_law_power=synergy_scaling_law_power)
+    syn_loss_diff_val, synergy_bytes_val = shapley_synergy(stats, _synergy, ext='_val', target=inputs_val,
+                                                           scaling_law_power=synergy_scaling_law_power)
 
     # === Shapley value combination ===
     # Combine base values with synergy approximation to get final Shapley values.
@@ -1170,7 +1547,8 @@ def textcausallm(uids: torch.Tensor, query_responses: List[List[torch.FloatTenso
                 s[key] = s[key].item()
 
     logger.info(f'{str(synapse)} \t| Shapley synergy values (power={synergy_scaling_law_power:.1f}) '
-                f'<dim>[{time.time() - synergy_start_time:.3g}s]</dim>')
+                f'<dim>[{time.time() - synergy_start_time:.3g}s, '
+                f'{max(synergy_bytes, synergy_bytes_val) / 2 ** 20:.1f}MB]</dim>')
 
     if logging:
         # === Synergy table ===
@@ -1238,9 +1616,30 @@ def textcausallmnext(uids: torch.Tensor, query_responses: List[List[torch.FloatT
 
     inputs_nxt = inputs[..., -validation_len:]  # input validation with next token target phrase [batch_size, val_len]
 
+    # === Stacked phrase cross entropy ===
+    # Score successful responses of the same shape together in one phrase_cross_entropy call.
+    stacked_losses = {}  # {uid: (losses_val, losses)}
+    response_groups = {}  # {response shape: [(uid, query_response), ...]}
+    for index, _uid in enumerate(uids.tolist()):
+        if return_ops[index][index_s] == bittensor.proto.ReturnCode.Success:
+            query_response = query_responses[index][index_s]
+            if query_response.dim() == 3:
+                response_groups.setdefault(tuple(query_response.shape), []).append((_uid, query_response))
+
+    for group in response_groups.values():
+        try:
+            losses_val, losses = phrase_cross_entropy(inputs_nxt, torch.stack([r for _, r in group]), reduce=False)
+            for i, (_uid, _) in enumerate(group):
+                stacked_losses[_uid] = (losses_val[i], losses[i])
+        except Exception as e:
+            logger.warning(f'{str(synapse)} \t| Stacked phrase cross entropy error, scoring per uid: {e}')
+
     def _base_params(_stats, query_response):
         # topk_tensor = unravel_topk_token_phrases(query_response, topk=synapse.topk)  # [batch_size, topk + 1, max_len]
-        _losses_val, _losses = phrase_cross_entropy(inputs_nxt, query_response, reduce=False)
+        if _stats['uid'] in stacked_losses:
+            _losses_val, _losses = stacked_losses[_stats['uid']]
+        else:
+            _losses_val, _losses = phrase_cross_entropy(inputs_nxt, query_response, reduce=False)
         _losses_val[_losses_val.isnan()] = 20  # assign large loss
         _losses[_losses.isnan()] = 20  # assign large loss
         _loss_val = _losses_val.mean()
@@ -1249,12 +1648,9 @@ def textcausallmnext(uids: torch.Tensor, query_responses: List[List[torch.FloatT
         _stats.update({'loss_val_nxt': _loss_val, 'losses_nxt': _losses, 'loss_nxt': _loss,
                        'synergy_nxt': 0, 'synergy_loss_diff_nxt': 0})
 
-    def _synergy(first, second, target, ext):
-        # average first + second probabilities per batch item, convert to loss
-        measured_loss = -torch.log((torch.exp(-first['losses_nxt']) +
-                                    torch.exp(-second['losses_nxt'])) / 2 + 1e-40).mean()
-
-        return measured_loss
+    def _synergy(_stats, target, ext):
+        # phrase probabilities per batch item, pairs average their probabilities and convert to loss
+        return torch.exp(-_stats['losses_nxt'])  # [batch_size]
 
     shapley_start_time = time.time()
     loss, stats, unsuccessful = shapley_base(uids, query_responses, return_ops, times, routing_score,
@@ -1269,9 +1665,9 @@ def textcausallmnext(uids: torch.Tensor, query_responses: List[List[torch.FloatT
                 f'<dim>[{time.time() - divergence_start_time:.3g}s]</dim>')
 
     synergy_start_time = time.time()
-    syn_loss_diff = shapley_synergy(stats, _synergy, '_nxt', scaling_law_power=synergy_scaling_law_power)
+    syn_loss_diff, synergy_bytes = shapley_synergy(stats, _synergy, '_nxt', scaling_law_power=synergy_scaling_law_power)
     logger.info(f'{str(synapse)} \t| Shapley synergy values (power={synergy_scaling_law_power:.1f}) '
-                f'<dim>[{time.time() - synergy_start_time:.3g}s]</dim>')
+                f'<dim>[{time.time() - synergy_start_time:.3g}s, {synergy_bytes / 2 ** 20:.1f}MB]</dim>')
 
     # === Shapley value combination ===
     # Combine base values with synergy approximation to get final Shapley values.
@@ -1482,25 +1878,63 @@ def logits_divergence(stats: Dict, uids: torch.Tensor, query_responses: List[Lis
                     logger.warning(f'Synapse {index_s} error (logits_divergence)\t| UID {_uid}: {e}')
 
 
-def shapley_synergy(stats: Dict, synergy: Callable, ext: str, target: torch.Tensor = None, scaling_law_power: float = 0.5):
+def pairwise_synergy_losses(target_probs: torch.FloatTensor,
+                            max_chunk_elements: int = 2 ** 26) -> Tuple[torch.FloatTensor, int]:
+    r"""
+    Calculates the measured loss of every pair of responses combined by averaging their probabilities, in chunks
+    of first responses so that the pairwise buffer holds at most max_chunk_elements.
+    The measured loss of a pair is the cross entropy of the log of the average of their probabilities,
+    where only the probabilities of the target tokens are needed.
+        Args:
+            target_probs (:obj:`torch.FloatTensor`, `required`):
+                [n, num_targets] Probability each response assigns to each target.
+            max_chunk_elements (:obj:`int`, `optional`):
+                Maximum number of elements in the [chunk_size, n, num_targets] pairwise buffer.
+
+        Returns:
+            measured_losses (:obj:`torch.FloatTensor`):
+                [n, n] Measured loss of each pair of responses, with the direct loss on the diagonal.
+            peak_bytes (:obj:`int`):
+                Peak bytes held by the target probabilities, pairwise buffer and measured losses.
+    """
+    n, num_targets = target_probs.shape
+    chunk_size = max(1, min(n, max_chunk_elements // max(1, n * num_targets)))
+
+    measured_losses = torch.zeros(n, n, dtype=target_probs.dtype, device=target_probs.device)  # [n, n]
+    for start in range(0, n, chunk_size):
+        # average probabilities per target between responses: [chunk_size, n, num_targets]
+        combined_probs = (target_probs[start:start + chunk_size, None, :] + target_probs[None, :, :]) / 2
+        measured_losses[start:start + chunk_size] = -torch.log(combined_probs + 1e-40).mean(dim=-1)
+
+    peak_bytes = (target_probs.numel() + chunk_size * n * num_targets + n * n) * target_probs.element_size()
+    return measured_losses, peak_bytes
+
+
+def shapley_synergy(stats: Dict, synergy: Callable, ext: str, target: torch.Tensor = None, scaling_law_power: float = 0.5,
+                    max_chunk_elements: int = 2 ** 26) -> Tuple[Dict, int]:
     r"""
     Calculates Shapley synergy for coalition size 2, measured performance above expected performance.
     Measured in effective number of model parameters, just like base Shapley values.
+    All pairs of responsives are measured together with pairwise_synergy_losses.
         Args:
             stats (:obj:`Dict`, `required`):
                 Statistics per endpoint for this batch.
             synergy (:obj:`Callable`, `required`)
-                Function to calculate measured loss.
+                Function to calculate the [num_targets] target probabilities of a response, called once per responsive.
             ext (:obj:`str`, `optional`):
                 Extension to parameter string for stats key.
             target (:obj:`torch.Tensor`, `optional`):
                 Target to measure loss against.
             scaling_law_power (:obj:`float`, `optional`):
                 Power for modified scaling law, powered down to improve dynamic range, e.g. 3 → 6 nats for 0.5.
+            max_chunk_elements (:obj:`int`, `optional`):
+                Maximum number of elements in the pairwise buffer of pairwise_synergy_losses.
 
         Returns:
             syn_loss_diff (:obj:`Dict`, `required`):
                 Dictionary table of pairwise synergies as loss reductions, with direct loss on diagonal.
+            peak_bytes (:obj:`int`):
+                Peak bytes used by the pairwise measurement.
     """
     # === Shapley synergy approximation ===
     # Shapley values - second level - coalition size 2
@@ -1508,44 +1942,47 @@ def shapley_synergy(stats: Dict, synergy: Callable, ext: str, target: torch.Tens
     # Measured in effective number of model parameters, just like base Shapley values.
     syn_loss_diff = {}  # expected_loss - measured_loss (where > 0)
     responsives = [uid for uid, stat in stats.items() if 'loss' + ext in stat]
-    for _first, first in stats.items():
-        if 'loss' + ext not in first:
-            continue
-        first_diff = syn_loss_diff.setdefault(_first, {})
-        first_diff[_first] = first['loss' + ext]  # diagonal keeps direct loss
+    if len(responsives) == 0:
+        return syn_loss_diff, 0
+
+    with torch.no_grad():
+        target_probs = torch.stack([synergy(stats[uid], target, ext) for uid in responsives])  # [n, num_targets]
+        measured_loss, peak_bytes = pairwise_synergy_losses(target_probs, max_chunk_elements)  # [n, n]
 
-        for _second, second in stats.items():
-            if 'loss' + ext not in second or _second <= _first:
-                continue
-            second_diff = syn_loss_diff.setdefault(_second, {})
+        losses = torch.tensor([float(stats[uid]['loss' + ext]) for uid in responsives],
+                              dtype=measured_loss.dtype, device=measured_loss.device)  # [n] direct losses
+        expected_loss = torch.min(losses[:, None], losses[None, :])  # [n, n] expecting min loss
+        pairs = ~torch.eye(len(responsives), dtype=torch.bool, device=measured_loss.device)  # [n, n] exclude diagonal
 
-            with torch.no_grad():
-                expected_loss = torch.min(first['loss' + ext], second['loss' + ext])  # expecting min loss
+        loss_diff_share = torch.clamp(expected_loss - measured_loss, 0) / 2  # record direct loss diff
+        loss_diff_share /= len(responsives)  # average over responsives
+        loss_diff_share *= pairs
 
-                measured_loss = synergy(first, second, target, ext)
+        measured_params = scaling_law_loss_to_params(measured_loss)
+        expected_params = scaling_law_loss_to_params(expected_loss)
 
-                loss_diff_share = torch.clamp(expected_loss - measured_loss, 0) / 2  # record direct loss diff
-                loss_diff_share /= len(responsives)  # average over responsives
-                first['synergy_loss_diff' + ext] += loss_diff_share
-                second['synergy_loss_diff' + ext] += loss_diff_share
+        # powered down number of params, e.g. dynamic range 3 → 6 nats for scaling_law_power=0.5
+        pow_measured_params = torch.pow(measured_params, scaling_law_power)
+        pow_expected_params = torch.pow(expected_params, scaling_law_power)
 
-                # pairwise loss reduction of expected to measured loss due to synergy between first and second
-                first_diff[_second] = loss_diff_share
-                second_diff[_first] = loss_diff_share
+        synergy_share = torch.clamp(pow_measured_params - pow_expected_params, 0) / 2
+        synergy_share /= len(responsives)  # average over responsives
+        synergy_share *= pairs
 
-                measured_params = scaling_law_loss_to_params(measured_loss)
-                expected_params = scaling_law_loss_to_params(expected_loss)
+        # share synergy amongst coalition members
+        loss_diff_sums = loss_diff_share.sum(dim=1)
+        synergy_sums = synergy_share.sum(dim=1)
 
-                # powered down number of params, e.g. dynamic range 3 → 6 nats for scaling_law_power=0.5
-                pow_measured_params = torch.pow(measured_params, scaling_law_power)
-                pow_expected_params = torch.pow(expected_params, scaling_law_power)
+    loss_diff_rows = loss_diff_share.tolist()
+    for i, uid in enumerate(responsives):
+        stats[uid]['synergy_loss_diff' + ext] += loss_diff_sums[i]
+        stats[uid]['synergy' + ext] += synergy_sums[i]
 
-                synergy_share = torch.clamp(pow_measured_params - pow_expected_params, 0) / 2
-                synergy_share /= len(responsives)  # average over responsives
-                first['synergy' + ext] += synergy_share  # share synergy amongst coalition members
-                second['synergy' + ext] += synergy_share
+        # pairwise loss reduction of expected to measured loss due to synergy between first and second
+        syn_loss_diff[uid] = dict(zip(responsives, loss_diff_rows[i]))
+        syn_loss_diff[uid][uid] = stats[uid]['loss' + ext]  # diagonal keeps direct loss
 
-    return syn_loss_diff
+    return syn_loss_diff, peak_bytes
 
 
 def format_predictions(uids: torch.Tensor, query_responses: List[List[torch.FloatTensor]],
@@ -32,7 +32,7 @@ import grpc
 import time as clock
 
 from types import SimpleNamespace
-from typing import Tuple, List, Union
+from typing import Tuple, List, Union, Optional
 from loguru import logger
 from grpc import _common
 
@@ -159,6 +159,42 @@ class Receptor(nn.Module):
     def close ( self ):
         self.__exit__()
 
+    @staticmethod
+    def serialize_forward_request (
+        synapses: List[ 'bittensor.Synapse' ],
+        inputs: torch.Tensor,
+    ) -> Tuple[ List['bittensor.proto.Tensor'], List['bittensor.proto.Synapse'], List[Optional[str]] ]:
+        r""" Serializes the forward request tensor and wire proto for each synapse.
+            The result holds no per-receptor state and can be shared between receptors sending the same inputs.
+
+            Args:
+                synapses (:obj:`List[ 'bittensor.Synapse' ]` of shape :obj:`(num_synapses)`, `required`):
+                    Bittensor synapse objects with arguments.
+
+                inputs (:obj:`torch.Tensor` of shape :obj:`(shape)`, `required`):
+                    Single torch tensor to be sent to the remote endpoint.
+
+            Returns:
+                serialized_forward_tensors (:obj:`List[ bittensor.proto.Tensor ]`, `required`):
+                    Serialized forward request tensors for each synapse that serialized successfully.
+
+                serialized_synapses (:obj:`List[ bittensor.proto.Synapse ]`, `required`):
+                    Serialized wire protos for each synapse that serialized successfully.
+
+                serialization_errors (:obj:`List[ Optional[str] ]` of shape :obj:`(num_synapses)`, `required`):
+                    Error message for each synapse which failed to serialize, None otherwise.
+        """
+        serialized_forward_tensors = []
+        serialized_synapses = []
+        serialization_errors = [ None for _ in synapses ]
+        for index, synapse in enumerate( synapses ):
+            try:
+                serialized_forward_tensors.append( synapse.serialize_forward_request_tensor ( inputs ))
+                serialized_synapses.append(synapse.serialize_to_wire_proto())
+            except Exception as e:
+                serialization_errors [index] = 'Input serialization exception with error:{}'.format(str(e))
+        return serialized_forward_tensors, serialized_synapses, serialization_errors
+
     def forward (
         self, 
         synapses: List[ 'bittensor.Synapse' ],
@@ -245,6 +281,7 @@ class Receptor(nn.Module):
         synapses: List[ 'bittensor.Synapse' ],
         inputs: torch.Tensor, 
         timeout: int,
+        serialized_request: Optional[ Tuple[ List['bittensor.proto.Tensor'], List['bittensor.proto.Synapse'], List[Optional[str]] ] ] = None,
     ) -> Tuple[ List[ torch.FloatTensor ], List['bittensor.proto.ReturnCode'], List[float] ]:
         r""" Triggers the grpc call to the remote endpoint.
             This triggers the synapse calls with arguments.
@@ -261,6 +298,10 @@ class Receptor(nn.Module):
 
                 timeout (:obj:`int`, `required`):
                     Request max timeout
+
+                serialized_request (:obj:`Tuple`, `optional`):
+                    Output of Receptor.serialize_forward_request for these synapses and inputs.
+                    Passed by the receptor pool to share one serialization across endpoints.
             Returns:
                 outputs (:obj:`List[ Union[torch.FloatTensor, torch.LongTensor] ]`, `required`):
                     outputs.shape = [batch_size, synapse_length, response] 
@@ -348,16 +389,14 @@ class Receptor(nn.Module):
         # ==========================
         # ==== Serialize inputs ====
         # ==========================
-        serialized_forward_tensors = []
-        serialized_synapses = []
-        for index, synapse in enumerate( synapses ):
-            try:
-                serialized_forward_tensors.append( synapse.serialize_forward_request_tensor ( inputs ))
-                serialized_synapses.append(synapse.serialize_to_wire_proto())
-            except Exception as e:
+        if serialized_request == None:
+            serialized_request = self.serialize_forward_request( synapses = synapses, inputs = inputs )
+        serialized_forward_tensors, serialized_synapses, serialization_errors = serialized_request
+        for index, error in enumerate( serialization_errors ):
+            if error != None:
                 synapse_codes [index] = bittensor.proto.ReturnCode.RequestSerializationException
                 synapse_call_times [index] = clock.time() - start_time
-                synapse_messages [index] = 'Input serialization exception with error:{}'.format(str(e))
+                synapse_messages [index] = error
         # Check if the call can stop here.
         if check_if_should_return():
             finalize_stats_and_logs()
@@ -528,7 +567,8 @@ class Receptor(nn.Module):
         synapses: List[ 'bittensor.Synapse' ],
         inputs: torch.Tensor, 
         grads: List[torch.Tensor], 
-        timeout: int
+        timeout: int,
+        serialized_request: Optional[ Tuple[ List['bittensor.proto.Tensor'], List['bittensor.proto.Synapse'], List[Optional[str]] ] ] = None,
     ) -> Tuple[ List[ torch.FloatTensor ], List['bittensor.proto.ReturnCode'], List[float] ]:
         r""" Triggers the grpc backward call to the remote endpoint.
             This triggers the synapse's backward calls with arguments.
@@ -548,6 +588,10 @@ class Receptor(nn.Module):
              
                 timeout (:obj:`int`, `required`):
                     Request max timeout
+
+                serialized_request (:obj:`Tuple`, `optional`):
+                    Output of Receptor.serialize_forward_request for these synapses and inputs.
+                    Passed by the receptor pool to share one serialization across endpoints.
             Returns:
                 output (:obj:`torch.FloatTensor`, `required`):
                     Result tensors (likely zero) from the backward call each corresponding to a single forward input.
@@ -620,19 +664,36 @@ class Receptor(nn.Module):
         # ==================================
         # ==== Serialize inputs & grads ====
         # ==================================
-        serialized_forward_tensors = []
+        if serialized_request == None:
+            serialized_request = self.serialize_forward_request( synapses = synapses, inputs = inputs )
+        serialized_forward_tensors, serialized_synapses, serialization_errors = serialized_request
+        # The request only holds the synapses whose inputs and grads both serialized, so that its forward tensors,
+        # grads and synapse protos stay aligned.
+        request_forward_tensors = []
+        request_synapses = []
         serialized_backward_grads = []
-        serialized_synapses = []
+        serialized_index = 0
         for index, synapse in enumerate( synapses ):
+            if serialization_errors[index] != None:
+                # Input Serialization failed.
+                synapse_codes [index] = bittensor.proto.ReturnCode.RequestSerializationException
+                synapse_call_times [index] = clock.time() - start_time
+                synapse_messages [index] = serialization_errors[index]
+                continue
+            # The serialized forward request only holds the synapses whose inputs serialized, in order.
+            forward_tensor = serialized_forward_tensors[ serialized_index ]
+            wire_synapse = serialized_synapses[ serialized_index ]
+            serialized_index += 1
             try:
-                serialized_forward_tensors.append(synapse.serialize_forward_request_tensor( inputs ))
                 serialized_backward_grads.append(synapse.serialize_backward_request_gradient (inputs, grads[index] ))
-                serialized_synapses.append(synapse.serialize_to_wire_proto())
             except Exception as e:
-                # Input Serialization failed.
+                # Gradient Serialization failed.
                 synapse_codes [index] = bittensor.proto.ReturnCode.RequestSerializationException
                 synapse_call_times [index] = clock.time() - start_time
                 synapse_messages [index] = 'Input serialization exception with error:{}'.format(str(e))
+                continue
+            request_forward_tensors.append( forward_tensor )
+            request_synapses.append( wire_synapse )
         # Check if the call can stop here.
         if check_if_should_return():
             finalize_stats_and_logs()
@@ -646,8 +707,8 @@ class Receptor(nn.Module):
             grpc_request = bittensor.proto.TensorMessage (
                 version = bittensor.__version_as_int__,
                 hotkey = self.wallet.hotkey.ss58_address,
-                tensors = serialized_forward_tensors + serialized_backward_grads,
-                synapses = serialized_synapses,
+                tensors = request_forward_tensors + serialized_backward_grads,
+                synapses = request_synapses,
                 requires_grad = True,
             )
 
@@ -18,7 +18,8 @@
 # DEALINGS IN THE SOFTWARE.
 
 import math
-from typing import Tuple, List, Union
+import time
+from typing import Callable, Tuple, List, Union, Optional
 from threading import Lock
 
 import torch
@@ -81,6 +82,9 @@ class ReceptorPool ( torch.nn.Module ):
             synapses: List[ 'bittensor.Synapse' ],
             inputs: List [ torch.Tensor ],
             timeout: int,
+            min_success: Optional[int] = None,
+            deadline: Optional[float] = None,
+            callback: Optional[Callable] = None,
         ) -> Tuple[List[torch.Tensor], List[int], List[float]]:
         r""" Forward tensor inputs to endpoints.
 
@@ -100,9 +104,19 @@ class ReceptorPool ( torch.nn.Module ):
                 timeout (int):
                     Request timeout.
 
+                min_success (int, `optional`):
+                    Return once this many endpoints have responded with at least one successful synapse.
+
+                deadline (float, `optional`):
+                    Return after this many seconds even if calls are outstanding.
+
+                callback (:obj:`Callable`, `optional`):
+                    Called with (index, outputs, codes, times) as each endpoint response completes.
+
             Returns:
                 forward_outputs (:obj:`List[ List[ torch.FloatTensor ]]` of shape :obj:`(num_endpoints * (num_synapses * (shape)))`, `required`):
                     Output encodings of tensors produced by remote endpoints. Non-responses are zeroes of common shape.
+                    Calls cancelled at min_success or deadline are returned as zeroes with a Timeout code.
 
                 forward_codes (:obj:`List[ List[bittensor.proto.ReturnCodes] ]` of shape :obj:`(num_endpoints * ( num_synapses ))`, `required`):
                     dendrite backward call return ops.
@@ -123,7 +137,10 @@ class ReceptorPool ( torch.nn.Module ):
                 endpoints = endpoints,
                 synapses = synapses,
                 inputs = inputs,
-                timeout = timeout
+                timeout = timeout,
+                min_success = min_success,
+                deadline = deadline,
+                callback = callback,
             ) 
         )
 
@@ -194,6 +211,9 @@ class ReceptorPool ( torch.nn.Module ):
             synapses: List[ 'bittensor.Synapse' ],
             inputs: List [ torch.Tensor ],
             timeout: int,
+            min_success: Optional[int] = None,
+            deadline: Optional[float] = None,
+            callback: Optional[Callable] = None,
         ) -> Tuple[List[torch.Tensor], List[int], List[float]]:
         r""" Forward tensor inputs to endpoints.
 
@@ -213,9 +233,19 @@ class ReceptorPool ( torch.nn.Module ):
                 timeout (int):
                     Request timeout.
 
+                min_success (int, `optional`):
+                    Return once this many endpoints have responded with at least one successful synapse.
+
+                deadline (float, `optional`):
+                    Return after this many seconds even if calls are outstanding.
+
+                callback (:obj:`Callable`, `optional`):
+                    Called with (index, outputs, codes, times) as each endpoint response completes.
+
             Returns:
                 forward_outputs (:obj:`List[ List[ torch.FloatTensor ]]` of shape :obj:`(num_endpoints * (num_synapses * (shape)))`, `required`):
                     Output encodings of tensors produced by remote endpoints. Non-responses are zeroes of common shape.
+                    Calls cancelled at min_success or deadline are returned as zeroes with a Timeout code.
 
                 forward_codes (:obj:`List[ List[bittensor.proto.ReturnCodes] ]` of shape :obj:`(num_endpoints * ( num_synapses ))`, `required`):
                     dendrite backward call return ops.
@@ -223,21 +253,55 @@ class ReceptorPool ( torch.nn.Module ):
                 forward_times (:obj:`List[ List [float] ]` of shape :obj:`(num_endpoints * ( num_synapses ))`, `required`):
                     dendrite backward call times
         """
-        # Init receptors.
-        receptors = [ self._get_or_create_receptor_for_endpoint( endpoint ) for endpoint in endpoints ]
-
-        # Make calls.
-        calls = []
-        for index, receptor in enumerate(receptors):
-            calls.append( 
-                receptor.async_forward(
-                    synapses = synapses,
-                    inputs = inputs[index], 
-                    timeout = timeout
+        if min_success == None and deadline == None and callback == None:
+            # Init receptors.
+            receptors = [ self._get_or_create_receptor_for_endpoint( endpoint ) for endpoint in endpoints ]
+
+            # Serialize each distinct input once.
+            serialized_requests = self._serialize_shared_requests( synapses = synapses, inputs = inputs )
+
+            # Make calls.
+            calls = []
+            for index, receptor in enumerate(receptors):
+                calls.append( 
+                    receptor.async_forward(
+                        synapses = synapses,
+                        inputs = inputs[index], 
+                        timeout = timeout,
+                        serialized_request = serialized_requests[index]
+                    )
                 )
-            )
 
-        responses = await asyncio.gather( *calls )
+            responses = await asyncio.gather( *calls )
+
+        else:
+            # Stream responses until min_success endpoints succeeded or the deadline passed.
+            start_time = time.time()
+            responses = [ None for _ in endpoints ]
+            num_success = 0
+            stream = self.async_forward_as_completed(
+                endpoints = endpoints, synapses = synapses, inputs = inputs, timeout = timeout, deadline = deadline,
+                until = lambda: min_success != None and num_success >= min_success
+            )
+            try:
+                async for index, outputs, codes, times in stream:
+                    responses[ index ] = ( outputs, codes, times )
+                    if callback != None:
+                        callback( index, outputs, codes, times )
+                    if bittensor.proto.ReturnCode.Success in codes:
+                        num_success += 1
+            finally:
+                await stream.aclose()
+
+            # Cancelled calls return nill responses as timeouts.
+            call_time = time.time() - start_time
+            for index, response in enumerate( responses ):
+                if response == None:
+                    responses[ index ] = (
+                        [ synapse.nill_forward_response_tensor( inputs[index] ) for synapse in synapses ],
+                        [ bittensor.proto.ReturnCode.Timeout for _ in synapses ],
+                        [ call_time for _ in synapses ]
+                    )
 
         # Unpack responses
         forward_outputs = []
@@ -253,6 +317,85 @@ class ReceptorPool ( torch.nn.Module ):
         # ---- Return ----
         return forward_outputs, forward_codes, forward_times
 
+    async def async_forward_as_completed (
+            self, 
+            endpoints: List [ 'bittensor.Endpoint' ],
+            synapses: List[ 'bittensor.Synapse' ],
+            inputs: List [ torch.Tensor ],
+            timeout: int,
+            deadline: Optional[float] = None,
+            until: Optional[Callable] = None,
+        ):
+        r""" Forward tensor inputs to endpoints, yielding each endpoint response as soon as it completes.
+            Closing the iterator early, reaching the deadline or until returning true cancels the outstanding grpc calls.
+
+            Args:
+                endpoints (:obj:`List[ bittensor.Endpoint ]` of shape :obj:`(num_endpoints)`, `required`):
+                    List of remote endpoints which match length of inputs. Tensors from x are sent forward to these endpoints.
+
+                synapses (:obj:`List[ 'bittensor.Synapse' ]` of shape :obj:`(num_synapses)`, `required`):
+                    Bittensor synapse objects with arguments. Each corresponds to a synapse function on the axon.
+                    Responses are packed in this ordering. 
+
+                inputs (:obj:`List[torch.Tensor]` of shape :obj:`(num_endpoints * [shape])`, `required`):
+                    List of tensors to send to corresponsing endpoints.
+
+                timeout (int):
+                    Request timeout.
+
+                deadline (float, `optional`):
+                    Seconds after which outstanding calls are cancelled and the iteration stops.
+
+                until (Callable, `optional`):
+                    Checked once all the calls completed together are yielded, the iteration stops when it returns true.
+                    Unlike breaking out of the iteration, this does not drop responses which already arrived.
+
+            Yields:
+                index (:obj:`int`):
+                    Index of the responding endpoint in endpoints.
+
+                outputs (:obj:`List[ torch.FloatTensor ]` of shape :obj:`(num_synapses * (shape))`):
+                    Output encodings of the endpoint, zeroes for failed synapses.
+
+                codes (:obj:`List[ bittensor.proto.ReturnCodes ]` of shape :obj:`(num_synapses)`):
+                    Return codes of the endpoint.
+
+                times (:obj:`List[ float ]` of shape :obj:`(num_synapses)`):
+                    Call times of the endpoint.
+        """
+        receptors = [ self._get_or_create_receptor_for_endpoint( endpoint ) for endpoint in endpoints ]
+        serialized_requests = self._serialize_shared_requests( synapses = synapses, inputs = inputs )
+
+        async def call( index, receptor ):
+            response = await receptor.async_forward(
+                synapses = synapses,
+                inputs = inputs[index], 
+                timeout = timeout,
+                serialized_request = serialized_requests[index]
+            )
+            return index, response
+
+        start_time = time.time()
+        pending = { asyncio.ensure_future( call( index, receptor ) ) for index, receptor in enumerate( receptors ) }
+        try:
+            while len( pending ) > 0:
+                remaining = None if deadline == None else deadline - ( time.time() - start_time )
+                if remaining != None and remaining <= 0:
+                    break
+                done, pending = await asyncio.wait( pending, timeout = remaining, return_when = asyncio.FIRST_COMPLETED )
+                for task in done:
+                    index, ( outputs, codes, times ) = task.result()
+                    yield index, outputs, codes, times
+                if until != None and until():
+                    break
+        finally:
+            # ---- Cancel outstanding grpc calls ----
+            for task in pending:
+                task.cancel()
+            if len( pending ) > 0:
+                await asyncio.wait( pending )
+            self._destroy_receptors_over_max_allowed()
+
     async def async_backward(
                 self, 
                 endpoints: List [ 'bittensor.Endpoint' ],
@@ -294,6 +437,9 @@ class ReceptorPool ( torch.nn.Module ):
         # Init receptors.
         receptors = [ self._get_or_create_receptor_for_endpoint( endpoint ) for endpoint in endpoints ]
 
+        # Serialize each distinct input once.
+        serialized_requests = self._serialize_shared_requests( synapses = synapses, inputs = inputs )
+
         # Make calls.
         calls = []
         for index, receptor in enumerate(receptors):
@@ -302,7 +448,8 @@ class ReceptorPool ( torch.nn.Module ):
                     synapses = synapses,
                     inputs = inputs[index], 
                     grads = grads[index],
-                    timeout = timeout
+                    timeout = timeout,
+                    serialized_request = serialized_requests[index]
                 )
             )
         responses = await asyncio.gather( *calls )
@@ -321,6 +468,48 @@ class ReceptorPool ( torch.nn.Module ):
         # ---- Return ----
         return backward_outputs, backward_codes, backward_times
 
+    def _serialize_shared_requests( 
+            self, 
+            synapses: List[ 'bittensor.Synapse' ],
+            inputs: List [ torch.Tensor ],
+        ) -> List[ Tuple[ List['bittensor.proto.Tensor'], List['bittensor.proto.Synapse'], List[Optional[str]] ] ]:
+        r""" Serializes the forward request for each distinct input tensor once. Endpoints which are sent
+            the same tensor (by identity or by content) share the serialized tensor and synapse protos,
+            leaving only the signature metadata to be built per request.
+
+            Args:
+                synapses (:obj:`List[ 'bittensor.Synapse' ]` of shape :obj:`(num_synapses)`, `required`):
+                    Bittensor synapse objects with arguments.
+
+                inputs (:obj:`List[torch.Tensor]` of shape :obj:`(num_endpoints * [shape])`, `required`):
+                    List of tensors to send to corresponsing endpoints.
+
+            Returns:
+                serialized_requests (:obj:`List[ Tuple ]` of shape :obj:`(num_endpoints)`, `required`):
+                    Output of Receptor.serialize_forward_request for each endpoint's input.
+        """
+        # Hold references to every input so that object ids stay valid while deduplicating.
+        inputs = [ inputs[index] for index in range(len(inputs)) ]
+        requests_by_id = {}
+        requests_by_content = {}
+        serialized_requests = []
+        for tensor in inputs:
+            if id(tensor) in requests_by_id:
+                serialized_requests.append( requests_by_id[ id(tensor) ] )
+                continue
+
+            try:
+                content_key = ( tensor.dtype, tuple(tensor.shape), tensor.detach().cpu().numpy().tobytes() )
+            except Exception:
+                # Tensors without a numpy equivalent are never shared.
+                content_key = id(tensor)
+
+            if content_key not in requests_by_content:
+                requests_by_content[ content_key ] = bittensor.Receptor.serialize_forward_request( synapses = synapses, inputs = tensor )
+            requests_by_id[ id(tensor) ] = requests_by_content[ content_key ]
+            serialized_requests.append( requests_by_content[ content_key ] )
+        return serialized_requests
+
     def _destroy_receptors_over_max_allowed( self ):
         r""" Destroys receptors based on QPS until there are no more than max_active_receptors.
         """
@@ -61,6 +61,8 @@ class serializer:
             return serializer_impl.MSGPackSerializer()
         elif serializer_type == bittensor.proto.Serializer.CMPPACK:
             return serializer_impl.CMPPackSerializer()
+        elif serializer_type == bittensor.proto.Serializer.RAWBUF:
+            return serializer_impl.RawBufferSerializer()
         else:
             raise bittensor.serializer.NoSerializerForEnum("No known serialzier for proto type {}".format(serializer_type))
 
@@ -132,6 +134,8 @@ class serializer:
             dtype = np.int32
         elif bdtype == bittensor.proto.DataType.INT64:
             dtype = np.int64
+        elif bdtype == bittensor.proto.DataType.FLOAT16:
+            dtype = np.float16
         else:
             raise bittensor.serializer.SerializationException(
                 'Unknown bittensor.dtype or no equivalent numpy.dtype for bittensor.dtype = {}'
@@ -20,6 +20,7 @@
 import torch
 import msgpack
 import msgpack_numpy
+import numpy as np
 from typing import Tuple, List, Union, Optional
 
 
@@ -232,3 +233,81 @@ class CMPPackSerializer( Serializer ):
         torch_object = torch.as_tensor(numpy_object).view(shape).requires_grad_(torch_proto.requires_grad)
         return torch_object.type(dtype)
 
+
+
+class RawBufferSerializer( Serializer ):
+    """ Make conversion between torch and bittensor.proto.torch by writing the contiguous tensor bytes
+        directly into the proto buffer. deserialize_to_torch copies the proto buffer once into a writable
+        tensor, while deserialize_to_numpy returns a read-only array viewing the proto buffer without a copy.
+    """
+    def serialize_from_torch(self, torch_tensor: torch.Tensor, modality: bittensor.proto.Modality) -> bittensor.proto.Tensor:
+        """ Serializes a torch.Tensor to an bittensor Tensor proto by copying its raw bytes.
+
+        Args:
+            torch_tensor (torch.Tensor): 
+                Torch tensor to serialize.
+
+            modality (bittensor.proto.Modality): 
+                Datatype modality. i.e. TENSOR, TEXT, IMAGE
+
+        Returns:
+            bittensor.proto.Tensor: 
+                The serialized torch tensor as bittensor.proto.proto. 
+
+        Raises:
+            SerializationException: (Exception): 
+                Raised if the tensor dtype has no bittensor.proto.DataType equivalent.
+        """
+        dtype = bittensor.serializer.torch_dtype_to_bittensor_dtype(torch_tensor.dtype)
+        if dtype == bittensor.proto.DataType.UNKNOWN:
+            raise bittensor.serializer.SerializationException('Raw buffer serialization is not supported for torch.dtype = {}'.format(torch_tensor.dtype))
+        shape = list(torch_tensor.shape)
+        data_buffer = torch_tensor.detach().cpu().contiguous().numpy().tobytes()
+        torch_proto = bittensor.proto.Tensor (
+                                    version = bittensor.__version_as_int__,
+                                    buffer = data_buffer,
+                                    shape = shape,
+                                    dtype = dtype,
+                                    serializer = bittensor.proto.Serializer.RAWBUF,
+                                    tensor_type = bittensor.proto.TensorType.TORCH,
+                                    modality = modality,
+                                    requires_grad = torch_tensor.requires_grad
+                                )
+        return torch_proto
+
+    def deserialize_to_numpy(self, torch_proto: bittensor.proto.Tensor) -> np.ndarray:
+        """Deserializes an bittensor.proto.Tensor to a read-only numpy.ndarray viewing the proto buffer.
+
+        Args:
+            torch_proto (bittensor.proto.Tensor): 
+                Proto containing tensor to derserialize.
+
+        Returns:
+            numpy.ndarray: 
+                Deserialized numpy array, read-only. Copy it before in-place modification.
+        """
+        dtype = bittensor.serializer.bittensor_dtype_np_dtype(torch_proto.dtype)
+        shape = tuple(torch_proto.shape)
+        return np.frombuffer(torch_proto.buffer, dtype=dtype).reshape(shape)
+
+    def deserialize_to_torch(self, torch_proto: bittensor.proto.Tensor) -> torch.Tensor:
+        """Deserializes an bittensor.proto.Tensor to a writable torch.Tensor over a copy of the proto buffer.
+
+        Args:
+            torch_proto (bittensor.proto.Tensor): 
+                Proto containing torch tensor to derserialize.
+
+        Returns:
+            torch.Tensor: 
+                Deserialized torch tensor, writable and independent of the proto buffer.
+        """
+        dtype = bittensor.serializer.bittensor_dtype_to_torch_dtype(torch_proto.dtype)
+        shape = tuple(torch_proto.shape)
+        buffer = torch_proto.buffer
+        if len(buffer) == 0:
+            # torch.frombuffer does not accept empty buffers.
+            return torch.empty(shape, dtype=dtype).requires_grad_(torch_proto.requires_grad)
+
+        # The proto buffer is immutable bytes, it is copied once into a bytearray so that the tensor is writable.
+        torch_object = torch.frombuffer(bytearray(buffer), dtype=dtype)
+        return torch_object.view(shape).requires_grad_(torch_proto.requires_grad)
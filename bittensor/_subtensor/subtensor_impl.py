@@ -16,11 +16,14 @@
 # DEALINGS IN THE SOFTWARE.
 import torch
 from rich.prompt import Confirm, Prompt
-from typing import List, Dict, Union, Optional
+from typing import List, Dict, Union, Optional, Tuple, Callable
 from multiprocessing import Process
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+import queue
 
 import bittensor
-from tqdm import tqdm
 import bittensor.utils.networking as net
 import bittensor.utils.weight_utils as weight_utils
 from retry import retry
@@ -44,11 +47,36 @@ class Subtensor:
     """
     Handles interactions with the subtensor chain.
     """
+    # Chain hyperparameters read by get_hyperparameters: name -> (storage function, normalization divisor).
+    hyperparameter_storage = {
+        'rho': ( 'Rho', None ),
+        'kappa': ( 'Kappa', None ),
+        'difficulty': ( 'Difficulty', None ),
+        'immunity_period': ( 'ImmunityPeriod', None ),
+        'validator_batch_size': ( 'ValidatorBatchSize', None ),
+        'validator_sequence_length': ( 'ValidatorSequenceLength', None ),
+        'validator_epochs_per_reset': ( 'ValidatorEpochsPerReset', None ),
+        'validator_epoch_length': ( 'ValidatorEpochLen', None ),
+        'min_allowed_weights': ( 'MinAllowedWeights', None ),
+        'max_weight_limit': ( 'MaxWeightLimit', 4294967295 ),
+        'scaling_law_power': ( 'ScalingLawPower', 100 ),
+        'synergy_scaling_law_power': ( 'SynergyScalingLawPower', 100 ),
+        'validator_exclude_quantile': ( 'ValidatorExcludeQuantile', 100 ),
+        'max_allowed_min_max_ratio': ( 'MaxAllowedMaxMinRatio', None ),
+        'n': ( 'N', None ),
+        'max_n': ( 'MaxAllowedUids', None ),
+        'blocks_since_epoch': ( 'BlocksSinceLastStep', None ),
+        'blocks_per_epoch': ( 'BlocksPerStep', None ),
+        'prune_len': ( 'ValidatorPruneLen', None ),
+        'logits_divergence': ( 'ValidatorLogitsDivergence', 18446744073709551615 ),
+    }
+
     def __init__( 
         self, 
         substrate: 'SubstrateInterface',
         network: str,
         chain_endpoint: str,
+        cache_ttl: float = 0,
     ):
         r""" Initializes a subtensor chain interface.
             Args:
@@ -63,11 +91,29 @@ class Subtensor:
                     an entry point node from that network.
                 chain_endpoint (default=None, type=str)
                     The subtensor endpoint flag. If set, overrides the network argument.
+                cache_ttl (default=0, type=float)
+                    Seconds the current block is cached for. If set, storage reads are cached per (storage item, block).
         """
         self.network = network
         self.chain_endpoint = chain_endpoint
         self.substrate = substrate
 
+        # Open websocket connections shared by the read methods.
+        self.max_pooled_connections = 4
+        self._substrate_pool = queue.Queue()
+        self._substrate_pool_size = 0
+        self._substrate_pool_lock = Lock()
+        self._substrate_pool_closed = False
+
+        # Block-keyed read-through cache of storage values, disabled when cache_ttl is 0.
+        self.cache_ttl = cache_ttl
+        self.max_cache_size = 1024
+        self._cache = OrderedDict()
+        self._cache_lock = Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cached_head = None
+
     def __str__(self) -> str:
         if self.network == self.chain_endpoint:
             # Connecting to chain endpoint without network known.
@@ -134,6 +180,194 @@ To run a local node (See: docs/running_a_validator.md) \n
                 else:
                     return False
 
+    def __del__( self ):
+        self.close()
+
+    def close( self ):
+        r""" Closes the pooled websocket connections. Connections in use are closed when they are returned.
+        """
+        pool = getattr( self, '_substrate_pool', None )
+        if pool == None:
+            return
+        self._substrate_pool_closed = True
+        while True:
+            try:
+                substrate = pool.get_nowait()
+            except queue.Empty:
+                break
+            with self._substrate_pool_lock:
+                self._substrate_pool_size -= 1
+            try:
+                substrate.close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def pooled_substrate( self ) -> 'SubstrateInterface':
+        r""" Yields a websocket connection from the read pool. Unlike self.substrate, pooled connections stay open
+            between calls, and concurrent readers each get their own connection, up to max_pooled_connections.
+        """
+        substrate = None
+        while substrate == None:
+            try:
+                substrate = self._substrate_pool.get_nowait()
+            except queue.Empty:
+                with self._substrate_pool_lock:
+                    open_connection = self._substrate_pool_size < self.max_pooled_connections
+                    if open_connection:
+                        self._substrate_pool_size += 1
+                if open_connection:
+                    try:
+                        substrate = SubstrateInterface(
+                            url = self.substrate.url,
+                            ss58_format = self.substrate.ss58_format,
+                            type_registry_preset = self.substrate.type_registry_preset,
+                            type_registry = self.substrate.type_registry,
+                            use_remote_preset = True
+                        )
+                    except Exception:
+                        with self._substrate_pool_lock:
+                            self._substrate_pool_size -= 1
+                        raise
+                else:
+                    # Wait for a connection to be returned, or for a failed one to be dropped from the pool.
+                    try:
+                        substrate = self._substrate_pool.get( timeout = 1 )
+                    except queue.Empty:
+                        pass
+        try:
+            yield substrate
+        except BaseException:
+            # The connection may be dead, it is closed rather than returned to the pool so that retries open a new one.
+            with self._substrate_pool_lock:
+                self._substrate_pool_size -= 1
+            try:
+                substrate.close()
+            except Exception:
+                pass
+            raise
+        if self._substrate_pool_closed:
+            with self._substrate_pool_lock:
+                self._substrate_pool_size -= 1
+            substrate.close()
+        else:
+            self._substrate_pool.put( substrate )
+
+    def get_cached_head( self ) -> Tuple[int, str]:
+        r""" Returns the block number and hash of the chain head, read again from the chain once the cached head
+            is older than cache_ttl seconds.
+        Returns:
+            block (int):
+                Chain head block number.
+            block_hash (str):
+                Chain head block hash.
+        """
+        with self._cache_lock:
+            head = self._cached_head
+            if head != None and time.time() - head[2] < self.cache_ttl:
+                self._cache_hits += 1
+                return head[0], head[1]
+            self._cache_misses += 1
+
+        @retry(delay=2, tries=3, backoff=2, max_delay=4)
+        def make_substrate_call_with_retry():
+            with self.pooled_substrate() as substrate:
+                block_hash = substrate.get_chain_head()
+                return substrate.get_block_number( block_hash ), block_hash
+        block, block_hash = make_substrate_call_with_retry()
+
+        with self._cache_lock:
+            self._cached_head = ( block, block_hash, time.time() )
+        return block, block_hash
+
+    def read_through( self, key: Tuple[str, int], query: Callable ) -> object:
+        r""" Returns the cached value of key, calling query and caching its result on a miss.
+        Args:
+            key (Tuple[str, int]):
+                (storage item, block) the value is read at.
+            query (Callable):
+                Reads the value from the chain.
+        Returns:
+            value (object):
+                Cached or queried value.
+        """
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache_hits += 1
+                self._cache.move_to_end( key )
+                return self._cache[ key ]
+            self._cache_misses += 1
+
+        value = query()
+        with self._cache_lock:
+            self._cache[ key ] = value
+            while len( self._cache ) > self.max_cache_size:
+                self._cache.popitem( last = False )
+        return value
+
+    def query_cached( self, storage_function: str ) -> object:
+        r""" Returns the value of a SubtensorModule storage item at the current block.
+            If cache_ttl is set, the value is read at the cached chain head and kept per (storage item, block),
+            so that repeated reads within a block do not reach the chain endpoint.
+        Args:
+            storage_function (str):
+                SubtensorModule storage item.
+        Returns:
+            value (object):
+                Storage item value.
+        """
+        if not self.cache_ttl:
+            @retry(delay=2, tries=3, backoff=2, max_delay=4)
+            def make_substrate_call_with_retry():
+                with self.substrate as substrate:
+                    return substrate.query( module='SubtensorModule', storage_function = storage_function ).value
+            return make_substrate_call_with_retry()
+
+        block, block_hash = self.get_cached_head()
+        @retry(delay=2, tries=3, backoff=2, max_delay=4)
+        def make_substrate_call_with_retry():
+            with self.pooled_substrate() as substrate:
+                return substrate.query( module='SubtensorModule', storage_function = storage_function, block_hash = block_hash ).value
+        return self.read_through( ( storage_function, block ), make_substrate_call_with_retry )
+
+    def cache_info( self ) -> SimpleNamespace:
+        r""" Returns the hits, misses, current size and max size of the block-keyed cache, and the cached head block.
+        """
+        with self._cache_lock:
+            return SimpleNamespace( hits = self._cache_hits, misses = self._cache_misses, currsize = len( self._cache ),
+                                    maxsize = self.max_cache_size, block = None if self._cached_head == None else self._cached_head[0] )
+
+    def get_hyperparameters( self, block: int = None ) -> SimpleNamespace:
+        r""" Returns the chain hyperparameters at a block, read at a single block over one pooled connection.
+        Args:
+            block (int):
+                block to read at, defaults to the current block.
+        Returns:
+            hyperparameters (SimpleNamespace):
+                The block and the values of each hyperparameter in Subtensor.hyperparameter_storage,
+                normalized as their properties are.
+        """
+        if self.cache_ttl and block == None:
+            block, _ = self.get_cached_head()
+
+        @retry(delay=2, tries=3, backoff=2, max_delay=4)
+        def make_substrate_call_with_retry():
+            with self.pooled_substrate() as substrate:
+                block_number = substrate.get_block_number(None) if block == None else block
+                block_hash = substrate.get_block_hash( block_number )
+                # Every item is read at the same pinned block hash so the values are consistent.
+                results = [ substrate.query( 'SubtensorModule', storage_function, block_hash = block_hash ) for storage_function, _ in self.hyperparameter_storage.values() ]
+
+            hyperparameters = SimpleNamespace( block = block_number )
+            for ( name, ( _, divisor ) ), result in zip( self.hyperparameter_storage.items(), results ):
+                setattr( hyperparameters, name, result.value if divisor == None else result.value / divisor )
+            return hyperparameters
+
+        if not self.cache_ttl:
+            return make_substrate_call_with_retry()
+        # Copied so that callers can not modify the cached values.
+        return SimpleNamespace( **vars( self.read_through( ( 'hyperparameters', block ), make_substrate_call_with_retry ) ) )
+
     @property
     def rho (self) -> int:
         r""" Incentive mechanism rho parameter.
@@ -141,11 +375,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             rho (int):
                 Incentive mechanism rho parameter.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'Rho' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'Rho' )
 
     @property
     def kappa (self) -> int:
@@ -154,11 +384,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             kappa (int):
                 Incentive mechanism kappa parameter.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'Kappa' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'Kappa' )
 
     @property
     def difficulty (self) -> int:
@@ -167,11 +393,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             difficulty (int):
                 Registration difficulty.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'Difficulty' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'Difficulty' )
 
     @property
     def total_issuance (self) -> 'bittensor.Balance':
@@ -180,11 +402,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             total_issuance (int):
                 Total issuance as balance.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return bittensor.Balance.from_rao( substrate.query(  module='SubtensorModule', storage_function = 'TotalIssuance').value )
-        return make_substrate_call_with_retry()
+        return bittensor.Balance.from_rao( self.query_cached( 'TotalIssuance' ) )
 
     @property
     def immunity_period (self) -> int:
@@ -193,11 +411,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             immunity_period (int):
                 Chain registration immunity_period
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'ImmunityPeriod' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'ImmunityPeriod' )
 
     @property
     def validator_batch_size (self) -> int:
@@ -206,11 +420,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             batch_size (int):
                 Chain default validator batch size.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'ValidatorBatchSize' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'ValidatorBatchSize' )
 
 
     @property
@@ -220,11 +430,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             sequence_length (int):
                 Chain default validator sequence length.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'ValidatorSequenceLength' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'ValidatorSequenceLength' )
 
     @property
     def validator_epochs_per_reset (self) -> int:
@@ -233,11 +439,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             validator_epochs_per_reset (int):
                 Epochs passed before the validator resets its weights.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'ValidatorEpochsPerReset' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'ValidatorEpochsPerReset' )
 
     @property
     def validator_epoch_length (self) -> int:
@@ -246,11 +448,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             validator_epoch_length (int):
                 Default validator epoch length. 
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'ValidatorEpochLen' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'ValidatorEpochLen' )
 
     @property
     def total_stake (self) -> 'bittensor.Balance':
@@ -259,11 +457,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             total_stake (bittensor.Balance):
                 Total stake as balance.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return bittensor.Balance.from_rao( substrate.query(  module='SubtensorModule', storage_function = 'TotalStake' ).value )
-        return make_substrate_call_with_retry()
+        return bittensor.Balance.from_rao( self.query_cached( 'TotalStake' ) )
 
     @property
     def min_allowed_weights (self) -> int:
@@ -272,11 +466,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             min_allowed_weights (int):
                 Min number of weights allowed to be set.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'MinAllowedWeights' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'MinAllowedWeights' )
 
     @property
     def max_weight_limit (self) -> int:
@@ -285,12 +475,8 @@ To run a local node (See: docs/running_a_validator.md) \n
             max_weight (int):
                 the max value for weights after normalizaiton
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                U32_MAX = 4294967295
-                return substrate.query( module='SubtensorModule', storage_function = 'MaxWeightLimit' ).value/U32_MAX
-        return make_substrate_call_with_retry()
+        U32_MAX = 4294967295
+        return self.query_cached( 'MaxWeightLimit' )/U32_MAX
 
     @property
     def scaling_law_power (self) -> int:
@@ -299,12 +485,8 @@ To run a local node (See: docs/running_a_validator.md) \n
             ScalingLawPower (float):
                 the power term attached to scaling law
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                MAX = 100
-                return substrate.query( module='SubtensorModule', storage_function = 'ScalingLawPower' ).value/MAX
-        return make_substrate_call_with_retry()
+        MAX = 100
+        return self.query_cached( 'ScalingLawPower' )/MAX
 
     @property
     def synergy_scaling_law_power (self) -> int:
@@ -313,12 +495,8 @@ To run a local node (See: docs/running_a_validator.md) \n
             SynergyScalingLawPower (float):
                 the term attached to synergy calculation during shapley scores
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                MAX = 100
-                return substrate.query( module='SubtensorModule', storage_function = 'SynergyScalingLawPower' ).value/MAX
-        return make_substrate_call_with_retry()
+        MAX = 100
+        return self.query_cached( 'SynergyScalingLawPower' )/MAX
 
     @property
     def validator_exclude_quantile (self) -> int:
@@ -327,12 +505,8 @@ To run a local node (See: docs/running_a_validator.md) \n
             ValidatorExcludeQuantile (float):
                 the quantile that validators should exclude when setting their weights
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                MAX = 100
-                return substrate.query( module='SubtensorModule', storage_function = 'ValidatorExcludeQuantile' ).value/MAX
-        return make_substrate_call_with_retry()
+        MAX = 100
+        return self.query_cached( 'ValidatorExcludeQuantile' )/MAX
 
     @property
     def max_allowed_min_max_ratio(self) -> int:
@@ -341,11 +515,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             max_allowed_min_max_ratio (int):
                 The max ratio allowed between the min and max.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'MaxAllowedMaxMinRatio' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'MaxAllowedMaxMinRatio' )
 
     @property
     def n (self) -> int:
@@ -354,11 +524,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             n (int):
                 Total number of neurons on chain.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'N' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'N' )
 
     @property
     def max_n (self) -> int:
@@ -367,11 +533,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             max_n (int):
                 Maximum number of neuron positions on the graph.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'MaxAllowedUids' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'MaxAllowedUids' )
 
     @property
     def block (self) -> int:
@@ -389,11 +551,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             blocks_since_epoch (int):
                 blocks_since_epoch 
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'BlocksSinceLastStep' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'BlocksSinceLastStep' )
 
     @property
     def blocks_per_epoch (self) -> int:
@@ -402,11 +560,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             blocks_per_epoch (int):
                 blocks_per_epoch 
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'BlocksPerStep' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'BlocksPerStep' )
 
     def get_n (self, block: int = None) -> int:
         r""" Returns total number of neurons on the chain.
@@ -431,11 +585,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             prune_len (int):
                 the number of pruned tokens from each requests 
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query( module='SubtensorModule', storage_function = 'ValidatorPruneLen' ).value
-        return make_substrate_call_with_retry()
+        return self.query_cached( 'ValidatorPruneLen' )
 
     @property
     def logits_divergence (self) -> int:
@@ -444,12 +594,8 @@ To run a local node (See: docs/running_a_validator.md) \n
             logits_divergence (int):
                 the divergence value for logit distances, a measure for anomaly detection 
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                U64MAX = 18446744073709551615
-                return substrate.query( module='SubtensorModule', storage_function = 'ValidatorLogitsDivergence' ).value/U64MAX
-        return make_substrate_call_with_retry()
+        U64MAX = 18446744073709551615
+        return self.query_cached( 'ValidatorLogitsDivergence' )/U64MAX
 
     def serve_axon (
         self,
@@ -1546,14 +1692,18 @@ To run a local node (See: docs/running_a_validator.md) \n
         return Balance( result.value['data']['free'] )
 
     def get_current_block(self) -> int:
-        r""" Returns the current block number on the chain.
+        r""" Returns the current block number on the chain, cached for cache_ttl seconds if set.
         Returns:
             block_number (int):
                 Current chain blocknumber.
         """        
+        if self.cache_ttl:
+            block, _ = self.get_cached_head()
+            return block
+
         @retry(delay=2, tries=3, backoff=2, max_delay=4)
         def make_substrate_call_with_retry():
-            with self.substrate as substrate:
+            with self.pooled_substrate() as substrate:
                 return substrate.get_block_number(None)
         return make_substrate_call_with_retry()
 
@@ -1573,23 +1723,41 @@ To run a local node (See: docs/running_a_validator.md) \n
             return_dict[r[0].value] = bal
         return return_dict
 
-    def neurons(self, block: int = None ) -> List[SimpleNamespace]: 
+    def neurons(self, block: int = None, page_size: int = 256 ) -> List[SimpleNamespace]: 
         r""" Returns a list of neuron from the chain. 
+        Neurons are retrieved with paged storage queries over the Neurons map, all at the same block.
         Args:
             block (int):
                 block to sync from.
+            page_size (int):
+                Number of neurons retrieved per storage query.
         Returns:
             neuron (List[SimpleNamespace]):
                 List of neuron objects.
         """
+        @retry(delay=2, tries=3, backoff=2, max_delay=4)
+        def make_substrate_call_with_retry():
+            with self.substrate as substrate:
+                # Pin the head so that every page is read from the same block.
+                block_hash = substrate.get_chain_head() if block == None else substrate.get_block_hash( block )
+                n = int(substrate.query( module='SubtensorModule', storage_function = 'N', block_hash = block_hash ).value)
+                result = substrate.query_map(
+                    module='SubtensorModule',
+                    storage_function='Neurons',
+                    block_hash = block_hash,
+                    page_size = page_size
+                )
+                return n, [ ( uid.value, neuron.value ) for uid, neuron in result ]
+        n, neuron_dicts = make_substrate_call_with_retry()
+
+        # Map entries are not ordered by uid, neurons are returned up to the first missing uid.
         neurons = []
-        for id in tqdm(range(self.get_n( block ))): 
-            try:
-                neuron = self.neuron_for_uid(id, block)
-                neurons.append( neuron )
-            except Exception as e:
-                logger.error('Exception encountered when pulling neuron {}: {}'.format(id, e))
+        for uid, neuron_dict in sorted( neuron_dicts, key = lambda uid_neuron: uid_neuron[0] ):
+            if uid >= n or uid != len(neurons) or neuron_dict == None:
                 break
+            neurons.append( Subtensor._neuron_dict_to_namespace( dict( neuron_dict ) ) )
+        if len(neurons) < n:
+            logger.error('Pulled {} of {} neurons, missing neuron {}'.format( len(neurons), n, len(neurons) ))
         return neurons
 
     @staticmethod
@@ -150,6 +150,7 @@ class Mock_Subtensor(subtensor_impl.Subtensor):
 
     def __del__(self):
         self.optionally_kill_owned_mock_instance()
+        super().__del__()
     
     def __exit__(self):
         self.__del__()
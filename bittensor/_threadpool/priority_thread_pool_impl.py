@@ -152,6 +152,10 @@ class PriorityThreadPoolExecutor(_base.Executor):
     def is_empty(self):
         return self._work_queue.empty()
 
+    @property
+    def max_workers(self):
+        return self._max_workers
+
     def submit(self, fn, *args, **kwargs):
         with self._shutdown_lock:
             if self._broken:
@@ -17,9 +17,16 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
 
+import os
+import json
+import shutil
+import hashlib
+import warnings
+import numpy as np
 import torch
 
 from typing import List, Dict, Tuple, Any, Union
+from loguru import logger
 from transformers import PreTrainedTokenizerBase
 
 EPSILON = 1e-40
@@ -403,7 +410,7 @@ def align_tokenizer_sequences(probs: torch.FloatTensor, offset_mapping: List[tup
 
 
 def get_translation_map(from_tokenizer: PreTrainedTokenizerBase,
-                        to_tokenizer: PreTrainedTokenizerBase) -> Dict[str, Any]:
+                        to_tokenizer: PreTrainedTokenizerBase, cache_dir: str = None) -> Dict[str, Any]:
     r"""
     Map individual token phrases from a tokenizer to another tokenizer.
         Args:
@@ -411,6 +418,9 @@ def get_translation_map(from_tokenizer: PreTrainedTokenizerBase,
                 From tokenizer.
             to_tokenizer (:obj:`PreTrainedTokenizerBase`, `required`):
                 To tokenizer.
+            cache_dir (:obj:`str`, `optional`):
+                Directory of persisted translation maps. If set, the map of this tokenizer pair is memory-mapped
+                from the cache when present, else built with its sparse translation matrices and saved there.
 
         Returns:
             translation_map (:obj:`Dict[str, Any]`, `required`):
@@ -420,6 +430,18 @@ def get_translation_map(from_tokenizer: PreTrainedTokenizerBase,
     set_vocab_len(from_tokenizer)
     set_vocab_len(to_tokenizer)
 
+    if cache_dir is not None:
+        path = os.path.join(os.path.expanduser(cache_dir), get_tokenizer_fingerprint(from_tokenizer) + '-' +
+                            get_tokenizer_fingerprint(to_tokenizer))
+        if os.path.exists(path):
+            return load_translation_map(path)
+
+        translation_map = get_translation_map(from_tokenizer, to_tokenizer)
+        get_one_to_many_matrices(translation_map)
+        get_many_to_one_matrices(translation_map)
+        save_translation_map(translation_map, path)
+        return translation_map
+
     translation_map = {'lengths': {}}
 
     phrases = from_tokenizer.batch_decode(range(from_tokenizer.vocab_len))  # tokens to strings
@@ -444,6 +466,98 @@ def get_translation_map(from_tokenizer: PreTrainedTokenizerBase,
     return translation_map
 
 
+def get_tokenizer_fingerprint(tokenizer: PreTrainedTokenizerBase) -> str:
+    r"""
+    Hash identifying a tokenizer vocabulary, used to key persisted translation maps.
+        Args:
+            tokenizer (:obj:`PreTrainedTokenizerBase`, `required`):
+                Tokenizer.
+
+        Returns:
+            fingerprint (:obj:`str`, `required`):
+                Hex digest of the tokenizer class, vocab_len and vocabulary.
+    """
+    set_vocab_len(tokenizer)
+    vocab = sorted(tokenizer.get_vocab().items(), key=lambda item: item[1])
+    content = json.dumps([type(tokenizer).__name__, tokenizer.vocab_len, vocab], ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+
+
+def save_translation_map(translation_map: Dict[str, Any], path: str) -> None:
+    r"""
+    Saves a translation map and its sparse translation matrices as numpy arrays in directory path.
+    The directory is written in full before being moved into place, so readers never see a partial map.
+        Args:
+            translation_map (:obj:`Dict[str, Any]`, `required`):
+                Translation map from get_translation_map.
+            path (:obj:`str`, `required`):
+                Directory to save the translation map to.
+
+        Returns:
+
+    """
+    tmp_path = path + '.tmp{}'.format(os.getpid())
+    os.makedirs(tmp_path, exist_ok=True)
+
+    meta = {'lengths': sorted(translation_map['lengths'].keys()), 'matrices': {}}
+    for l in meta['lengths']:
+        np.save(os.path.join(tmp_path, 'from_{}.npy'.format(l)), translation_map['lengths'][l]['from'].numpy())
+        np.save(os.path.join(tmp_path, 'to_{}.npy'.format(l)), translation_map['lengths'][l]['to'].numpy())
+    np.save(os.path.join(tmp_path, 'counts.npy'), translation_map['counts'].numpy())
+
+    for kind in ['one_to_many_matrices', 'many_to_one_matrices']:
+        if kind in translation_map:
+            meta['matrices'][kind] = [list(matrix.shape) for matrix in translation_map[kind]]
+            for i, matrix in enumerate(translation_map[kind]):
+                matrix = matrix.coalesce()  # saved coalesced, so that loading does not need to coalesce (copy) again
+                np.save(os.path.join(tmp_path, '{}_{}_indices.npy'.format(kind, i)), matrix.indices().numpy())
+                np.save(os.path.join(tmp_path, '{}_{}_values.npy'.format(kind, i)), matrix.values().numpy())
+
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:  # saved concurrently by another process
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def load_translation_map(path: str) -> Dict[str, Any]:
+    r"""
+    Loads a translation map saved with save_translation_map, memory-mapping its arrays.
+        Args:
+            path (:obj:`str`, `required`):
+                Directory the translation map was saved to.
+
+        Returns:
+            translation_map (:obj:`Dict[str, Any]`, `required`):
+                Maps for each observed length, a source token to a token sequence of that length,
+                with source index to target indices, including the saved sparse translation matrices.
+    """
+    def load(name: str) -> torch.Tensor:
+        with warnings.catch_warnings():
+            # the memory-mapped arrays are read-only, which torch warns about; they are never written to.
+            warnings.simplefilter('ignore')
+            return torch.from_numpy(np.load(os.path.join(path, name + '.npy'), mmap_mode='r'))
+
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+
+    translation_map = {'lengths': {}}
+    for l in meta['lengths']:
+        translation_map['lengths'][l] = {'from': load('from_{}'.format(l)),
+                                         'to': load('to_{}'.format(l))}
+    translation_map['counts'] = load('counts')
+
+    for kind, shapes in meta['matrices'].items():
+        # the saved indices are coalesced, marking the tensors as such keeps them on the memory-mapped arrays
+        translation_map[kind] = [torch.sparse_coo_tensor(load('{}_{}_indices'.format(kind, i)),
+                                                         load('{}_{}_values'.format(kind, i)), shape)._coalesced_(True)
+                                 for i, shape in enumerate(shapes)]
+
+    return translation_map
+
+
 def translate_one_to_many(probs_from: torch.FloatTensor, probs_to: torch.FloatTensor,
                           translation_map: Dict[str, Any]) -> None:
     r"""
@@ -588,6 +702,216 @@ def translate_tokenizer_probs(probs: torch.FloatTensor, probs_std: torch.FloatTe
             print('Undefined mapping.')
 
 
+def get_one_to_many_matrices(translation_map: Dict[str, Any]) -> List[torch.Tensor]:
+    r"""
+    Sparse matrices of the one-to-many translation performed by translate_one_to_many, one per unrolling step.
+    Computed once per translation map and kept in translation_map['one_to_many_matrices'].
+        Args:
+            translation_map (:obj:`Dict[str, Any]`, `required`):
+                Maps for each observed length, a source token to a token sequence of that length,
+                with source index to target indices.
+
+        Returns:
+            matrices (:obj:`List[torch.Tensor]`, `required`):
+                [max_len] sparse [to_vocab_size, from_vocab_size] matrices, where matrix i maps a source token
+                distribution to the distribution of the i-th token of its target sequence.
+    """
+    if 'one_to_many_matrices' in translation_map:
+        return translation_map['one_to_many_matrices']
+
+    max_len, to_vocab_size = translation_map['counts'].shape
+    from_vocab_size = sum([len(m['from']) for m in translation_map['lengths'].values()])
+
+    matrices = []
+    for i in range(max_len):  # each unrolling step
+        rows = [m['to'][:, i] for l, m in translation_map['lengths'].items() if i < l]  # [subset_size] to-tokens
+        cols = [m['from'] for l, m in translation_map['lengths'].items() if i < l]  # [subset_size] from-tokens
+        indices = torch.stack([torch.cat(rows), torch.cat(cols)])  # [2, nnz]
+        matrices += [torch.sparse_coo_tensor(indices, torch.ones(indices.shape[1]),
+                                             (to_vocab_size, from_vocab_size)).coalesce()]
+
+    translation_map['one_to_many_matrices'] = matrices
+    return matrices
+
+
+def get_many_to_one_matrices(translation_map: Dict[str, Any]) -> List[torch.Tensor]:
+    r"""
+    Sparse matrices of the many-to-one translation performed by translate_many_to_one, one per sequence position.
+    The division by path counts and by the mapping length are folded into the matrix values.
+    Computed once per translation map and kept in translation_map['many_to_one_matrices'].
+        Args:
+            translation_map (:obj:`Dict[str, Any]`, `required`):
+                Maps for each observed length, a source token to a token sequence of that length,
+                from target index to source indices.
+
+        Returns:
+            matrices (:obj:`List[torch.Tensor]`, `required`):
+                [max_len] sparse [vocab_size, many_vocab_size] matrices, where matrix j maps the j-th distribution
+                of a sequence over the many-tokenizer vocabulary to its contribution to the single token distribution.
+    """
+    if 'many_to_one_matrices' in translation_map:
+        return translation_map['many_to_one_matrices']
+
+    counts = translation_map['counts']  # [max_len, many_vocab_size]
+    max_len, many_vocab_size = counts.shape
+    vocab_size = sum([len(m['from']) for m in translation_map['lengths'].values()])
+
+    matrices = []
+    for j in range(max_len):  # each sequence position
+        rows, cols, values = [], [], []
+        for map_len, m in translation_map['lengths'].items():
+            if j < map_len:
+                rows += [m['from']]  # [subset_size] single tokens
+                cols += [m['to'][:, j]]  # [subset_size] j-th tokens of the sequences
+                values += [1. / (map_len * counts[j, m['to'][:, j]].float())]  # path count and sequence average
+        indices = torch.stack([torch.cat(rows), torch.cat(cols)])  # [2, nnz]
+        matrices += [torch.sparse_coo_tensor(indices, torch.cat(values), (vocab_size, many_vocab_size)).coalesce()]
+
+    translation_map['many_to_one_matrices'] = matrices
+    return matrices
+
+
+def translate_mapped_probs(aligned_probs: List[torch.FloatTensor], mappings: List[List[tuple]],
+                           probs_std: torch.FloatTensor,
+                           to_translation_map: Dict[str, Any], from_translation_map: Dict[str, Any]) -> None:
+    r"""
+    Batched equivalent of the mapping loop of translate_tokenizer_probs. Gathers the one-to-many and many-to-one
+    segments of all batch items, then translates them with one sparse matrix product per sequence position.
+        Args:
+            aligned_probs (:obj:`List[torch.FloatTensor]`, `required`):
+                [batch_size] of [aligned_sequence_len, vocab_size] aligned source probability distributions.
+            mappings (:obj:`List[List[tuple]]`, `required`):
+                [batch_size] of one-to-many / many-to-one mappings from get_tokenizer_sequence_mappings.
+            probs_std (:obj:`torch.FloatTensor`, `required`):
+                [batch_size, std_sequence_len, std_vocab_size] Output probability distribution over a target
+                tokenizer vocabulary. Reference that will be written in-place.
+            to_translation_map (:obj:`Dict[str, Any]`, `required`):
+                Maps for each observed length, a source token to a token sequence of that length,
+                with source index to target indices.
+            from_translation_map (:obj:`Dict[str, Any]`, `required`):
+                Maps for each observed length, a source token to a token sequence of that length,
+                from target index to source indices.
+
+        Returns:
+
+    """
+    one_to_many_matrices = get_one_to_many_matrices(to_translation_map)
+    many_to_one_matrices = get_many_to_one_matrices(from_translation_map)
+
+    batch_size, std_sequence_len, std_vocab_size = probs_std.shape
+    probs_std_flat = probs_std.view(-1, std_vocab_size)  # [batch_size * std_sequence_len, std_vocab_size]
+    flat_probs = torch.cat(aligned_probs, dim=0)  # [sum(aligned_sequence_len), vocab_size]
+
+    one_to_many_src = [[] for _ in one_to_many_matrices]  # source rows per unrolling step
+    one_to_many_dst = [[] for _ in one_to_many_matrices]  # target rows per unrolling step
+    many_to_one_src = [[] for _ in many_to_one_matrices]  # source rows per sequence position
+    many_to_one_seg = [[] for _ in many_to_one_matrices]  # segment of each source row per sequence position
+    many_to_one_dst = []  # target row per segment
+
+    offset = 0
+    for b in range(batch_size):
+        aligned_len = aligned_probs[b].shape[0]
+        for (right_idx, right_idx_std, segment_count_base, segment_count_std_base,
+             segment_count_overlap, segment_count_std_overlap) in mappings[b][1:]:  # don't map start token
+
+            segment_count = segment_count_base + segment_count_overlap  # calculate effective segments length
+            segment_count_std = segment_count_std_base + segment_count_std_overlap  # calculate effective segments length
+
+            # === One-to-many / one-to-one mapping ===
+            if segment_count_base == 1:
+                start_idx_std = right_idx_std - segment_count_std  # calculate starting index
+                end_idx_std = min(right_idx_std, std_sequence_len)
+                for i in range(min(end_idx_std - start_idx_std, len(one_to_many_matrices))):
+                    one_to_many_src[i] += [offset + right_idx - 1]
+                    one_to_many_dst[i] += [b * std_sequence_len + start_idx_std + i]
+
+            # === Many-to-one mapping ===
+            elif segment_count_std_base == 1:  # many-to-one
+                start_idx = right_idx - segment_count  # calculate starting index
+                end_idx = min(right_idx, aligned_len)
+                for j in range(min(end_idx - start_idx, len(many_to_one_matrices))):
+                    many_to_one_src[j] += [offset + start_idx + j]
+                    many_to_one_seg[j] += [len(many_to_one_dst)]
+                many_to_one_dst += [b * std_sequence_len + right_idx_std - 1]
+
+            else:
+                logger.warning('Undefined mapping.')
+
+        offset += aligned_len
+
+    # === Unroll single distributions into std sequences ===
+    for matrix, src, dst in zip(one_to_many_matrices, one_to_many_src, one_to_many_dst):
+        if len(src) > 0:
+            translated = torch.sparse.mm(matrix, flat_probs[src].T).T  # [len(src), std_vocab_size]
+            probs_std_flat.index_add_(0, torch.tensor(dst, dtype=torch.long), translated)
+
+    # === Average source sequences into single std distributions ===
+    if len(many_to_one_dst) > 0:
+        many_to_one_probs = torch.zeros((len(many_to_one_dst), std_vocab_size))
+        for matrix, src, seg in zip(many_to_one_matrices, many_to_one_src, many_to_one_seg):
+            if len(src) > 0:
+                translated = torch.sparse.mm(matrix, flat_probs[src].T).T  # [len(src), std_vocab_size]
+                many_to_one_probs.index_add_(0, torch.tensor(seg, dtype=torch.long), translated)
+        probs_std_flat[many_to_one_dst] = many_to_one_probs
+
+
+def translate_tokenizer_probs_batch(probs: List[torch.FloatTensor], probs_std: torch.FloatTensor,
+                                    offset_mapping: List[List[tuple]], offset_mapping_std: List[List[tuple]],
+                                    tokenizer: PreTrainedTokenizerBase, std_tokenizer: PreTrainedTokenizerBase,
+                                    split_map_cache: Dict[tuple, List[Dict[str, torch.Tensor]]],
+                                    to_translation_map: Dict[str, Any], from_translation_map: Dict[str, Any],
+                                    tokens: List[torch.LongTensor], tokens_std: torch.LongTensor) -> None:
+    r"""
+    Batched translate_tokenizer_probs: aligns each batch item through source token splits, then performs all
+    one-to-one, one-to-many and many-to-one distribution mappings of the batch with sparse matrix products.
+        Args:
+            probs (:obj:`List[torch.FloatTensor]`, `required`):
+                [batch_size] of [sequence_len, vocab_size] Input probability distributions over a source tokenizer
+                vocabulary, with left padding removed.
+            probs_std (:obj:`torch.FloatTensor`, `required`):
+                [batch_size, std_sequence_len, std_vocab_size] Output probability distribution over a target
+                tokenizer vocabulary. Reference that will be written in-place.
+            offset_mapping (:obj:`List[List[tuple]]`, `required`):
+                Batch of tokenizer offset mappings.
+            offset_mapping_std (:obj:`List[List[tuple]]`, `required`):
+                Batch of standard tokenizer offset mappings.
+            tokenizer (:obj:`PreTrainedTokenizerBase`, `required`):
+                Source tokenizer.
+            std_tokenizer (:obj:`PreTrainedTokenizerBase`, `required`):
+                Standard/target tokenizer.
+            split_map_cache (:obj:`Dict[tuple, List[Dict[str, torch.Tensor]]]`, `required`):
+                A dictionary of depths keying split_maps of mappings from original tokens to
+                target tokens at each depth of the split. Adds split_maps to cache for faster future recall.
+            to_translation_map (:obj:`Dict[str, Any]`, `required`):
+                Maps for each observed length, a source token to a token sequence of that length,
+                with source index to target indices.
+            from_translation_map (:obj:`Dict[str, Any]`, `required`):
+                Maps for each observed length, a source token to a token sequence of that length,
+                from target index to source indices.
+            tokens (:obj:`List[torch.LongTensor]`, `required`):
+                [batch_size] of [sequence_len] sequences of tokens produced by the source tokenizer.
+            tokens_std (:obj:`torch.LongTensor`, `required`):
+                [batch_size, std_sequence_len] Sequences of tokens produced by the standard tokenizer.
+
+        Returns:
+
+    """
+    aligned_probs = []
+    mappings = []
+    for b in range(len(probs)):
+        # === Align tokenized sequences via source token splitting ===
+        result = align_tokenizer_sequences(probs[b], offset_mapping[b], offset_mapping_std[b],
+                                           tokenizer, split_map_cache, tokens[b].cpu(), tokens_std[b].cpu())
+        aligned_probs_b, aligned_offset_mapping_b, aligned_tokens_b = result
+        aligned_probs += [aligned_probs_b]
+
+        # === Get one-to-many / many-to-one mappings ===
+        mappings += [get_tokenizer_sequence_mappings(aligned_offset_mapping_b, offset_mapping_std[b])]
+
+    # === Perform probability mappings ===
+    translate_mapped_probs(aligned_probs, mappings, probs_std, to_translation_map, from_translation_map)
+
+
 def get_top_probs(probs: torch.FloatTensor, tokenizer: PreTrainedTokenizerBase, amount: int = 10) -> str:
     r"""
     Constructs output string with top amount of highest probability token strings.
@@ -686,13 +1010,12 @@ def translate_logits_to_probs_std(logits: torch.FloatTensor,
 
     # === Translate to probabilities over standard tokenizer ===
     probs_std = torch.zeros(batch_size, std_sequence_len, std_vocab_size)
-    for b in range(batch_size):
-        probs_b = probs[b][-len(offset_mapping[b]):]  # remove left padding
-        tokens_b = tokens[b][-len(offset_mapping[b]):]  # remove left padding
-        translate_tokenizer_probs(probs_b, probs_std[b], offset_mapping[b], offset_mapping_std[b],
-                                  tokenizer, std_tokenizer,
-                                  split_map_cache, to_translation_map, from_translation_map,
-                                  tokens_b, tokens_std[b])
+    probs_batch = [probs[b][-len(offset_mapping[b]):] for b in range(batch_size)]  # remove left padding
+    tokens_batch = [tokens[b][-len(offset_mapping[b]):] for b in range(batch_size)]  # remove left padding
+    translate_tokenizer_probs_batch(probs_batch, probs_std, offset_mapping, offset_mapping_std,
+                                    tokenizer, std_tokenizer,
+                                    split_map_cache, to_translation_map, from_translation_map,
+                                    tokens_batch, tokens_std)
 
     # === Correct excess probability mass (haircut) ===
     probs_std_sum = probs_std.sum(dim=-1)  # [batch_size, std_sequence_len]
@@ -758,37 +1081,27 @@ def topk_token_phrases(logits: torch.Tensor, tokenizer: PreTrainedTokenizerBase,
     remainder_pmass = torch.clamp(1 - topk_pmass, 1e-40, 1)  # [batch_size] remainder probability mass
     floor_probs = remainder_pmass / (vocab_size - topk)  # [batch_size]divide remainder
 
-    # convert to list for faster iteration in list comprehension
-    topk_probs_list = topk_probs.tolist()
-    topk_indices_list = topk_indices.tolist()
-    floor_probs_list = floor_probs.tolist()
+    if not hasattr(tokenizer, 'std_token_phrases_tensor'):
+        set_std_token_phrases_tensor(tokenizer)
 
-    # === Construct topk phrases list ===
-    probs = []  # collect probability tensors with gradients attached (to be grafted into topk_tensor)
-    phrases = []  # form topk token phrases with prob prepend [prob, tok_0, tok_1, ... tok_n]
-
-    for b in range(batch_size):
-        # collect probability tensors with gradients attached (to be grafted into topk_tensor)
-        probs += [topk_probs[b], floor_probs[b]]  # [tensor(prob_k=0_b, prob_k=1_b, ...), tensor(prob_floor_b)]
-
-        # form topk token phrases with prob prepend [prob, tok_0, tok_1, ... tok_n]
-        phrases += [[prob] + tokenizer.std_token_phrases[i]
-                    for prob, i in zip(topk_probs_list[b], topk_indices_list[b])]  # [prob_k, tok_0_k, tok_1_k, ...]
-
-        # also add prob_floor for batch item
-        phrases += [[floor_probs_list[b]]]  # [prob_floor_b]
+    # === Gather topk phrases from precomputed phrase table ===
+    topk_indices_cpu = topk_indices.cpu()  # phrase table is kept on cpu
+    phrases_len = tokenizer.std_token_phrases_len[topk_indices_cpu]  # [batch_size, topk]
 
     # determine width of topk_tensor as max len of all phrase lists (with prob in front)
-    max_len = max([len(p) for p in phrases])  # max_{b,k}(len([prob_k, tok_0_k, tok_1_k, ...]))
+    max_len = 1 + int(phrases_len.max()) if topk > 0 else 1  # max_{b,k}(len([prob_k, tok_0_k, tok_1_k, ...]))
 
-    # form single 2D tensor with all phrase and probs (typically to send to axon wire encoding)
-    topk_tensor = torch.tensor([p + [ignore_index] * (max_len - len(p))
-                                for p in phrases]).to(logits.device)  # [batch_size * (topk + 1), max_len]
+    phrases = tokenizer.std_token_phrases_tensor[topk_indices_cpu, :max_len - 1]  # [batch_size, topk, max_len - 1]
+    positions = torch.arange(max_len - 1)  # [max_len - 1]
+    phrases = phrases.masked_fill(positions >= phrases_len[..., None], ignore_index)  # pad with ignore_index
 
-    # grafting probability tensors into first column to attach gradients
-    topk_tensor[:, 0] = torch.hstack(probs)  # tensor([prob_k=0_b, prob_k=1_b, ..., prob_floor_b])
+    # add ignore_index row for prob_floor of each batch item
+    floor_phrases = torch.full((batch_size, 1, max_len - 1), ignore_index, dtype=torch.long)
+    phrases = torch.cat([phrases, floor_phrases], dim=1).to(logits.device)  # [batch_size, (topk + 1), max_len - 1]
 
-    topk_tensor = topk_tensor.reshape(batch_size, topk + 1, max_len)  # [batch_size, (topk + 1), max_len] reshaped
+    # prepend probability tensors in first column to attach gradients
+    probs = torch.cat([topk_probs, floor_probs[:, None]], dim=1)  # [batch_size, (topk + 1)]
+    topk_tensor = torch.cat([probs[..., None], phrases.to(probs.dtype)], dim=-1)  # [batch_size, (topk + 1), max_len]
 
     return topk_tensor  # [batch_size, (topk + 1), max_len] (probability gradients attached in first column)
 
@@ -920,12 +1233,15 @@ def phrase_cross_entropy(target_phrases: Union[List[List[int]], torch.Tensor],
     r"""
     Calculates the cross entropy of a phrase prediction against a target phrase, so that this is a multi-token
     extension of typical cross entropy calculated for next token prediction.
+    All batch items and sub target lengths are matched at once, and a stacked topk_tensor of several
+    responses (e.g. one per uid) can be scored in a single call against the same target phrases.
         Args:
             target_phrases (:obj:`List[List[int]]`, `required`):
                 [batch_size, *] Target phrases in standard token sequence list.
             topk_tensor (:obj:`torch.Tensor`, `required`):
-                [batch_size, (topk + 1), max_len] tensor includes topk token probabilities (prob_k) + floor_prob
-                in first column with gradients attached, with std_tokens in remaining columns with ignore_index padding.
+                [batch_size, (topk + 1), max_len] or stacked [n, batch_size, (topk + 1), max_len] tensor includes
+                topk token probabilities (prob_k) + floor_prob in first column with gradients attached,
+                with std_tokens in remaining columns with ignore_index padding.
                 Content structure:
                 [[[prob_k=0_b=0, tok_0_k=0_b=0, tok_1_k=0_b=0, ..., ignore_index?],
                   [prob_k=1_b=0, tok_0_k=1_b=0, tok_1_k=1_b=0, ..., ignore_index?],
@@ -947,69 +1263,96 @@ def phrase_cross_entropy(target_phrases: Union[List[List[int]], torch.Tensor],
                 used to prevent the floor_probs from being too large.
         Returns:
             loss_val (:obj:`torch.Tensor`, `required`):
-                Validation cross entropy loss, either scalar if reduce or [batch_size].
+                Validation cross entropy loss, either scalar if reduce or [batch_size] ([n] or [n, batch_size] if stacked).
             loss (:obj:`torch.Tensor`, `required`):
-                Phrase cross entropy loss, either scalar if reduce or [batch_size].
+                Phrase cross entropy loss, either scalar if reduce or [batch_size] ([n] or [n, batch_size] if stacked).
     """
 
-    batch_size, topk_p1, max_len = topk_tensor.shape  # [batch_size, (topk + 1), max_len]
+    *stack_shape, batch_size, topk_p1, max_len = topk_tensor.shape  # [(n,) batch_size, (topk + 1), max_len]
     topk = topk_p1 - 1
+    check_len = max_len - 1  # number of phrase token columns
+    device = topk_tensor.device
 
-    topk_tokens = topk_tensor[:, :-1, 1:].round().int()  # [batch_size, topk, max_len - 1] Phrase tokens with ignore_index token for padding.
-    topk_probs = topk_tensor[:, :-1, 0]  # [batch_size, topk] Probabilities for each phrase in topk
-    floor_probs = topk_tensor[:, -1, 0]  # [batch_size] Floor probabilities as mean probability for non-topk tokens
+    topk_tokens = topk_tensor[..., :-1, 1:].round()  # [(n,) batch_size, topk, max_len - 1] Phrase tokens with ignore_index token for padding.
+    topk_probs = topk_tensor[..., :-1, 0]  # [(n,) batch_size, topk] Probabilities for each phrase in topk
+    floor_probs = topk_tensor[..., -1, 0]  # [(n,) batch_size] Floor probabilities as mean probability for non-topk tokens
 
-    topk_probs = torch.clamp(topk_probs, 0, 1)  # [batch_size, topk] ensure probabilities within [0, 1]
-    floor_probs = torch.clamp(floor_probs, 0, 1)  # [batch_size] ensure floor probabilities within [0, 1]
+    topk_probs = torch.clamp(topk_probs, 0, 1)  # [(n,) batch_size, topk] ensure probabilities within [0, 1]
+    floor_probs = torch.clamp(floor_probs, 0, 1)  # [(n,) batch_size] ensure floor probabilities within [0, 1]
 
     # === Ensure total probability is 1 ===
-    total_probs = topk_probs.sum(dim=-1) + max(0, vocab_size_min - topk) * floor_probs  # [batch_size] total probs
-    n_topk_probs = topk_probs / total_probs[:, None]  # [batch_size, topk] normalized topk_probs
-    n_floor_probs = floor_probs / total_probs  # [batch_size] normalized floor_probs
-
-    val_probs = torch.zeros(batch_size).to(topk_probs.device)  # accumulate probabilities when first tokens match
-    match_probs = torch.zeros(batch_size).to(topk_probs.device)  # accumulate probabilities when sub target matches phrase
-    for b in range(batch_size):
-        target_phrase = target_phrases[b]
-        if not isinstance(target_phrase, torch.Tensor):
-            target_phrase = torch.tensor(target_phrases[b])
-        if isinstance(target_phrase, torch.FloatTensor):
-            target_phrase = target_phrase.round().int()
-
-        match = (topk_tokens[b, :, 0] == target_phrase[0].item())  # bool where first tokens match (validation token)
-        if match.sum() > 0:
-            val_probs[b] = n_topk_probs[b, match].sum()  # accumulate all matches
-        else:  # no matches
-            val_probs[b] = n_floor_probs[b]  # assume match is in non-topk tokens with avg floor_prob
-
-        # === Integrate sub target matches ===
-        check_len = min(max_len - 1, len(target_phrase))
-        for c in range(1, check_len + 1):  # progressively increase sub target length
-            target = ignore_index * torch.ones(check_len, dtype=torch.int32).to(topk_tensor.device)  # [-100, ..., -100]
-            target[:c] = target_phrase[:c]  # [tok0, tok1, ...tokc, -100, ..., -100]
-
-            # Find sub target matches
-            match = (topk_tokens[b, :, :check_len] == target)
-            match_idx = torch.where(match.sum(dim=-1) == check_len)[0]  # phrase indices which match sub target
-
-            if len(match_idx):  # at least one match
-                match_probs[b] += n_topk_probs[b, match_idx].sum()  # accumulate all matches
-            else:  # no matches
-                match_probs[b] += n_floor_probs[b]  # assume match is in non-topk tokens with avg floor_prob
-
-    val_probs = torch.clamp(val_probs, 0, 1)  # [batch_size] ensure 0 <= total probability <= 1
-    loss_val = - torch.log(val_probs + 1e-40)  # [batch_size] calculate cross entropy loss
-
-    match_probs = torch.clamp(match_probs, 0, 1)  # [batch_size] ensure 0 <= total probability <= 1
-    loss = - torch.log(match_probs + 1e-40)  # [batch_size] calculate cross entropy loss
+    total_probs = topk_probs.sum(dim=-1) + max(0, vocab_size_min - topk) * floor_probs  # [(n,) batch_size] total probs
+    n_topk_probs = topk_probs / total_probs[..., None]  # [(n,) batch_size, topk] normalized topk_probs
+    n_floor_probs = floor_probs / total_probs  # [(n,) batch_size] normalized floor_probs
+
+    # === Pad target phrases to [batch_size, check_len] ===
+    if isinstance(target_phrases, torch.Tensor) and target_phrases.dim() == 2:
+        targets = target_phrases[:, :check_len]
+        if targets.is_floating_point():
+            targets = targets.round()
+        target_lens = torch.full((batch_size,), targets.shape[1], dtype=torch.long)
+        targets = torch.nn.functional.pad(targets.int(), (0, check_len - targets.shape[1]), value=ignore_index)
+    else:
+        targets = torch.full((batch_size, check_len), ignore_index, dtype=torch.int32)
+        target_lens = torch.zeros(batch_size, dtype=torch.long)
+        for b in range(batch_size):
+            target_phrase = target_phrases[b]
+            if not isinstance(target_phrase, torch.Tensor):
+                target_phrase = torch.tensor(target_phrases[b])
+            if target_phrase.is_floating_point():
+                target_phrase = target_phrase.round()
+            target_phrase = target_phrase[:check_len]
+            targets[b, :len(target_phrase)] = target_phrase.int()
+            target_lens[b] = len(target_phrase)
+
+    targets = targets.to(device=device, dtype=topk_tokens.dtype)  # [batch_size, check_len]
+    in_check = torch.arange(check_len, device=device) < target_lens.to(device)[:, None]  # [batch_size, check_len] positions within check length per item
+
+    # === Validation token matches ===
+    match = (topk_tokens[..., 0] == targets[:, None, 0])  # [(n,) batch_size, topk] bool where first tokens match (validation token)
+    val_probs = torch.where(match.any(dim=-1),
+                            (n_topk_probs * match).sum(dim=-1),  # accumulate all matches
+                            n_floor_probs)  # no matches: assume match is in non-topk tokens with avg floor_prob
+
+    # === Integrate sub target matches ===
+    # Sub target [tok0, ..., tokc, -100, ..., -100] of length c is matched by the phrases with c tokens within the
+    # check length whose tokens all match the target prefix, so each phrase matches at most one sub target length.
+    prefix_match = (topk_tokens == targets[:, None, :])  # [(n,) batch_size, topk, check_len]
+    prefix_len = prefix_match.cumprod(dim=-1, dtype=torch.uint8).sum(dim=-1, dtype=torch.int16)  # [(n,) batch_size, topk] matching prefix length
+    phrase_len = (topk_tokens != ignore_index).sum(dim=-1, dtype=torch.int16)  # [(n,) batch_size, topk] phrase token count
+    phrase_len = torch.minimum(phrase_len, target_lens.to(device=device, dtype=torch.int16)[:, None])  # tokens within check length
+    match = (prefix_len >= phrase_len) & (phrase_len > 0)  # [(n,) batch_size, topk] phrase matches sub target of length phrase_len
+
+    phrase_len = phrase_len.long()  # scatter index
+    sub_shape = n_topk_probs.shape[:-1] + (check_len + 1,)  # [(n,) batch_size, check_len + 1] indexed by sub target length
+    sub_probs = torch.zeros(sub_shape, dtype=n_topk_probs.dtype, device=device).scatter_add(-1, phrase_len, n_topk_probs * match)
+    sub_matches = torch.zeros(sub_shape, dtype=torch.long, device=device).scatter_add(-1, phrase_len, match.long())
+    sub_probs = torch.where(sub_matches[..., 1:] > 0, sub_probs[..., 1:],  # accumulate all matches
+                            n_floor_probs[..., None])  # no matches: assume match is in non-topk tokens with avg floor_prob
+    match_probs = (sub_probs * in_check).sum(dim=-1)  # [(n,) batch_size] sum over sub target lengths within check length
+
+    val_probs = torch.clamp(val_probs, 0, 1)  # [(n,) batch_size] ensure 0 <= total probability <= 1
+    loss_val = - torch.log(val_probs + 1e-40)  # [(n,) batch_size] calculate cross entropy loss
+
+    match_probs = torch.clamp(match_probs, 0, 1)  # [(n,) batch_size] ensure 0 <= total probability <= 1
+    loss = - torch.log(match_probs + 1e-40)  # [(n,) batch_size] calculate cross entropy loss
 
     if reduce:
         if not hasattr(loss_val, reduction) or not hasattr(loss, reduction):
             raise RuntimeError(f'phase_cross_entropy(): Reduction function {reduction} not found.')
-        loss_val = getattr(loss_val, reduction)()
-        loss = getattr(loss, reduction)()
-        if loss.numel() > 1:
-            raise ValueError(f'phase_cross_entropy(): Expected reduction to scalar, obtained {loss.shape} instead.')
+        if stack_shape:
+            loss_val = getattr(loss_val, reduction)(dim=-1)  # [n] reduce over the batch of each stacked response
+            loss = getattr(loss, reduction)(dim=-1)
+            # max, min, median, mode etc. return (values, indices) when given a dim
+            loss_val = loss_val.values if isinstance(loss_val, tuple) else loss_val
+            loss = loss.values if isinstance(loss, tuple) else loss
+            if loss.shape != torch.Size(stack_shape):
+                raise ValueError(f'phase_cross_entropy(): Expected reduction to {stack_shape}, obtained {loss.shape} instead.')
+        else:
+            loss_val = getattr(loss_val, reduction)()
+            loss = getattr(loss, reduction)()
+            if loss.numel() > 1:
+                raise ValueError(f'phase_cross_entropy(): Expected reduction to scalar, obtained {loss.shape} instead.')
 
     return loss_val, loss
 
@@ -1379,6 +1722,34 @@ def set_std_token_phrases(tokenizer, std_tokenizer):
         # Retokenize phrases to new tokenizer
         tokenizer.std_token_phrases = std_tokenizer(tokenizer.phrases)['input_ids']  # [topk, max_len] convert phrases to tokens sequences
 
+    if not hasattr(tokenizer, 'std_token_phrases_tensor'):
+        set_std_token_phrases_tensor(tokenizer)
+
+
+def set_std_token_phrases_tensor(tokenizer, ignore_index: int = -100):
+    r"""
+    Sets std_token_phrases_tensor, the std_token_phrases padded into a single [vocab_len, max_phrase_len] tensor,
+    and std_token_phrases_len, the [vocab_len] phrase lengths, so that topk_token_phrases can gather
+    phrases with tensor indexing instead of per-element list work.
+        Args:
+            tokenizer(:obj:`PreTrainedTokenizerBase`, `required`):
+                Tokenizer with std_token_phrases set, to set std_token_phrases_tensor for.
+            ignore_index (:obj:`int`, `optional`):
+                Padding value for unfilled token positions in a shorter token phrase.
+
+        Returns:
+
+    """
+    lengths = [len(phrase) for phrase in tokenizer.std_token_phrases]
+    max_len = max(lengths) if len(lengths) else 0
+
+    phrases_tensor = torch.full((len(lengths), max_len), ignore_index, dtype=torch.long)  # [vocab_len, max_phrase_len]
+    for i, phrase in enumerate(tokenizer.std_token_phrases):
+        phrases_tensor[i, :len(phrase)] = torch.tensor(phrase, dtype=torch.long)
+
+    tokenizer.std_token_phrases_tensor = phrases_tensor  # [vocab_len, max_phrase_len]
+    tokenizer.std_token_phrases_len = torch.tensor(lengths, dtype=torch.long)  # [vocab_len]
+
 
 def prep_tokenizer(tokenizer, std_tokenizer=None):
     tokenizer.padding_side = "left"  # Generative default expects most recent token on right-hand side with padding on left. https://github.com/huggingface/transformers/pull/10552
@@ -15,7 +15,15 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
 # DEALINGS IN THE SOFTWARE.
 
+import os
+import tempfile
+
+import numpy
+import torch
 import bittensor
+from bittensor._dataset import token_shards
+from bittensor._dataset.dataset_cache import DatasetCache
+from bittensor._dataset.thread_queue import ThreadQueue
 from . import constant
 from unittest.mock import MagicMock
 logging = bittensor.logging()
@@ -32,6 +40,26 @@ def test_next():
     next(dataset)
     dataset.close()
 
+def test_next_tokenizer_workers():
+    for tokenizer_workers in [0, 2]:
+        dataset = bittensor.dataset(num_batches = constant.dataset.num_batches, dataset_name = constant.dataset.dataset_name, tokenizer_workers = tokenizer_workers)
+        assert next(dataset).size() == (dataset.batch_size, dataset.block_size)
+        assert next(dataset).dtype == torch.long
+        dataset.close()
+
+def test_state_dict():
+    dataset = bittensor.dataset(num_batches = constant.dataset.num_batches, dataset_name = constant.dataset.dataset_name, seed = 0)
+    next(dataset)
+    state_dict = dataset.state_dict()
+    expected = [next(dataset) for _ in range(3)]
+    dataset.close()
+
+    # The iteration is resumed from the shards in the cache, whatever the seed of the new dataset.
+    dataset = bittensor.dataset(num_batches = constant.dataset.num_batches, dataset_name = constant.dataset.dataset_name, seed = 1)
+    dataset.load_state_dict(state_dict)
+    assert all(torch.equal(next(dataset), batch) for batch in expected)
+    dataset.close()
+
 def test_mock():
     dataset = bittensor.dataset(_mock=True, dataset_name = constant.dataset.dataset_name)
     next(dataset)
@@ -48,12 +76,30 @@ def test_mock_function():
 
 def test_fail_IPFS_server():
     dataset = bittensor.dataset(num_batches = constant.dataset.num_batches, dataset_name = constant.dataset.dataset_name)
-    dataset.requests_retry_session = MagicMock(return_value = None)
+    dataset.ipfs.retrieve_directory = MagicMock(return_value = None)
     next(dataset)
     next(dataset)
     next(dataset)
     dataset.close()
 
+def test_thread_queue_exception():
+    calls = []
+    def produce():
+        calls.append(None)
+        if len(calls) == 1:
+            raise ValueError('producer failure')
+        return len(calls)
+    data_queue = ThreadQueue(producer_target = produce, producer_arg = ())
+    # The exception is raised to the consumer and the producer keeps producing.
+    try:
+        data_queue.get()
+    except ValueError as e:
+        assert str(e) == 'producer failure'
+    else:
+        raise AssertionError('Expected the producer exception')
+    assert data_queue.get() == 2
+    data_queue.close()
+
 def test_change_data_size():
     data_sizes = [(10,20), (15.5, 20.5),(30, 40), (25,35)]
     result_data_sizes = [(10,20), (10,20),(30, 40), (25,35)]
@@ -89,5 +135,73 @@ def test_text_dataset():
     
     dataset.close()
 
+
+def test_token_shards():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'file' + token_shards.TOKEN_SHARD_SUFFIX)
+        tokens = numpy.arange(10, dtype = token_shards.token_dtype(50258))
+        token_shards.save_token_shard(path, tokens)
+        shard = token_shards.load_token_shard(path)
+        assert shard.dtype == numpy.uint16
+        assert numpy.array_equal(shard, tokens)
+        assert os.listdir(directory) == ['file' + token_shards.TOKEN_SHARD_SUFFIX]
+
+        corpus = token_shards.TokenCorpus([shard, numpy.arange(10, 15, dtype = numpy.uint16), numpy.zeros(0, dtype = numpy.uint16)])
+        assert len(corpus) == 15
+        assert corpus[8:12].tolist() == [8, 9, 10, 11]
+        assert corpus[12:100].tolist() == [12, 13, 14]
+
+        taken = corpus.take(12)
+        assert len(taken) == 12 and len(corpus) == 3
+        assert taken[:].tolist() == list(range(12))
+        assert corpus[:].tolist() == [12, 13, 14]
+
+        # The sources of the shards follow the tokens which are taken.
+        corpus = token_shards.TokenCorpus([shard, shard[:4]], [('a', 0), ('b', 2)])
+        taken = corpus.take(12)
+        assert taken.state() == [('a', 0, 10), ('b', 2, 4)]
+        assert corpus.state() == [('b', 4, 6)]
+        del taken, shard, corpus
+
+
+def test_dataset_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        # Files saved before the catalog existed are indexed when it is created.
+        os.makedirs(os.path.join(directory, 'Books3'))
+        with open(os.path.join(directory, 'Books3', 'old'), 'w') as f:
+            f.write('a' * 100)
+        token_shards.save_token_shard(os.path.join(directory, 'Books3', 'old' + token_shards.TOKEN_SHARD_SUFFIX), numpy.arange(30, dtype = numpy.uint16))
+        cache = DatasetCache(directory, max_size = 1000)
+        old_size = os.path.getsize(os.path.join(directory, 'Books3', 'old')) + os.path.getsize(os.path.join(directory, 'Books3', 'old' + token_shards.TOKEN_SHARD_SUFFIX))
+        assert cache.folder_size('Books3') == old_size
+        assert cache.tokens('old') == 30
+        assert cache.path('old') == os.path.join(directory, 'Books3', 'old')
+
+        for name, folder in [('listing', 'mountain'), ('first', 'ArXiv'), ('second', 'ArXiv')]:
+            os.makedirs(os.path.join(directory, folder), exist_ok = True)
+            with open(os.path.join(directory, folder, name), 'w') as f:
+                f.write('b' * 200)
+            cache.add_text(folder, name, 200)
+        cache.touch('old')
+        assert cache.size() == old_size + 600
+        assert cache.folder_size('ArXiv') == 400
+        assert sorted(cache.folders()) == ['ArXiv', 'Books3']
+
+        # The least recently used files are evicted first, the listing is pinned.
+        with open(os.path.join(directory, 'ArXiv', 'third'), 'w') as f:
+            f.write('c' * 400)
+        cache.add_text('ArXiv', 'third', 400)
+        assert cache.size() <= 1000
+        assert cache.folder('first') == None and not os.path.exists(os.path.join(directory, 'ArXiv', 'first'))
+        assert cache.folder('listing') == 'mountain'
+        assert cache.folder('third') == 'ArXiv'
+        assert cache.folder_size('ArXiv') == sum(os.path.getsize(os.path.join(directory, 'ArXiv', name)) for name in os.listdir(os.path.join(directory, 'ArXiv')))
+
+        # Files are picked by their number of tokens, estimated from the text size when not tokenized.
+        assert [file['Hash'] for file in cache.sample(['Books3'], 10)] == ['old']
+        assert cache.folder('second') == None
+        assert sorted(file['Hash'] for file in cache.sample(['ArXiv', 'Books3'], 10 ** 6)) == ['old', 'third']
+        cache.close()
+
 if __name__ == "__main__":
     test_change_data_size()
\ No newline at end of file
@@ -1,5 +1,48 @@
 import bittensor
 import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+class StandInHandler(BaseHTTPRequestHandler):
+    r""" Stand-in for the IPFS api, answering /api/v0/cat?arg=<hash> with the body of the hash.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.client_ports.add(self.client_address[1])
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        body = server.bodies[parse_qs(urlparse(self.path).query)['arg'][0]]
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with server.lock:
+            server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+def stand_in_server(bodies, delay = 0):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    # Cancelled downloads reset their connection.
+    server.handle_error = lambda request, client_address: None
+    server.bodies = bodies
+    server.delay = delay
+    server.lock = threading.Lock()
+    server.client_ports = set()
+    server.requests = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return server, 'http://127.0.0.1:{}/api/v0/cat'.format(server.server_address[1])
 
 def test_ipfs_init():
     ipfs = bittensor.Ipfs()
@@ -22,3 +65,42 @@ def test_retrieve_directory():
     assert directory.status_code == 200
     assert len(folder_list) > 1
     
+
+def test_retrieve_directory_keep_alive():
+    bodies = {'hash-{}'.format(i): bytes([i]) * (3 * bittensor.Ipfs.chunk_size + i) for i in range(4)}
+    server, address = stand_in_server(bodies)
+    ipfs = bittensor.Ipfs()
+    for _ in range(3):
+        for ipfs_hash, body in bodies.items():
+            response = ipfs.retrieve_directory(address, (('arg', ipfs_hash),))
+            assert response.status_code == 200
+            assert response.content == body
+    # All requests were sent over one pooled connection.
+    assert len(server.client_ports) == 1
+    server.shutdown()
+
+def test_retrieve_directory_cancelled():
+    server, address = stand_in_server({'hash': b'0' * 4 * bittensor.Ipfs.chunk_size})
+    cancelled = threading.Event()
+    cancelled.set()
+    assert bittensor.Ipfs().retrieve_directory(address, (('arg', 'hash'),), cancelled = cancelled) == None
+    server.shutdown()
+
+def test_map_concurrently():
+    bodies = {'hash-{}'.format(i): str(i).encode() for i in range(40)}
+    server, address = stand_in_server(bodies, delay = 0.05)
+    ipfs = bittensor.Ipfs()
+    results = {}
+    def consume(ipfs_hash, response):
+        results[ipfs_hash] = response.content
+        return len(results) >= 10
+
+    consumed = ipfs.map_concurrently(lambda ipfs_hash: ipfs.retrieve_directory(address, (('arg', ipfs_hash),)), bodies.keys(), consume, max_concurrency = 4)
+    time.sleep(0.2)
+    assert consumed == 10
+    assert all(bodies[ipfs_hash] == content for ipfs_hash, content in results.items())
+    # The remaining downloads were cancelled instead of all 40 being sent.
+    assert server.requests < len(bodies)
+    assert server.max_in_flight <= 4
+    assert len(server.client_ports) <= 4
+    server.shutdown()
@@ -35,12 +35,52 @@ class TestMetagraph(unittest.TestCase):
         self.metagraph.sync()
         self.metagraph.sync(0)
 
+    def test_sync_incremental(self):
+        block = self.metagraph.subtensor.get_current_block()
+        self.metagraph.sync(block)
+        incremental = bittensor.metagraph(subtensor=self.metagraph.subtensor)
+        incremental.sync(block)
+        incremental.sync(block, incremental=True)
+        for name, tensor in self.metagraph.state_dict().items():
+            assert torch.equal( tensor, incremental.state_dict()[name] ), name
+        assert incremental.hotkeys == self.metagraph.hotkeys
+
     def test_load_sync_save(self):
         self.metagraph.sync()
         self.metagraph.save()
         self.metagraph.load()
         self.metagraph.save()
 
+    def test_hotkey_to_uid(self):
+        self.metagraph.sync()
+        hotkeys = self.metagraph.hotkeys
+        for hotkey in hotkeys:
+            assert self.metagraph.hotkey_to_uid( hotkey ) == hotkeys.index( hotkey )
+        assert self.metagraph.hotkey_to_uid( 'not a hotkey' ) == -1
+
+        # The cached hotkeys are returned as a copy, so callers can not modify them.
+        if len( hotkeys ) > 0:
+            hotkeys[0] = 'not a hotkey'
+            assert self.metagraph.hotkeys[0] != 'not a hotkey'
+            assert self.metagraph.hotkey_to_uid( 'not a hotkey' ) == -1
+
+    def test_snapshot(self):
+        self.metagraph.sync()
+        self.metagraph.save( snapshot = True )
+        loaded = bittensor.metagraph(subtensor=self.metagraph.subtensor).load( mmap = True )
+        for name, tensor in self.metagraph.state_dict().items():
+            assert torch.equal( tensor, loaded.state_dict()[name] ), name
+        assert loaded.hotkeys == self.metagraph.hotkeys
+        assert loaded.coldkeys == self.metagraph.coldkeys
+
+        # In-place update of a changed row.
+        self.metagraph.weights[0] = 1 - self.metagraph.weights[0]
+        self.metagraph.save( snapshot = True )
+        block = self.metagraph.block.item()
+        assert torch.equal( bittensor.metagraph(subtensor=self.metagraph.subtensor).load( mmap = True ).weights, self.metagraph.weights )
+        with self.assertRaises( ValueError ):
+            loaded.load_from_snapshot( '~/.bittensor/mock.snapshot', block = block + 1 )
+
     def test_factory(self):
         self.metagraph.load().sync().save()
 
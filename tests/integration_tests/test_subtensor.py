@@ -594,6 +594,66 @@ def test_two_subtensor_ownership():
     time.sleep(2)
     assert not mock_subtensor.global_mock_process_is_running()
 
+def test_subtensor_mock_neurons():
+    mock_subtensor.kill_global_mock_process()
+    sub = bittensor.subtensor(_mock=True)
+    block = sub.get_current_block()
+    n = sub.get_n( block )
+    neurons = sub.neurons( block )
+    assert len( neurons ) == n
+    assert [ vars( neuron ) for neuron in neurons ] == [ vars( sub.neuron_for_uid( uid, block ) ) for uid in range( n ) ]
+    assert [ vars( neuron ) for neuron in sub.neurons( block, page_size = 1 ) ] == [ vars( neuron ) for neuron in neurons ]
+    assert len( sub.neurons() ) >= n
+
+def test_subtensor_mock_hyperparameters():
+    mock_subtensor.kill_global_mock_process()
+    sub = bittensor.subtensor(_mock=True)
+    block = sub.get_current_block()
+    hyperparameters = sub.get_hyperparameters( block )
+    assert hyperparameters.block == block
+    for name in bittensor.Subtensor.hyperparameter_storage:
+        if name not in ( 'blocks_since_epoch', 'n' ):
+            assert getattr( hyperparameters, name ) == getattr( sub, name ), name
+    assert sub.get_hyperparameters().block >= block
+
+def test_subtensor_mock_cache():
+    mock_subtensor.kill_global_mock_process()
+    sub = bittensor.subtensor(_mock=True)
+    sub.cache_ttl = 60
+    block = sub.get_current_block()
+    assert sub.block == block
+    min_allowed_weights = sub.min_allowed_weights
+    assert sub.min_allowed_weights == min_allowed_weights
+    assert sub.get_hyperparameters().block == block
+    assert sub.get_hyperparameters().min_allowed_weights == min_allowed_weights
+    cache_info = sub.cache_info()
+    # Misses: head, MinAllowedWeights and hyperparameters at the block.
+    assert cache_info.misses == 3
+    assert cache_info.hits == 7
+    assert cache_info.block == block
+
+    # The head is read again once the ttl has passed.
+    sub.cache_ttl = 1e-9
+    time.sleep( bittensor.__blocktime__ )
+    assert sub.get_current_block() > block
+    assert sub.cache_info().misses == 4
+
+def test_subtensor_pooled_substrate_drops_failed_connection():
+    mock_subtensor.kill_global_mock_process()
+    sub = bittensor.subtensor(_mock=True)
+    with patch('bittensor._subtensor.subtensor_impl.SubstrateInterface', side_effect = lambda **kwargs: MagicMock()) as substrate_interface:
+        with pytest.raises( ConnectionError ):
+            with sub.pooled_substrate() as substrate:
+                raise ConnectionError()
+        # The failed connection is closed and not returned to the pool.
+        substrate.close.assert_called_once()
+        assert sub._substrate_pool_size == 0 and sub._substrate_pool.empty()
+
+        with sub.pooled_substrate() as new_substrate:
+            assert new_substrate is not substrate
+        assert substrate_interface.call_count == 2
+        assert sub._substrate_pool_size == 1 and sub._substrate_pool.get_nowait() is new_substrate
+
 def test_subtensor_mock_functions():
     sub = bittensor.subtensor(_mock=True)
     sub.n
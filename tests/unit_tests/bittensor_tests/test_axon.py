@@ -27,6 +27,8 @@ import torch
 
 import bittensor
 from bittensor.utils.test_utils import get_random_unused_port
+from bittensor.utils.tokenizer_utils import compact_topk_token_phrases, unravel_topk_token_phrases
+import asyncio
 import concurrent
 
 from concurrent.futures import ThreadPoolExecutor
@@ -453,6 +455,36 @@ def test_forward_joint_success():
     response, code, synapses = axon._forward( request )
     assert [syn.return_code for syn in synapses] == [bittensor.proto.ReturnCode.Success] * len(synapses)
 
+def test_forward_joint_shared_model_output():
+    axon = bittensor.axon(wallet = wallet)
+    received_model_outputs = []
+    def forward_causal_lm( inputs_x: torch.FloatTensor , synapse, model_output = None):
+        received_model_outputs.append( model_output )
+        return None, model_output if model_output != None else {'inputs': inputs_x}, torch.zeros(inputs_x.shape[0], inputs_x.shape[1], bittensor.__vocab_size__)
+    def forward_hidden_state( inputs_x: torch.FloatTensor , synapse, model_output = None):
+        received_model_outputs.append( model_output )
+        return None, model_output if model_output != None else {'inputs': inputs_x}, torch.zeros( inputs_x.shape[0], inputs_x.shape[1], bittensor.__network_dim__)
+    axon.attach_synapse_callback( forward_causal_lm, synapse_type = bittensor.proto.Synapse.SynapseType.TEXT_CAUSAL_LM)
+    axon.attach_synapse_callback( forward_hidden_state, synapse_type = bittensor.proto.Synapse.SynapseType.TEXT_LAST_HIDDEN_STATE)
+
+    inputs_raw = torch.randint(0, 100, (3, 3))
+    other_inputs_raw = torch.randint(100, 200, (3, 3))
+    synapses = [bittensor.synapse.TextCausalLM(), bittensor.synapse.TextLastHiddenState(), bittensor.synapse.TextLastHiddenState()]
+    request = bittensor.proto.TensorMessage(
+        version = bittensor.__version_as_int__,
+        tensors=[ synapses[0].serialize_forward_request_tensor(inputs_raw), synapses[1].serialize_forward_request_tensor(inputs_raw),
+                  synapses[2].serialize_forward_request_tensor(other_inputs_raw)],
+        hotkey= axon.wallet.hotkey.ss58_address,
+        synapses= [ syn.serialize_to_wire_proto() for syn in synapses ]
+    )
+    response, code, synapses = axon._forward( request )
+    assert [syn.return_code for syn in synapses] == [bittensor.proto.ReturnCode.Success] * len(synapses)
+
+    # The second synapse reuses the model output of the first, the third has different inputs.
+    assert received_model_outputs[0] == None
+    assert torch.equal( received_model_outputs[1]['inputs'], inputs_raw )
+    assert received_model_outputs[2] == None
+
 def test_forward_joint_missing_synapse():
     def forward_generate( inputs_x: torch.FloatTensor , synapse, model_output = None):
         return None, None, torch.zeros( (inputs_x.shape[0], synapse.num_to_generate) )
@@ -920,6 +952,221 @@ def test_backward_response_success_text_priority():
     assert code == bittensor.proto.ReturnCode.Success
 
 
+def test_request_batcher_merges_concurrent_calls():
+    batcher = bittensor.RequestBatcher( max_wait = 1, max_tokens = 1000 )
+    batch_sizes = []
+    def forward( inputs_x: torch.FloatTensor, synapse, model_output = None):
+        batch_sizes.append( inputs_x.shape[0] )
+        return 'Success', dict(), inputs_x.unsqueeze(-1) * 2
+
+    synapse = bittensor.synapse.TextLastHiddenState()
+    inputs = [ torch.randint( 0, 100, (i + 1, 3) ) for i in range(4) ]
+    executor = ThreadPoolExecutor(4)
+    futures = [ executor.submit( batcher, forward, inputs_x, synapse ) for inputs_x in inputs ]
+    for inputs_x, future in zip( inputs, futures ):
+        message, model_output, response_tensor = future.result()
+        assert message == 'Success'
+        assert model_output == dict()
+        assert torch.equal( response_tensor, inputs_x.unsqueeze(-1) * 2 )
+    assert batch_sizes == [10]
+
+def test_request_batcher_max_tokens():
+    batcher = bittensor.RequestBatcher( max_wait = 1, max_tokens = 6 )
+    batch_sizes = []
+    def forward( inputs_x: torch.FloatTensor, synapse, model_output = None):
+        batch_sizes.append( inputs_x.shape[0] )
+        return None, dict(), inputs_x
+
+    synapse = bittensor.synapse.TextLastHiddenState()
+    start_time = time.time()
+    executor = ThreadPoolExecutor(2)
+    futures = [ executor.submit( batcher, forward, torch.ones(1, 3), synapse ) for _ in range(2) ]
+    for future in futures:
+        future.result()
+    # The batch runs as soon as the token budget is reached.
+    assert time.time() - start_time < 1
+    assert batch_sizes == [2]
+
+def test_request_batcher_splits_incompatible_calls():
+    batcher = bittensor.RequestBatcher( max_wait = 0.5, max_tokens = 1000 )
+    batch_sizes = []
+    def forward( inputs_x: torch.FloatTensor, synapse, model_output = None):
+        batch_sizes.append( inputs_x.shape[0] )
+        return None, model_output, inputs_x
+
+    executor = ThreadPoolExecutor(3)
+    futures = [
+        executor.submit( batcher, forward, torch.ones(1, 3), bittensor.synapse.TextCausalLMNext( topk = 10 ) ),
+        executor.submit( batcher, forward, torch.ones(1, 4), bittensor.synapse.TextCausalLMNext( topk = 10 ) ),
+        executor.submit( batcher, forward, torch.ones(1, 3), bittensor.synapse.TextCausalLMNext( topk = 20 ) ),
+    ]
+    for future in futures:
+        future.result()
+    assert batch_sizes == [1, 1, 1]
+    assert not batcher.is_batchable( bittensor.synapse.TextSeq2Seq() )
+
+def test_request_batcher_splits_compact_topk():
+    batcher = bittensor.RequestBatcher( max_wait = 1, max_tokens = 1000 )
+    topk = 4
+    def topk_token_phrases( inputs_x ):
+        # [batch_size, topk + 1, 3] phrases of one or two tokens, with the floor probability in the last row.
+        topk_tensor = torch.full( ( inputs_x.shape[0], topk + 1, 3 ), -100. )
+        topk_tensor[ :, :, 0 ] = 1 / ( topk + 2 )
+        topk_tensor[ :, :topk, 1 ] = inputs_x[ :, :1 ] + torch.arange( topk )
+        topk_tensor[ :, 0, 2 ] = inputs_x[ :, 1 ]
+        return topk_tensor
+
+    batch_sizes = []
+    def forward( inputs_x: torch.FloatTensor, synapse, model_output = None):
+        batch_sizes.append( inputs_x.shape[0] )
+        return None, model_output, compact_topk_token_phrases( topk_token_phrases( inputs_x ) )
+
+    synapse = bittensor.synapse.TextCausalLMNext( topk = topk )
+    inputs = [ torch.randint( 0, 100, (i + 1, 3) ) for i in range(3) ]
+    executor = ThreadPoolExecutor(3)
+    futures = [ executor.submit( batcher, forward, inputs_x, synapse ) for inputs_x in inputs ]
+    for inputs_x, future in zip( inputs, futures ):
+        _, _, response_tensor = future.result()
+        assert torch.equal( response_tensor, compact_topk_token_phrases( topk_token_phrases( inputs_x ) ) )
+        assert torch.equal( unravel_topk_token_phrases( response_tensor, topk = topk ), topk_token_phrases( inputs_x ) )
+    assert batch_sizes == [6]
+
+def test_forward_tensor_success_batched():
+    axon = bittensor.axon(wallet = wallet, batch_max_wait = 0.1)
+    assert axon.batcher != None
+
+    def forward( inputs_x: torch.FloatTensor, synapses , model_output = None):
+        return None, dict(), torch.zeros( [inputs_x.shape[0], inputs_x.shape[1], bittensor.__network_dim__])
+    axon.attach_synapse_callback( forward, synapse_type = bittensor.proto.Synapse.SynapseType.TEXT_LAST_HIDDEN_STATE)
+    inputs_raw = torch.rand(3, 3)
+    synapses = [bittensor.synapse.TextLastHiddenState()]
+    inputs_serialized =  synapses[0].serialize_forward_request_tensor(inputs_raw)
+    request = bittensor.proto.TensorMessage(
+        version = bittensor.__version_as_int__,
+        tensors=[inputs_serialized],
+        synapses= [ syn.serialize_to_wire_proto() for syn in synapses ],
+        hotkey = axon.wallet.hotkey.ss58_address,
+    )
+    executor = ThreadPoolExecutor(2)
+    futures = [ executor.submit( axon._forward, request ) for _ in range(2) ]
+    for future in futures:
+        response, code, synapses = future.result()
+        assert code == bittensor.proto.ReturnCode.Success
+
+def test_forward_batched_shared_model_output():
+    axon = bittensor.axon(wallet = wallet, batch_max_wait = 1)
+    model_calls = []
+    received_model_outputs = []
+    def forward_hidden_state( inputs_x: torch.FloatTensor , synapse, model_output = None):
+        if model_output == None:
+            model_calls.append( inputs_x.shape[0] )
+            model_output = {'inputs': inputs_x}
+        return None, model_output, torch.zeros( inputs_x.shape[0], inputs_x.shape[1], bittensor.__network_dim__)
+    def forward_causal_lm( inputs_x: torch.FloatTensor , synapse, model_output = None):
+        received_model_outputs.append( model_output )
+        return None, model_output, torch.zeros(inputs_x.shape[0], inputs_x.shape[1], bittensor.__vocab_size__)
+    axon.attach_synapse_callback( forward_hidden_state, synapse_type = bittensor.proto.Synapse.SynapseType.TEXT_LAST_HIDDEN_STATE)
+    axon.attach_synapse_callback( forward_causal_lm, synapse_type = bittensor.proto.Synapse.SynapseType.TEXT_CAUSAL_LM)
+
+    def request( inputs_raw ):
+        synapses = [bittensor.synapse.TextLastHiddenState(), bittensor.synapse.TextCausalLM()]
+        return bittensor.proto.TensorMessage(
+            version = bittensor.__version_as_int__,
+            tensors=[ syn.serialize_forward_request_tensor(inputs_raw) for syn in synapses ],
+            hotkey= axon.wallet.hotkey.ss58_address,
+            synapses= [ syn.serialize_to_wire_proto() for syn in synapses ]
+        )
+
+    inputs = [ torch.randint(0, 100, (2, 3)), torch.randint(100, 200, (3, 3)) ]
+    executor = ThreadPoolExecutor(2)
+    futures = [ executor.submit( axon._forward, request( inputs_raw ) ) for inputs_raw in inputs ]
+    for future in futures:
+        response, code, synapses = future.result()
+        assert [syn.return_code for syn in synapses] == [bittensor.proto.ReturnCode.Success] * len(synapses)
+
+    # The merged model output is split back per request and shared with the second synapse of each request.
+    assert model_calls == [5]
+    assert sorted( [ model_output['inputs'].tolist() for model_output in received_model_outputs ] ) == sorted( [ inputs_raw.tolist() for inputs_raw in inputs ] )
+
+def test_forward_tensor_success_async():
+    async_axon = bittensor.axon(wallet = wallet, use_asyncio = True, port = get_random_unused_port())
+    assert isinstance( async_axon, bittensor.AsyncAxon )
+
+    def forward( inputs_x: torch.FloatTensor, synapses , model_output = None):
+        return None, dict(), torch.zeros( [inputs_x.shape[0], inputs_x.shape[1], bittensor.__network_dim__])
+    async_axon.attach_synapse_callback( forward, synapse_type = bittensor.proto.Synapse.SynapseType.TEXT_LAST_HIDDEN_STATE)
+    inputs_raw = torch.rand(3, 3)
+    synapses = [bittensor.synapse.TextLastHiddenState()]
+    inputs_serialized =  synapses[0].serialize_forward_request_tensor(inputs_raw)
+    request = bittensor.proto.TensorMessage(
+        version = bittensor.__version_as_int__,
+        tensors=[inputs_serialized],
+        synapses= [ syn.serialize_to_wire_proto() for syn in synapses ],
+        hotkey = async_axon.wallet.hotkey.ss58_address,
+    )
+    response = asyncio.run_coroutine_threadsafe( async_axon.Forward( request, None ), async_axon.loop ).result()
+    assert response.return_code == bittensor.proto.ReturnCode.Success
+    outputs = synapses[0].deserialize_forward_response_proto (inputs_raw, response.tensors[0])
+    assert outputs.size(2) ==  bittensor.__network_dim__
+
+def test_forward_timeout_async():
+    async_axon = bittensor.axon(wallet = wallet, use_asyncio = True, port = get_random_unused_port())
+
+    def forward( inputs_x: torch.FloatTensor, synapses , model_output = None):
+        time.sleep(3)
+        return None, dict(), torch.zeros( [inputs_x.shape[0], inputs_x.shape[1], bittensor.__network_dim__])
+    async_axon.attach_synapse_callback( forward, synapse_type = bittensor.proto.Synapse.SynapseType.TEXT_LAST_HIDDEN_STATE)
+    inputs_raw = torch.rand(3, 3)
+    synapses = [bittensor.synapse.TextLastHiddenState()]
+    async_axon.synapse_timeouts[ bittensor.proto.Synapse.SynapseType.TEXT_LAST_HIDDEN_STATE ] = 1
+    inputs_serialized =  synapses[0].serialize_forward_request_tensor(inputs_raw)
+    request = bittensor.proto.TensorMessage(
+        version = bittensor.__version_as_int__,
+        tensors=[inputs_serialized],
+        synapses= [ syn.serialize_to_wire_proto() for syn in synapses ],
+        hotkey = async_axon.wallet.hotkey.ss58_address,
+    )
+    response = asyncio.run_coroutine_threadsafe( async_axon.Forward( request, None ), async_axon.loop ).result()
+    assert response.return_code == bittensor.proto.ReturnCode.Timeout
+
+def test_grpc_forward_works_async():
+    def forward( inputs_x:torch.FloatTensor, synapse , model_output = None):
+        return None, dict(), torch.zeros( [3, 3, bittensor.__network_dim__])
+    port = get_random_unused_port()
+    async_axon = bittensor.axon (
+        port = port,
+        ip = '127.0.0.1',
+        wallet = wallet,
+        use_asyncio = True,
+    )
+    async_axon.attach_synapse_callback( forward, synapse_type = bittensor.proto.Synapse.SynapseType.TEXT_LAST_HIDDEN_STATE)
+    async_axon.start()
+
+    channel = grpc.insecure_channel(
+            '127.0.0.1:{}'.format(port),
+            options=[('grpc.max_send_message_length', -1),
+                     ('grpc.max_receive_message_length', -1)])
+    stub = bittensor.grpc.BittensorStub( channel )
+
+    inputs_raw = torch.rand(3, 3)
+    synapses = [bittensor.synapse.TextLastHiddenState()]
+    inputs_serialized = synapses[0].serialize_forward_request_tensor(inputs_raw)
+    request = bittensor.proto.TensorMessage(
+        version = bittensor.__version_as_int__,
+        hotkey = sender_wallet.hotkey.ss58_address,
+        tensors = [inputs_serialized],
+        synapses = [ syn.serialize_to_wire_proto() for syn in synapses ]
+    )
+    response = stub.Forward(request,
+                            metadata = (
+                                        ('rpc-auth-header','Bittensor'),
+                                        ('bittensor-signature',sign(sender_wallet, wallet, bittensor.__version_as_int__)),
+                                        ('bittensor-version',str(bittensor.__version_as_int__)),
+                                        ))
+    assert response.return_code == bittensor.proto.ReturnCode.Success
+    async_axon.stop()
+
+
 def run_test_grpc_forward_works(receiver_version):
     def forward( inputs_x:torch.FloatTensor, synapse , model_output = None):
         return None, dict(), torch.zeros( [3, 3, bittensor.__network_dim__])
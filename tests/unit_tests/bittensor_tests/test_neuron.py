@@ -7,6 +7,7 @@ from more_itertools import side_effect
 import pytest
 
 import bittensor
+import numpy
 import torch
 import torch.nn as nn
 from bittensor._subtensor import subtensor
@@ -64,6 +65,86 @@ def test_set_fine_tuning_params():
     core_server.config.neuron.finetune.layer_name = None
     assert core_server.set_fine_tuning_params() == (False, None) 
 
+def test_coreserver_shared_token_remap():
+    core_server = bittensor._neuron.text.core_server.server(pretrained=False)
+    token_batch = torch.randint(0, 100, (2, 8))
+    tokens = core_server.token_remap(token_batch)
+    model_output = SimpleNamespace(tokens = tokens)
+
+    with patch.object(core_server, 'token_remap', wraps = core_server.token_remap) as token_remap:
+        # tokens of a shared model output are reused
+        assert core_server.shared_token_remap(token_batch, model_output = model_output) is tokens
+        assert token_remap.call_count == 0
+
+        # remapped again when the shared tokens lack the offsets mapping
+        tokens_with_offsets = core_server.shared_token_remap(token_batch, return_offsets_mapping = True, model_output = model_output)
+        assert token_remap.call_count == 1
+        assert 'offset_mapping' in tokens_with_offsets
+        assert torch.equal(tokens_with_offsets['input_ids'], tokens['input_ids'])
+
+        # remapped without a shared model output
+        core_server.shared_token_remap(token_batch)
+        assert token_remap.call_count == 2
+
+def test_coreserver_token_remap_cache():
+    core_server = bittensor._neuron.text.core_server.server(pretrained=False)
+    core_server.token_remap_cache_size = 2
+    token_batch = torch.randint(0, 100, (2, 8))
+
+    tokens = core_server.token_remap(token_batch, return_offsets_mapping=True)
+    assert core_server.token_remap(token_batch.clone(), return_offsets_mapping=True) is tokens
+    # tokens with offsets mapping also serve requests without
+    assert core_server.token_remap(token_batch) is tokens
+    cache_info = core_server.token_remap_cache_info()
+    assert (cache_info.hits, cache_info.misses, cache_info.currsize) == (2, 1, 1)
+
+    # least recently used entries are evicted
+    core_server.token_remap(token_batch + 1)
+    core_server.token_remap(token_batch + 2)
+    assert core_server.token_remap_cache_info().currsize == 2
+    assert core_server.token_remap(token_batch, return_offsets_mapping=True) is not tokens
+
+    # the uncached remap gives the same tokens
+    core_server.token_remap_cache_size = 0
+    uncached_tokens = core_server.token_remap(token_batch, return_offsets_mapping=True)
+    assert torch.equal(uncached_tokens['input_ids'], tokens['input_ids'])
+    assert uncached_tokens['offset_mapping'] == tokens['offset_mapping']
+
+def test_corevalidator_neuron_stats():
+    NeuronStats = bittensor._neuron.text.core_validator.NeuronStats
+    neuron_stats = NeuronStats(max_n = 4)
+    alpha = 0.1
+
+    responsive_uids, queried_uids = neuron_stats.update({1: {'uid': 1, 'loss': 2.0, 'shapley_values_min': 4.0},
+                                                         6: {'uid': 6, 'loss': float('nan')}},
+                                                        alpha, ['shapley_values_min'], 0.5, 1.0)
+    assert responsive_uids == [1] and queried_uids == [1, 6]
+    assert neuron_stats[1] == {'uid': 1.0, 'loss': 2.0, 'shapley_values_min': 4.0, 'shapley_values_min!': alpha * 4.0,
+                               'updates!': 1, 'updates_shapley_values_min': 1}
+    assert neuron_stats[6] == {'uid': 6.0, 'shapley_values_min!': 0.0, 'updates!': 1}
+
+    # EMA update for responsive uid, zeroing decay for non-responsive uid
+    neuron_stats.update({1: {'uid': 1, 'loss': 4.0}}, alpha, ['shapley_values_min'], 0.5, 1.0)
+    assert neuron_stats[1]['loss'] == (1 - alpha) * 2.0 + alpha * 4.0
+    assert neuron_stats[1]['shapley_values_min!'] == (1 - alpha) * alpha * 4.0
+    assert neuron_stats[1]['updates!'] == 2 and neuron_stats[1]['updates_shapley_values_min'] == 1
+
+    weights = neuron_stats.weights('shapley_values_min!', 8)
+    assert weights.tolist() == [0, (1 - alpha) * alpha * 4.0, 0, 0, 0, 0, 0, 0]
+
+    # state_dict and legacy dict of dicts load to the same stats
+    for state_dict in [neuron_stats.state_dict(), neuron_stats.to_dict()]:
+        loaded = NeuronStats()
+        loaded.load_state_dict(state_dict)
+        assert loaded.to_dict() == neuron_stats.to_dict()
+
+    # numpy integer uids are looked up as ints
+    assert numpy.int64(1) in neuron_stats and neuron_stats[numpy.int64(1)] == neuron_stats[1]
+    assert 1.0 not in neuron_stats
+
+    del neuron_stats[6]
+    assert 6 not in neuron_stats and list(neuron_stats) == [1] and len(neuron_stats) == 1
+
 def test_coreserver_reregister_flag_false_exit():
     config = bittensor.Config()
     config.wallet = bittensor.Config()
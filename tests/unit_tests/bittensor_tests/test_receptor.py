@@ -103,6 +103,23 @@ def test_receptor_backward_request_serialize_error():
     out, ops, time = receptor.backward( synapses, x,grads, timeout=1)
     assert ops == [bittensor.proto.ReturnCode.RequestSerializationException]*len(synapses)
 
+def test_receptor_backward_grad_serialize_error():
+    backward_synapses = [ bittensor.synapse.TextLastHiddenState(), bittensor.synapse.TextCausalLM() ]
+    requests = []
+    def backward( request, timeout, metadata ):
+        requests.append( request )
+        return MagicMock()
+
+    x = torch.rand(3, 3)
+    grads = [ torch.ones((x.size(0), x.size(1), bittensor.__network_dim__)), torch.ones((x.size(0), x.size(1), bittensor.__vocab_size__)) ]
+    with mock.patch.object(backward_synapses[0], 'serialize_backward_request_gradient', side_effect = Exception('Mock')), \
+         mock.patch.object(receptor.stub, 'Backward', new=backward):
+        out, ops, time = receptor.backward( backward_synapses, x, grads, timeout=1)
+    assert ops == [bittensor.proto.ReturnCode.RequestSerializationException, bittensor.proto.ReturnCode.Success]
+    # The request only holds the forward tensor, grad and synapse of the synapse whose grad serialized.
+    assert len(requests[0].tensors) == 2
+    assert [ synapse.synapse_type for synapse in requests[0].synapses ] == [ bittensor.proto.Synapse.SynapseType.TEXT_CAUSAL_LM ]
+
 # -- forward testing --
 
 def test_receptor_neuron_text():
@@ -316,6 +316,77 @@ def test_receptor_pool_backward_hang():
     receptor_pool.backward(endpoints, synapses, x, [[hidden_grads, causal_grads, causallmnext_grads, seq_2_seq_grads],
                                                     [hidden_grads, causal_grads, causallmnext_grads, seq_2_seq_grads]], timeout=1)
 
+def test_receptor_pool_serialize_shared_requests():
+    x = torch.ones( (2, 3, 3) )
+    y = torch.zeros( (3, 3) )
+    inputs = [ x[0], x[1], y, y ]
+    with mock.patch.object( bittensor.Receptor, 'serialize_forward_request', wraps = bittensor.Receptor.serialize_forward_request ) as serialize:
+        serialized_requests = receptor_pool._serialize_shared_requests( synapses = synapses, inputs = inputs )
+    # x[0] and x[1] are equal by content, y is shared by identity.
+    assert serialize.call_count == 2
+    assert len( serialized_requests ) == 4
+    assert serialized_requests[0] is serialized_requests[1]
+    assert serialized_requests[2] is serialized_requests[3]
+    assert serialized_requests[0] is not serialized_requests[2]
+    serialized_forward_tensors, serialized_synapses, serialization_errors = serialized_requests[0]
+    assert len( serialized_forward_tensors ) == len( synapses )
+    assert len( serialized_synapses ) == len( synapses )
+    assert serialization_errors == [ None for _ in synapses ]
+
+def test_receptor_pool_forward_serializes_once():
+    endpoints = [neuron_obj,neuron_obj]
+    x = torch.ones( (3, 3) )
+    with mock.patch.object( bittensor.Receptor, 'serialize_forward_request', wraps = bittensor.Receptor.serialize_forward_request ) as serialize:
+        receptor_pool.forward( endpoints, synapses, [x, x], timeout=1)
+    assert serialize.call_count == 1
+
+def test_receptor_pool_forward_min_success():
+    neuron_obj2 = bittensor.endpoint(
+        version = bittensor.__version_as_int__,
+        uid = 1,
+        ip = '0.0.0.1',
+        ip_type = 4,
+        port = 12346,
+        hotkey = wallet2.hotkey.ss58_address,
+        coldkey = wallet2.coldkey.ss58_address,
+        modality = 0
+    )
+    endpoints = [neuron_obj, neuron_obj2]
+    x = torch.ones( (2, 3, 3) )
+    y_hidden = torch.rand(3, 3, bittensor.__network_dim__)
+    serializer = bittensor.serializer( serializer_type = bittensor.proto.Serializer.MSGPACK )
+    mock_return_val = bittensor.proto.TensorMessage(
+            version = bittensor.__version_as_int__,
+            hotkey = wallet.hotkey.ss58_address,
+            synapses = [synapses[0].serialize_to_wire_proto(code = bittensor.proto.ReturnCode.Success, message= 'Success' )],
+            return_code = bittensor.proto.ReturnCode.Success,
+            tensors = [serializer.serialize(y_hidden, from_type = bittensor.proto.TensorType.TORCH)]
+        )
+    mock_result = asyncio.Future()
+    mock_result.set_result( mock_return_val )
+    mock_hang = asyncio.Future()
+
+    receptor_pool = bittensor.receptor_pool(wallet=wallet,max_active_receptors=2)
+    receptor_pool._get_or_create_receptor_for_endpoint(neuron_obj)
+    receptor_pool._get_or_create_receptor_for_endpoint(neuron_obj2)
+    receptor_pool.receptors[neuron_obj.hotkey].stub.Forward = MagicMock( return_value = mock_result )
+    receptor_pool.receptors[neuron_obj2.hotkey].stub.Forward = MagicMock( return_value = mock_hang )
+
+    completed = []
+    start_time = time.time()
+    resp, codes, _ = receptor_pool.forward( endpoints, synapses[:1], x, timeout=5, min_success=1, callback=lambda index, *_: completed.append(index) )
+    assert time.time() - start_time < 5
+    assert completed == [0]
+    assert codes == [[bittensor.proto.ReturnCode.Success], [bittensor.proto.ReturnCode.Timeout]]
+    assert torch.allclose( resp[0][0], y_hidden )
+    assert mock_hang.cancelled()
+
+    receptor_pool.receptors[neuron_obj2.hotkey].stub.Forward = MagicMock( return_value = asyncio.Future() )
+    start_time = time.time()
+    _, codes, _ = receptor_pool.forward( endpoints[1:], synapses[:1], x[1:], timeout=5, deadline=0.5 )
+    assert time.time() - start_time < 5
+    assert codes == [[bittensor.proto.ReturnCode.Timeout]]
+
 if __name__ == "__main__":
     #test_receptor_pool_forward()
     test_receptor_pool_backward_hang()
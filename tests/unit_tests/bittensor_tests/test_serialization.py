@@ -226,4 +226,88 @@ class TestCMPSerialization(unittest.TestCase):
     
     def test_bittensor_dtype_to_torch_dtype(self):
         with pytest.raises(bittensor.serializer.DeserializationException):
-            bittensor.serializer.bittensor_dtype_to_torch_dtype(11)
\ No newline at end of file
+            bittensor.serializer.bittensor_dtype_to_torch_dtype(11)
+
+class TestRawBufferSerialization(unittest.TestCase):
+
+    def test_serialize(self):
+        for _ in range(10):
+            tensor_a = torch.rand([12, 23])
+            serializer = bittensor.serializer( serializer_type = bittensor.proto.Serializer.RAWBUF )
+            content = serializer.serialize(tensor_a, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+            tensor_b = serializer.deserialize(content, to_type = bittensor.proto.TensorType.TORCH)
+            assert torch.all(torch.eq(tensor_a, tensor_b))
+
+    def test_serialize_object_type_exception(self):
+        image = torch.ones( [1, 28, 28] )
+
+        serializer = bittensor.serializer( serializer_type = bittensor.proto.Serializer.RAWBUF )
+        with pytest.raises(bittensor.serializer.SerializationTypeNotImplementedException):
+            serializer.serialize(image, modality = bittensor.proto.Modality.IMAGE, from_type = 11)
+
+    def test_serialize_unknown_dtype_exception(self):
+        data = torch.ones( [2, 3], dtype = torch.uint8 )
+
+        serializer = bittensor.serializer( serializer_type = bittensor.proto.Serializer.RAWBUF )
+        with pytest.raises(bittensor.serializer.SerializationException):
+            serializer.serialize(data, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+
+    def test_serialize_deserialize_dtypes(self):
+        serializer = bittensor.serializer( serializer_type = bittensor.proto.Serializer.RAWBUF )
+        for data in [ torch.rand([4, 7]), torch.rand([4, 7]).double(), torch.rand([4, 7]).half(),
+                      torch.randint(0, 50258, [4, 7]), torch.randint(0, 50258, [4, 7], dtype = torch.int32) ]:
+            serialized_tensor_message = serializer.serialize(data, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+            assert serialized_tensor_message.serializer == bittensor.proto.Serializer.RAWBUF
+            assert list(data.shape) == serialized_tensor_message.shape
+            assert len(serialized_tensor_message.buffer) == data.element_size() * data.nelement()
+
+            deserialized_tensor_message = serializer.deserialize(serialized_tensor_message, to_type = bittensor.proto.TensorType.TORCH)
+            assert deserialized_tensor_message.dtype == data.dtype
+            assert torch.all(torch.eq(deserialized_tensor_message, data))
+
+    def test_serialize_deserialize_non_contiguous(self):
+        data = torch.rand([12, 23]).t()
+
+        serializer = bittensor.serializer( serializer_type = bittensor.proto.Serializer.RAWBUF )
+        serialized_tensor_message = serializer.serialize(data, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+        deserialized_tensor_message = serializer.deserialize(serialized_tensor_message, to_type = bittensor.proto.TensorType.TORCH)
+        assert torch.all(torch.eq(deserialized_tensor_message, data))
+
+    def test_serialize_deserialize_requires_grad(self):
+        data = torch.rand([3, 5], requires_grad = True)
+
+        serializer = bittensor.serializer( serializer_type = bittensor.proto.Serializer.RAWBUF )
+        serialized_tensor_message = serializer.serialize(data, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+        assert serialized_tensor_message.requires_grad
+
+        deserialized_tensor_message = serializer.deserialize(serialized_tensor_message, to_type = bittensor.proto.TensorType.TORCH)
+        assert deserialized_tensor_message.requires_grad
+        assert torch.all(torch.eq(deserialized_tensor_message, data))
+
+    def test_deserialize_writable(self):
+        data = torch.rand([3, 5])
+
+        serializer = bittensor.serializer( serializer_type = bittensor.proto.Serializer.RAWBUF )
+        serialized_tensor_message = serializer.serialize(data, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+        buffer = serialized_tensor_message.buffer
+        deserialized_tensor_message = serializer.deserialize(serialized_tensor_message, to_type = bittensor.proto.TensorType.TORCH)
+        deserialized_tensor_message += 1
+        assert torch.all(torch.eq(deserialized_tensor_message, data + 1))
+        assert serialized_tensor_message.buffer == buffer
+
+    def test_serialize_deserialize_empty(self):
+        data = torch.zeros([0, 4])
+
+        serializer = bittensor.serializer( serializer_type = bittensor.proto.Serializer.RAWBUF )
+        serialized_tensor_message = serializer.serialize(data, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+        deserialized_tensor_message = serializer.deserialize(serialized_tensor_message, to_type = bittensor.proto.TensorType.TORCH)
+        assert list(deserialized_tensor_message.shape) == [0, 4]
+
+    def test_deserialize_to_numpy(self):
+        data = torch.rand([12, 23])
+
+        serializer = bittensor.serializer( serializer_type = bittensor.proto.Serializer.RAWBUF )
+        serialized_tensor_message = serializer.serialize(data, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+        numpy_object = serializer.deserialize(serialized_tensor_message, to_type = bittensor.proto.TensorType.NUMPY)
+        assert numpy_object.shape == (12, 23)
+        assert torch.all(torch.eq(torch.from_numpy(numpy_object.copy()), data))
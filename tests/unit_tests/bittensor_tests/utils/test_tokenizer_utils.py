@@ -17,8 +17,11 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
 
+import os
 import bittensor
 
+from types import SimpleNamespace
+from unittest import mock
 from transformers import AutoTokenizer, AutoModelForCausalLM
 from torch import nn
 from bittensor.utils.tokenizer_utils import *
@@ -433,6 +436,44 @@ def test_topk_token_phrases():
         tokenizer_topk_phrases(sample_text[text_name], model_name, max_length, _enc_pre_logits, topk=128)
 
 
+def test_topk_token_phrases_tensor():
+    r"""
+    Parity test of the phrase table gather in topk_token_phrases against per-element phrase list construction.
+
+        Returns:
+            Asserts that topk_token_phrases output and gradients match the phrase list construction.
+    """
+    batch_size, vocab_len, topk = 4, 1000, 64
+    for ignore_index in [-100, -1]:
+        tokenizer = SimpleNamespace()  # stands in for a tokenizer without a phrase table
+        tokenizer.std_token_phrases = [torch.randint(vocab_len, (l,)).tolist()
+                                       for l in torch.randint(1, 6, (vocab_len,)).tolist()]
+
+        logits = torch.randn(batch_size, vocab_len, requires_grad=True)
+        topk_tensor = topk_token_phrases(logits, tokenizer, topk=topk, ignore_index=ignore_index)
+        assert hasattr(tokenizer, 'std_token_phrases_tensor')
+
+        # phrase list construction: [prob] + std_token_phrase padded with ignore_index
+        probs = torch.softmax(logits, dim=1)
+        topk_probs, topk_indices = torch.topk(probs, topk)
+        floor_probs = torch.clamp(1 - topk_probs.sum(dim=-1), 1e-40, 1) / (vocab_len - topk)
+        phrases = []
+        for b in range(batch_size):
+            phrases += [[prob] + tokenizer.std_token_phrases[i]
+                        for prob, i in zip(topk_probs[b].tolist(), topk_indices[b].tolist())]
+            phrases += [[floor_probs[b].item()]]
+        max_len = max([len(p) for p in phrases])
+        _topk_tensor = torch.tensor([p + [ignore_index] * (max_len - len(p)) for p in phrases])
+        _topk_tensor = _topk_tensor.reshape(batch_size, topk + 1, max_len)
+
+        assert topk_tensor.shape == _topk_tensor.shape
+        assert torch.equal(topk_tensor[..., 1:], _topk_tensor[..., 1:])
+        assert torch.allclose(topk_tensor[..., 0], _topk_tensor[..., 0])
+
+        topk_tensor[..., 0].sum().backward()
+        assert logits.grad is not None
+
+
 def _test_random_topk_token_phrases(single_token_ratios: Tuple = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
                                     max_len_final: int = 10, batch_size: int = 32, topk: int = 4096,
                                     ignore_index: int = -100, vocab_len: int = 50256):
@@ -660,5 +701,178 @@ def test_topk_phrases_crossentropy():
         assert _recorded_losses == recorded_losses
 
 
+
+def _phrase_cross_entropy_loop(target_phrases, topk_tensor, ignore_index: int = -100, vocab_size_min: int = 50257):
+    r"""
+    Per batch item and per sub target length phrase cross entropy, as reference for phrase_cross_entropy.
+    """
+    batch_size, topk_p1, max_len = topk_tensor.shape
+    topk = topk_p1 - 1
+
+    topk_tokens = topk_tensor[:, :-1, 1:].round().int()
+    topk_probs = torch.clamp(topk_tensor[:, :-1, 0], 0, 1)
+    floor_probs = torch.clamp(topk_tensor[:, -1, 0], 0, 1)
+
+    total_probs = topk_probs.sum(dim=-1) + max(0, vocab_size_min - topk) * floor_probs
+    n_topk_probs = topk_probs / total_probs[:, None]
+    n_floor_probs = floor_probs / total_probs
+
+    val_probs = torch.zeros(batch_size)
+    match_probs = torch.zeros(batch_size)
+    for b in range(batch_size):
+        target_phrase = torch.tensor(target_phrases[b]).int()
+
+        match = (topk_tokens[b, :, 0] == target_phrase[0].item())
+        val_probs[b] = n_topk_probs[b, match].sum() if match.sum() > 0 else n_floor_probs[b]
+
+        check_len = min(max_len - 1, len(target_phrase))
+        for c in range(1, check_len + 1):
+            target = ignore_index * torch.ones(check_len, dtype=torch.int32)
+            target[:c] = target_phrase[:c]
+
+            match_idx = torch.where((topk_tokens[b, :, :check_len] == target).sum(dim=-1) == check_len)[0]
+            match_probs[b] += n_topk_probs[b, match_idx].sum() if len(match_idx) else n_floor_probs[b]
+
+    loss_val = - torch.log(torch.clamp(val_probs, 0, 1) + 1e-40)
+    loss = - torch.log(torch.clamp(match_probs, 0, 1) + 1e-40)
+    return loss_val, loss
+
+
+def test_phrase_cross_entropy_batched():
+    r"""
+    Parity test of the batched phrase cross entropy against per batch item and per sub target length matching.
+
+        Returns:
+            Asserts that phrase_cross_entropy matches the reference for single and stacked topk_tensor inputs.
+    """
+    batch_size, topk, max_len, vocab_len, n_uids = 8, 64, 5, 100, 3
+    for val_len in [1, 3, 6]:
+        target_phrases = torch.randint(vocab_len, (batch_size, val_len))
+
+        topk_tensors = []
+        for _ in range(n_uids):
+            topk_tensor = torch.full((batch_size, topk + 1, max_len), -100.)
+            topk_tensor[..., 0] = torch.rand(batch_size, topk + 1) / topk
+            for b in range(batch_size):
+                for k, length in enumerate(torch.randint(1, max_len, (topk,)).tolist()):
+                    if k < topk // 4:  # phrase with target prefix
+                        length = min(length, val_len)
+                        topk_tensor[b, k, 1:length + 1] = target_phrases[b, :length]
+                    else:
+                        topk_tensor[b, k, 1:length + 1] = torch.randint(vocab_len, (length,))
+            topk_tensors += [topk_tensor]
+
+        stacked_val, stacked = phrase_cross_entropy(target_phrases, torch.stack(topk_tensors), reduce=False)
+        assert stacked.shape == (n_uids, batch_size)
+
+        for i, topk_tensor in enumerate(topk_tensors):
+            _loss_val, _loss = _phrase_cross_entropy_loop(target_phrases.tolist(), topk_tensor)
+
+            loss_val, loss = phrase_cross_entropy(target_phrases.tolist(), topk_tensor, reduce=False)
+            assert torch.allclose(loss_val, _loss_val, atol=1e-6)
+            assert torch.allclose(loss, _loss, atol=1e-6)
+
+            assert torch.allclose(stacked_val[i], _loss_val, atol=1e-6)
+            assert torch.allclose(stacked[i], _loss, atol=1e-6)
+
+            loss_val, loss = phrase_cross_entropy(target_phrases, topk_tensor)
+            assert torch.allclose(loss, _loss.mean(), atol=1e-6)
+
+        loss_val, loss = phrase_cross_entropy(target_phrases, torch.stack(topk_tensors))
+        assert torch.allclose(loss, stacked.mean(dim=-1), atol=1e-6)
+
+        loss_val, loss = phrase_cross_entropy(target_phrases, torch.stack(topk_tensors), reduction='max')
+        assert torch.allclose(loss, stacked.max(dim=-1).values, atol=1e-6)
+        loss_val, loss = phrase_cross_entropy(target_phrases, topk_tensors[0], reduction='max')
+        assert torch.allclose(loss, stacked[0].max(), atol=1e-6)
+
+
+def test_translate_tokenizer_probs_batch():
+    r"""
+    Parity test of the batched sparse tokenizer translation against the per-segment translation loop.
+
+        Returns:
+            Asserts that translate_tokenizer_probs_batch matches translate_tokenizer_probs for each batch item.
+    """
+    test_pairs = [('English-1', 'benjamin/gerpt2-large', 95),
+                  ('German-1', 'benjamin/gerpt2-large', 172)]
+
+    std_tokenizer = AutoTokenizer.from_pretrained('gpt2')
+    std_tokenizer.pad_token = std_tokenizer.eos_token
+    std_tokenizer.padding_side = "left"
+
+    for text_name, model_name, max_length in test_pairs:
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None and tokenizer.eos_token is not None:
+            tokenizer.pad_token = tokenizer.eos_token
+        set_vocab_len(tokenizer)
+        set_vocab_len(std_tokenizer)
+
+        to_translation_map = get_translation_map(tokenizer, std_tokenizer)
+        from_translation_map = get_translation_map(std_tokenizer, tokenizer)
+        split_map_cache = {}
+
+        token_batch = std_tokenizer(sample_text[text_name], add_special_tokens=False, max_length=max_length,
+                                    truncation=True, return_tensors='pt')['input_ids']
+        text_batch = std_tokenizer.batch_decode(token_batch)
+        to_text_batch, from_offsets_batch, to_offsets_batch, pad_offsets_batch = translate_special_token_text(text_batch, std_tokenizer, tokenizer)
+        tokens = tokenizer(to_text_batch, padding=True, truncation=True, return_tensors='pt', add_special_tokens=False)
+        server_tokens = tokenizer(to_text_batch, return_offsets_mapping=True, add_special_tokens=False)
+        std_tokens = std_tokenizer(text_batch, return_offsets_mapping=True)
+        offset_mapping = pad_offsets(server_tokens['offset_mapping'], to_offsets_batch, pad_offsets_batch)
+        offset_mapping_std = pad_offsets(std_tokens['offset_mapping'], from_offsets_batch, pad_offsets_batch)
+
+        batch_size, sequence_len = tokens['input_ids'].shape
+        probs = torch.softmax(torch.randn(batch_size, sequence_len, tokenizer.vocab_len), dim=-1)
+        probs_batch = [probs[b][-len(offset_mapping[b]):] for b in range(batch_size)]
+        tokens_batch = [tokens['input_ids'][b][-len(offset_mapping[b]):] for b in range(batch_size)]
+
+        probs_std = torch.zeros(batch_size, token_batch.shape[1], std_tokenizer.vocab_len)
+        for b in range(batch_size):
+            translate_tokenizer_probs(probs_batch[b], probs_std[b], offset_mapping[b], offset_mapping_std[b],
+                                      tokenizer, std_tokenizer, split_map_cache,
+                                      to_translation_map, from_translation_map, tokens_batch[b], token_batch[b])
+
+        probs_std_batch = torch.zeros(batch_size, token_batch.shape[1], std_tokenizer.vocab_len)
+        translate_tokenizer_probs_batch(probs_batch, probs_std_batch, offset_mapping, offset_mapping_std,
+                                        tokenizer, std_tokenizer, split_map_cache,
+                                        to_translation_map, from_translation_map, tokens_batch, token_batch)
+
+        assert torch.allclose(probs_std, probs_std_batch, atol=1e-6)
+
+
+def test_translation_map_cache(tmp_path):
+    r"""
+    Unit test for persisted translation maps.
+
+        Returns:
+            Asserts that a cached translation map is loaded without rebuilding and equals the built map.
+    """
+    std_tokenizer = AutoTokenizer.from_pretrained('gpt2')
+    tokenizer = AutoTokenizer.from_pretrained('benjamin/gerpt2-large')
+
+    translation_map = get_translation_map(tokenizer, std_tokenizer, cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 1
+
+    with mock.patch.object(tokenizer, 'batch_decode', side_effect=AssertionError('translation map rebuilt')):
+        cached_translation_map = get_translation_map(tokenizer, std_tokenizer, cache_dir=str(tmp_path))
+
+    assert translation_map['lengths'].keys() == cached_translation_map['lengths'].keys()
+    for l in translation_map['lengths']:
+        assert torch.equal(translation_map['lengths'][l]['from'], cached_translation_map['lengths'][l]['from'])
+        assert torch.equal(translation_map['lengths'][l]['to'], cached_translation_map['lengths'][l]['to'])
+    assert torch.equal(translation_map['counts'], cached_translation_map['counts'])
+
+    for kind in ['one_to_many_matrices', 'many_to_one_matrices']:
+        for matrix, cached_matrix in zip(translation_map[kind], cached_translation_map[kind]):
+            assert cached_matrix.is_coalesced()
+            assert torch.equal(matrix.indices(), cached_matrix.indices())
+            assert torch.equal(matrix.values(), cached_matrix.values())
+
+    # a different tokenizer pair is cached separately
+    get_translation_map(std_tokenizer, tokenizer, cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 2
+
 if __name__ == '__main__':
     pass